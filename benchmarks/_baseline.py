@@ -0,0 +1,43 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import subprocess
+import tempfile
+import importlib.util
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_module_at_revision(module_name, revision):
+    """
+    Imports a quantrocket module as it was at a git revision (e.g. the
+    parent of an optimization), for comparing against the working tree. The
+    module's own imports resolve against the working tree.
+    """
+    path = "{0}.py".format(module_name.replace(".", "/"))
+    source = subprocess.check_output(
+        ["git", "show", "{0}:{1}".format(revision, path)], cwd=REPO_DIR)
+
+    fd, filepath = tempfile.mkstemp(suffix=".py")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(source)
+        spec = importlib.util.spec_from_file_location(
+            "{0}_at_{1}".format(module_name, revision.replace("^", "_parent")), filepath)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        os.remove(filepath)
+
+    return module
@@ -0,0 +1,109 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Times get_reuters_estimates_reindexed_like on synthetic estimates for
+securities in three timezones, comparing the per-timezone vectorized
+UpdatedDate conversion with the per-row conversion at the revision before
+it.
+
+    python benchmarks/bench_estimates_timezones.py old
+    python benchmarks/bench_estimates_timezones.py new
+    python benchmarks/bench_estimates_timezones.py check --estimates 30000
+"""
+
+import argparse
+import time
+import warnings
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import quantrocket.fundamental
+from _baseline import import_module_at_revision
+
+# the parent of the commit that vectorized the timezone conversion
+BASELINE_REVISION = "35a883c^"
+
+TIMEZONES = ["America/New_York", "Europe/London", "Asia/Tokyo"]
+
+def make_data(num_conids, num_estimates):
+    """
+    Returns CSVs of EPS estimates with random UpdatedDates, and of the
+    securities' timezones.
+    """
+    rng = np.random.RandomState(0)
+    updated_dates = pd.Timestamp("2015-01-01") + pd.to_timedelta(
+        rng.randint(0, 4*365*86400, num_estimates), unit="s")
+    estimates = pd.DataFrame({
+        "ConId": rng.randint(1, num_conids + 1, num_estimates),
+        "Indicator": "EPS",
+        "Actual": rng.rand(num_estimates),
+        "UpdatedDate": updated_dates.strftime("%Y-%m-%dT%H:%M:%S")})
+    estimates = estimates.drop_duplicates(["ConId", "UpdatedDate"])
+    timezones = pd.DataFrame({
+        "ConId": np.arange(1, num_conids + 1),
+        "Timezone": np.array(TIMEZONES)[np.arange(num_conids) % len(TIMEZONES)]})
+    return estimates.to_csv(index=False), timezones.to_csv(index=False)
+
+def run(module, closes, estimates_csv, timezones_csv):
+
+    def mock_download_reuters_estimates(codes, f, **kwargs):
+        f.write(estimates_csv)
+        f.seek(0)
+
+    def mock_download_master_file(f, **kwargs):
+        f.write(timezones_csv)
+        f.seek(0)
+
+    with patch.object(module, "download_reuters_estimates", new=mock_download_reuters_estimates):
+        with patch.object(module, "download_master_file", new=mock_download_master_file):
+            with warnings.catch_warnings():
+                # the old implementation uses the deprecated pd.datetime
+                warnings.simplefilter("ignore", FutureWarning)
+                return module.get_reuters_estimates_reindexed_like(closes, "EPS")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("impl", choices=["old", "new", "check"])
+    parser.add_argument("--dates", type=int, default=1000)
+    parser.add_argument("--conids", type=int, default=3000)
+    parser.add_argument("--estimates", type=int, default=300000)
+    parser.add_argument("--baseline", default=BASELINE_REVISION,
+                        help="git revision to compare against (default %(default)s)")
+    args = parser.parse_args()
+
+    closes = pd.DataFrame(
+        1.0, index=pd.bdate_range("2015-01-01", periods=args.dates, name="Date"),
+        columns=pd.Index(np.arange(1, args.conids + 1), name="ConId"))
+    estimates_csv, timezones_csv = make_data(args.conids, args.estimates)
+
+    if args.impl in ("old", "check"):
+        old_module = import_module_at_revision("quantrocket.fundamental", args.baseline)
+
+    if args.impl == "check":
+        old = run(old_module, closes, estimates_csv, timezones_csv)
+        new = run(quantrocket.fundamental, closes, estimates_csv, timezones_csv)
+        pd.testing.assert_frame_equal(old, new)
+        print("identical output, shape {0}".format(old.shape))
+        return
+
+    module = old_module if args.impl == "old" else quantrocket.fundamental
+    start = time.time()
+    run(module, closes, estimates_csv, timezones_csv)
+    elapsed = time.time() - start
+    print("{0}: {1} estimates, {2} conids in {3} timezones, {4} dates: {5:.2f}s".format(
+        args.impl, args.estimates, args.conids, len(TIMEZONES), args.dates, elapsed))
+
+if __name__ == "__main__":
+    main()
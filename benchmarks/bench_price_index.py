@@ -0,0 +1,145 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Times the (Field, Date, Time) index construction at the end of get_prices on
+synthetic intraday prices, comparing the integer-code helpers with the
+tuple-based construction they replaced.
+
+Run each implementation in its own process so that peak RSS is comparable:
+
+    python benchmarks/bench_price_index.py old --conids 1000 --bars 78 --days 2500
+    python benchmarks/bench_price_index.py new --conids 1000 --bars 78 --days 2500
+    python benchmarks/bench_price_index.py check --conids 50 --bars 78 --days 250
+"""
+
+import argparse
+import resource
+import time
+import numpy as np
+import pandas as pd
+from quantrocket.price import _split_date_and_time, _interpolate_times
+
+def make_prices(num_conids, num_bars, num_days, fields, float32=False,
+                master_fields=None):
+    """
+    Returns a (Field, Date) DataFrame of 5-minute New York bars, as
+    get_prices has it just before splitting dates and times.
+    """
+    days = pd.bdate_range("2010-01-04", periods=num_days)
+    times = pd.timedelta_range("09:30:00", periods=num_bars, freq="5min")
+    dates = (days.repeat(num_bars) + np.tile(times, num_days)).tz_localize("America/New_York")
+    index = pd.MultiIndex.from_product([fields, dates], names=["Field", "Date"])
+    dtype = np.float32 if float32 else np.float64
+    prices = pd.DataFrame(
+        np.random.default_rng(0).random((len(index), num_conids), dtype=dtype), index=index,
+        columns=pd.Index(np.arange(num_conids), name="ConId"))
+    if master_fields:
+        securities = pd.DataFrame(
+            [["NYSE"] * num_conids] * len(master_fields),
+            index=pd.MultiIndex.from_arrays(
+                [master_fields, [dates.min()] * len(master_fields)], names=["Field", "Date"]),
+            columns=prices.columns)
+        prices = pd.concat((prices, securities))
+    return prices
+
+def build_index_old(prices, master_fields=None):
+    """
+    The tuple-based construction used by get_prices before the index was
+    built from integer codes.
+    """
+    dates = prices.index.get_level_values("Date")
+    prices.index = pd.MultiIndex.from_arrays((
+        prices.index.get_level_values("Field"),
+        pd.to_datetime(dates.date).tz_localize(None),
+        dates.strftime("%H:%M:%S")),
+        names=["Field", "Date", "Time"])
+    prices = prices.groupby(prices.index).first()
+    prices.index = pd.MultiIndex.from_tuples(prices.index)
+    prices.index.set_names(["Field", "Date", "Time"], inplace=True)
+
+    unique_fields = prices.index.get_level_values("Field").unique()
+    unique_dates = prices.index.get_level_values("Date").unique()
+    unique_times = prices.index.get_level_values("Time").unique()
+    interpolated_index = None
+    for field in unique_fields:
+        if master_fields and field in master_fields:
+            min_date = prices.loc[field].index.min()
+            field_idx = pd.MultiIndex.from_tuples([(field, min_date[0], min_date[1])])
+        else:
+            field_idx = pd.MultiIndex.from_product(
+                [[field], unique_dates, unique_times]).sort_values()
+        if interpolated_index is None:
+            interpolated_index = field_idx
+        else:
+            interpolated_index = interpolated_index.append(field_idx)
+
+    prices = prices.reindex(interpolated_index)
+    prices.index.set_names(["Field", "Date", "Time"], inplace=True)
+    return prices
+
+def build_index_new(prices, master_fields=None):
+    """
+    The construction get_prices uses now.
+    """
+    datetime_index = _split_date_and_time(prices.index)
+    prices.index = datetime_index
+    if prices.index.duplicated().any():
+        prices = prices.groupby(level=["Field", "Date", "Time"]).first()
+    else:
+        prices = prices.sort_index()
+    prices = prices.reindex(_interpolate_times(datetime_index, master_fields=master_fields))
+    prices.index.set_names(["Field", "Date", "Time"], inplace=True)
+    return prices
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("impl", choices=["old", "new", "check"])
+    parser.add_argument("--conids", type=int, default=1000)
+    parser.add_argument("--bars", type=int, default=78)
+    parser.add_argument("--days", type=int, default=2500)
+    parser.add_argument("--fields", nargs="*", default=["Close", "Volume"])
+    parser.add_argument("--float32", action="store_true",
+                        help="use float32 prices (halves the frame's memory)")
+    parser.add_argument("--master", action="store_true",
+                        help="include a PrimaryExchange master field")
+    args = parser.parse_args()
+
+    master_fields = ["PrimaryExchange"] if args.master else None
+    prices = make_prices(args.conids, args.bars, args.days, args.fields,
+                         float32=args.float32, master_fields=master_fields)
+
+    if args.impl == "check":
+        old = build_index_old(prices.copy(), master_fields)
+        new = build_index_new(prices, master_fields)
+        pd.testing.assert_frame_equal(old, new, check_index_type=False)
+        print("identical output, shape {0}".format(old.shape))
+        return
+
+    build_index = build_index_old if args.impl == "old" else build_index_new
+    input_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+    # hand the frame over so that, as in get_prices, the input can be freed
+    # once it has been copied
+    frames = [prices]
+    del prices
+    start = time.time()
+    prices = build_index(frames.pop(), master_fields)
+    elapsed = time.time() - start
+    print("{0}: {1} conids x {2} bars x {3} days x {4} fields: {5:.2f}s, "
+          "peak RSS {6}MB (input frame {7}MB)".format(
+              args.impl, args.conids, args.bars, args.days, len(args.fields), elapsed,
+              resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024, input_rss))
+
+if __name__ == "__main__":
+    main()
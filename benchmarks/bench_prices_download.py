@@ -0,0 +1,181 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Times how get_prices downloads and parses a history database CSV, streaming
+it through a pipe (the default) or via a temp file
+(QUANTROCKET_PRICES_USE_TMP_FILES), against a local stand-in for houston.
+The unstreamed mode reproduces the previous behavior, which read the whole
+response into memory, wrote it to a temp file, then parsed the file.
+
+The stand-in serves a synthetic CSV of 5-minute bars from a subprocess so
+that only the client's memory is measured:
+
+    python benchmarks/bench_prices_download.py pipe --rows 1500000
+    python benchmarks/bench_prices_download.py tmpfile --rows 1500000
+    python benchmarks/bench_prices_download.py unstreamed --rows 1500000
+"""
+
+import argparse
+import contextlib
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+def write_csv(filepath, num_rows):
+    """
+    Writes a synthetic history CSV of 5-minute bars for 1,000 conids.
+    """
+    import numpy as np
+    import pandas as pd
+
+    num_conids = 1000
+    num_bars = num_rows // num_conids
+    rng = np.random.RandomState(0)
+    dates = pd.date_range("2010-01-01 09:30", periods=num_bars, freq="5min")
+    prices = pd.DataFrame(dict(
+        ConId=np.repeat(np.arange(num_conids), num_bars),
+        Date=np.tile(dates.strftime("%Y-%m-%dT%H:%M:%S-0400"), num_conids),
+        Open=rng.rand(num_conids * num_bars) * 100,
+        High=rng.rand(num_conids * num_bars) * 100,
+        Low=rng.rand(num_conids * num_bars) * 100,
+        Close=rng.rand(num_conids * num_bars) * 100,
+        Volume=rng.randint(0, 1000000, num_conids * num_bars)))
+    prices.to_csv(filepath, index=False)
+
+def serve(port, filepath, num_rows):
+    """
+    Writes the CSV to filepath, then serves it in response to any GET
+    request.
+    """
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+
+    write_csv(filepath, num_rows)
+    size = os.path.getsize(filepath)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv")
+            self.send_header("Content-Length", str(size))
+            self.end_headers()
+            with open(filepath, "rb") as f:
+                while True:
+                    chunk = f.read(1 << 16)
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+    Server(("127.0.0.1", port), Handler).serve_forever()
+
+def read_prices_unstreamed():
+    """
+    Downloads the CSV without streaming to a temp file, then loads it, as
+    get_prices did before streaming.
+    """
+    from quantrocket.houston import houston
+    from quantrocket.cli.utils.files import write_response_to_filepath_or_buffer
+    from quantrocket.utils.parse import _read_csv
+
+    fd, tmp_filepath = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        response = houston.get("/history/bench.csv", timeout=60*30)
+        write_response_to_filepath_or_buffer(tmp_filepath, response)
+        del response
+        return _read_csv(tmp_filepath, "prices")
+    finally:
+        os.remove(tmp_filepath)
+
+def wait_for_port(port, timeout=300):
+    start = time.time()
+    while time.time() - start < timeout:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except socket.error:
+            time.sleep(0.1)
+    raise RuntimeError("stand-in houston did not start on port {0}".format(port))
+
+@contextlib.contextmanager
+def stand_in_houston(num_rows, port=0):
+    """
+    Runs the stand-in houston in a subprocess, pointing HOUSTON_URL at it.
+    Yields the filepath of the CSV it serves.
+    """
+    if not port:
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+        sock.close()
+
+    fd, csv_filepath = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    server = subprocess.Popen([
+        sys.executable, os.path.abspath(__file__), "serve", "--port", str(port),
+        "--csv", csv_filepath, "--rows", str(num_rows)])
+    try:
+        wait_for_port(port)
+        os.environ["HOUSTON_URL"] = "http://127.0.0.1:{0}".format(port)
+        yield csv_filepath
+    finally:
+        server.terminate()
+        server.wait()
+        os.remove(csv_filepath)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("mode", choices=["pipe", "tmpfile", "unstreamed", "serve"])
+    parser.add_argument("--rows", type=int, default=1500000)
+    parser.add_argument("--port", type=int, default=0,
+                        help="port for the stand-in houston (default is a free port)")
+    parser.add_argument("--csv", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode == "serve":
+        serve(args.port, args.csv, args.rows)
+        return
+
+    with stand_in_houston(args.rows, port=args.port) as csv_filepath:
+        import quantrocket.price
+        from quantrocket.history import download_history_file
+        quantrocket.price.USE_TMP_FILES = args.mode == "tmpfile"
+
+        start = time.time()
+        if args.mode == "unstreamed":
+            prices = read_prices_unstreamed()
+        else:
+            prices = quantrocket.price._read_prices_csv(download_history_file, "bench", "history")
+        elapsed = time.time() - start
+        csv_size = os.path.getsize(csv_filepath)
+
+    print("{0}: {1} rows ({2}MB CSV): {3:.2f}s, peak RSS {4}MB".format(
+        args.mode, len(prices), csv_size // 2**20, elapsed,
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024))
+
+if __name__ == "__main__":
+    main()
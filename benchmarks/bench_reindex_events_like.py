@@ -0,0 +1,102 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Times get_sharadar_fundamentals_reindexed_like on synthetic quarterly
+filings, comparing the shared as-of join (_reindex_events_like) with the
+pivot/reindex/ffill/shift pipeline at the revision before it.
+
+Run each implementation in its own process so that peak RSS is comparable:
+
+    python benchmarks/bench_reindex_events_like.py old
+    python benchmarks/bench_reindex_events_like.py new
+    python benchmarks/bench_reindex_events_like.py check --conids 500
+"""
+
+import argparse
+import resource
+import time
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import quantrocket.fundamental
+from _baseline import import_module_at_revision
+
+# the parent of the commit that introduced _reindex_events_like
+BASELINE_REVISION = "786a9de^"
+
+FIELDS = ["EPS", "REVENUE", "ASSETS"]
+
+def make_fundamentals_csv(num_conids, num_quarters=48):
+    """
+    Returns a Sharadar fundamentals CSV with a filing per conid per quarter,
+    on a random day within the first 40 days of the quarter.
+    """
+    rng = np.random.RandomState(0)
+    quarters = pd.date_range("2008-06-01", periods=num_quarters, freq="QS")
+    conids = np.repeat(np.arange(1, num_conids + 1), num_quarters)
+    dates = np.tile(quarters.values, num_conids) + rng.randint(
+        0, 40, len(conids)).astype("timedelta64[D]")
+    fundamentals = pd.DataFrame({"ConId": conids,
+                                 "DATEKEY": pd.DatetimeIndex(dates).strftime("%Y-%m-%d")})
+    for field in FIELDS:
+        fundamentals[field] = rng.rand(len(conids))
+    return fundamentals.to_csv(index=False)
+
+def run(module, closes, fundamentals_csv):
+
+    def mock_download_sharadar_fundamentals(domain, filepath_or_buffer, **kwargs):
+        filepath_or_buffer.write(fundamentals_csv)
+        filepath_or_buffer.seek(0)
+
+    with patch.object(module, "download_sharadar_fundamentals",
+                      new=mock_download_sharadar_fundamentals):
+        return module.get_sharadar_fundamentals_reindexed_like(
+            closes, "sharadar", fields=FIELDS)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("impl", choices=["old", "new", "check"])
+    parser.add_argument("--dates", type=int, default=2500)
+    parser.add_argument("--conids", type=int, default=5000)
+    parser.add_argument("--baseline", default=BASELINE_REVISION,
+                        help="git revision to compare against (default %(default)s)")
+    args = parser.parse_args()
+
+    closes = pd.DataFrame(
+        np.ones((args.dates, args.conids), dtype=np.float32),
+        index=pd.bdate_range("2010-01-01", periods=args.dates, name="Date"),
+        columns=pd.Index(np.arange(1, args.conids + 1), name="ConId"))
+    fundamentals_csv = make_fundamentals_csv(args.conids)
+
+    if args.impl in ("old", "check"):
+        old_module = import_module_at_revision("quantrocket.fundamental", args.baseline)
+
+    if args.impl == "check":
+        old = run(old_module, closes, fundamentals_csv)
+        new = run(quantrocket.fundamental, closes, fundamentals_csv)
+        pd.testing.assert_frame_equal(old, new)
+        print("identical output, shape {0}".format(old.shape))
+        return
+
+    module = old_module if args.impl == "old" else quantrocket.fundamental
+    start = time.time()
+    run(module, closes, fundamentals_csv)
+    elapsed = time.time() - start
+    print("{0}: {1} dates x {2} conids x {3} fields: {4:.2f}s, peak RSS {5}MB".format(
+        args.impl, args.dates, args.conids, len(FIELDS), elapsed,
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024))
+
+if __name__ == "__main__":
+    main()
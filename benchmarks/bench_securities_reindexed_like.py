@@ -0,0 +1,116 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Times get_securities_reindexed_like on synthetic securities master data,
+comparing the broadcast implementation (and lazy=True) with the previous
+per-row apply.
+
+    python benchmarks/bench_securities_reindexed_like.py old
+    python benchmarks/bench_securities_reindexed_like.py new
+    python benchmarks/bench_securities_reindexed_like.py lazy
+    python benchmarks/bench_securities_reindexed_like.py check
+"""
+
+import argparse
+import time
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import six
+import quantrocket.master
+from quantrocket.master import get_securities_reindexed_like
+from quantrocket.utils.parse import _read_csv
+
+def get_securities_reindexed_like_old(reindex_like, domain, fields=None):
+    """
+    The previous implementation, which built each field with one apply call
+    per date.
+    """
+    conids = list(reindex_like.columns)
+
+    f = six.StringIO()
+    quantrocket.master.download_master_file(f, domain=domain, conids=conids, fields=fields)
+    securities = _read_csv(f, "master", index_col="ConId")
+
+    all_master_fields = {}
+
+    for col in securities.columns:
+        this_col = securities[col]
+        if col in ("Delisted", "Etf"):
+            this_col = this_col.astype(bool)
+        elif this_col.dtype.name == "category":
+            this_col = this_col.astype(object)
+        all_master_fields[col] = reindex_like.apply(lambda x: this_col, axis=1)
+
+    names = list(reindex_like.index.names)
+    names.insert(0, "Field")
+
+    return pd.concat(all_master_fields, names=names)
+
+def make_master_csv(num_conids):
+    """
+    Returns a securities master CSV with 6 fields, in sorted order (the order
+    the new implementation returns them in).
+    """
+    rng = np.random.RandomState(0)
+    securities = pd.DataFrame({
+        "ConId": np.arange(1, num_conids + 1),
+        "Currency": rng.choice(["USD", "JPY", "EUR"], num_conids),
+        "Delisted": rng.randint(0, 2, num_conids),
+        "Etf": rng.randint(0, 2, num_conids),
+        "PrimaryExchange": rng.choice(["NYSE", "NASDAQ", "ARCA"], num_conids),
+        "Symbol": ["SYM{0}".format(i) for i in range(num_conids)],
+        "Timezone": rng.choice(["America/New_York", "Asia/Tokyo"], num_conids),
+    })
+    return securities.to_csv(index=False)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("impl", choices=["old", "new", "lazy", "check"])
+    parser.add_argument("--dates", type=int, default=2500)
+    parser.add_argument("--conids", type=int, default=2000)
+    args = parser.parse_args()
+
+    master_csv = make_master_csv(args.conids)
+
+    def mock_download_master_file(f, *args, **kwargs):
+        f.write(master_csv)
+        f.seek(0)
+
+    closes = pd.DataFrame(
+        np.random.rand(args.dates, args.conids),
+        index=pd.bdate_range("2010-01-04", periods=args.dates, name="Date"),
+        columns=pd.Index(np.arange(1, args.conids + 1), name="ConId"))
+
+    with patch("quantrocket.master.download_master_file", new=mock_download_master_file):
+        if args.impl == "check":
+            old = get_securities_reindexed_like_old(closes, "main")
+            new = get_securities_reindexed_like(closes, "main")
+            pd.testing.assert_frame_equal(old, new)
+            print("identical output, shape {0}".format(old.shape))
+            return
+
+        start = time.time()
+        if args.impl == "old":
+            get_securities_reindexed_like_old(closes, "main")
+        else:
+            get_securities_reindexed_like(closes, "main", lazy=args.impl == "lazy")
+        elapsed = time.time() - start
+
+    print("{0}: {1} dates x {2} conids x 6 fields: {3:.2f}s".format(
+        args.impl, args.dates, args.conids, elapsed))
+
+if __name__ == "__main__":
+    main()
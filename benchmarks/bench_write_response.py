@@ -0,0 +1,92 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Times write_response_to_filepath_or_buffer writing a streamed response to a
+file, a bytes buffer and a text buffer, comparing the current writer (large
+chunks, incremental decoding) with the previous 1KB-chunk writer.
+
+Uses the stand-in houston from bench_prices_download.py:
+
+    python benchmarks/bench_write_response.py old file
+    python benchmarks/bench_write_response.py new text --rows 1500000
+"""
+
+import argparse
+import io
+import os
+import tempfile
+import time
+from bench_prices_download import stand_in_houston
+
+def write_response_old(filepath_or_buffer, response):
+    """
+    The previous writer, which read the response in 1KB chunks and decoded
+    each chunk separately for text buffers.
+    """
+    if hasattr(filepath_or_buffer, "write"):
+        mode = getattr(
+            filepath_or_buffer, "mode",
+            "wb" if isinstance(filepath_or_buffer, (io.BufferedIOBase, io.RawIOBase)) else "w")
+        for chunk in response.iter_content(chunk_size=1024):
+            if chunk:
+                if "b" not in mode:
+                    chunk = chunk.decode("utf-8")
+                filepath_or_buffer.write(chunk)
+        if filepath_or_buffer.seekable():
+            filepath_or_buffer.seek(0)
+    else:
+        with open(filepath_or_buffer, "wb") as f:
+            for chunk in response.iter_content(chunk_size=1024):
+                if chunk:
+                    f.write(chunk)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("impl", choices=["old", "new"])
+    parser.add_argument("target", choices=["file", "bytes", "text"])
+    parser.add_argument("--rows", type=int, default=1500000)
+    args = parser.parse_args()
+
+    with stand_in_houston(args.rows) as csv_filepath:
+        from quantrocket.houston import houston
+        from quantrocket.cli.utils.files import write_response_to_filepath_or_buffer
+
+        if args.impl == "old":
+            write_response = write_response_old
+        else:
+            write_response = write_response_to_filepath_or_buffer
+
+        fd, out_filepath = tempfile.mkstemp(suffix=".csv")
+        os.close(fd)
+        target = {
+            "file": out_filepath,
+            "bytes": io.BytesIO(),
+            "text": io.StringIO()}[args.target]
+
+        try:
+            response = houston.get("/history/bench.csv", stream=True)
+            start = time.time()
+            write_response(target, response)
+            elapsed = time.time() - start
+        finally:
+            os.remove(out_filepath)
+
+        size = os.path.getsize(csv_filepath)
+
+    print("{0} {1}: {2}MB in {3:.2f}s ({4:.0f}MB/s)".format(
+        args.impl, args.target, size // 2**20, elapsed, size / 2**20 / elapsed))
+
+if __name__ == "__main__":
+    main()
@@ -69,21 +69,10 @@ def download_account_balances(filepath_or_buffer=None, output="csv",
     >>> download_account_balances(f, latest=True)
     >>> balances = pd.read_csv(f, parse_dates=["LastUpdated"])
     """
-    params = {}
-    if start_date:
-        params["start_date"] = start_date
-    if end_date:
-        params["end_date"] = end_date
-    if latest:
-        params["latest"] = latest
-    if accounts:
-        params["accounts"] = accounts
-    if below:
-        params["below"] = dict_to_dict_strs(below)
-    if fields:
-        params["fields"] = fields
-    if force_refresh:
-        params["force_refresh"] = force_refresh
+    params = _get_account_balances_params(start_date=start_date, end_date=end_date,
+                                          latest=latest, accounts=accounts,
+                                          below=below, fields=fields,
+                                          force_refresh=force_refresh)
 
     output = output or "csv"
 
@@ -102,6 +91,29 @@ def download_account_balances(filepath_or_buffer=None, output="csv",
 
     write_response_to_filepath_or_buffer(filepath_or_buffer, response)
 
+def _get_account_balances_params(start_date=None, end_date=None, latest=False,
+                                 accounts=None, below=None, fields=None,
+                                 force_refresh=False):
+    """
+    Returns the query params for `download_account_balances`.
+    """
+    params = {}
+    if start_date:
+        params["start_date"] = start_date
+    if end_date:
+        params["end_date"] = end_date
+    if latest:
+        params["latest"] = latest
+    if accounts:
+        params["accounts"] = accounts
+    if below:
+        params["below"] = dict_to_dict_strs(below)
+    if fields:
+        params["fields"] = fields
+    if force_refresh:
+        params["force_refresh"] = force_refresh
+    return params
+
 def _cli_download_account_balances(*args, **kwargs):
     below = kwargs.get("below", None)
     if below:
@@ -157,21 +169,10 @@ def download_account_portfolio(filepath_or_buffer=None, output="csv",
     >>> download_account_portfolio(f)
     >>> portfolio = pd.read_csv(f, parse_dates=["LastUpdated"])
     """
-    params = {}
-    if accounts:
-        params["accounts"] = accounts
-    if sec_types:
-        params["sec_types"] = sec_types
-    if exchanges:
-        params["exchanges"] = exchanges
-    if conids:
-        params["conids"] = conids
-    if symbols:
-        params["symbols"] = symbols
-    if include_zero:
-        params["include_zero"] = include_zero
-    if fields:
-        params["fields"] = fields
+    params = _get_account_portfolio_params(accounts=accounts, sec_types=sec_types,
+                                           exchanges=exchanges, conids=conids,
+                                           symbols=symbols, include_zero=include_zero,
+                                           fields=fields)
 
     output = output or "csv"
 
@@ -190,6 +191,29 @@ def download_account_portfolio(filepath_or_buffer=None, output="csv",
 
     write_response_to_filepath_or_buffer(filepath_or_buffer, response)
 
+def _get_account_portfolio_params(accounts=None, sec_types=None, exchanges=None,
+                                  conids=None, symbols=None, include_zero=False,
+                                  fields=None):
+    """
+    Returns the query params for `download_account_portfolio`.
+    """
+    params = {}
+    if accounts:
+        params["accounts"] = accounts
+    if sec_types:
+        params["sec_types"] = sec_types
+    if exchanges:
+        params["exchanges"] = exchanges
+    if conids:
+        params["conids"] = conids
+    if symbols:
+        params["symbols"] = symbols
+    if include_zero:
+        params["include_zero"] = include_zero
+    if fields:
+        params["fields"] = fields
+    return params
+
 def _cli_download_account_portfolio(*args, **kwargs):
     return json_to_cli(download_account_portfolio, *args, **kwargs)
 
@@ -238,17 +262,9 @@ def download_exchange_rates(filepath_or_buffer=None, output="csv",
     >>> download_exchange_rates(f, latest=True)
     >>> rates = pd.read_csv(f, parse_dates=["Date"])
     """
-    params = {}
-    if start_date:
-        params["start_date"] = start_date
-    if end_date:
-        params["end_date"] = end_date
-    if latest:
-        params["latest"] = latest
-    if base_currencies:
-        params["base_currencies"] = base_currencies
-    if quote_currencies:
-        params["quote_currencies"] = quote_currencies
+    params = _get_exchange_rates_params(start_date=start_date, end_date=end_date,
+                                        latest=latest, base_currencies=base_currencies,
+                                        quote_currencies=quote_currencies)
 
     output = output or "csv"
 
@@ -263,5 +279,23 @@ def download_exchange_rates(filepath_or_buffer=None, output="csv",
 
     write_response_to_filepath_or_buffer(filepath_or_buffer, response)
 
+def _get_exchange_rates_params(start_date=None, end_date=None, latest=False,
+                               base_currencies=None, quote_currencies=None):
+    """
+    Returns the query params for `download_exchange_rates`.
+    """
+    params = {}
+    if start_date:
+        params["start_date"] = start_date
+    if end_date:
+        params["end_date"] = end_date
+    if latest:
+        params["latest"] = latest
+    if base_currencies:
+        params["base_currencies"] = base_currencies
+    if quote_currencies:
+        params["quote_currencies"] = quote_currencies
+    return params
+
 def _cli_download_exchange_rates(*args, **kwargs):
     return json_to_cli(download_exchange_rates, *args, **kwargs)
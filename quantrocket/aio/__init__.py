@@ -0,0 +1,27 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Awaitable equivalents of quantrocket functions, backed by a shared asyncio
+houston session (Python 3.7+, requires httpx). The functions take the same
+parameters and raise the same exceptions as their counterparts in the
+quantrocket modules of the same name, so that many service calls can be
+made concurrently without threads:
+
+>>> from quantrocket.aio.history import get_db_config
+>>> from quantrocket.aio.master import list_calendar_statuses
+>>> config, statuses = await asyncio.gather(
+        get_db_config("usa-stk-1d"),
+        list_calendar_statuses(["NYSE"]))
+"""
@@ -0,0 +1,111 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+from quantrocket.aio.houston import houston
+from quantrocket.aio.files import write_response_to_filepath_or_buffer
+from quantrocket.account import (
+    _get_account_balances_params,
+    _get_account_portfolio_params,
+    _get_exchange_rates_params)
+
+async def download_account_balances(filepath_or_buffer=None, output="csv",
+                                    start_date=None, end_date=None,
+                                    latest=False, accounts=None, below=None,
+                                    fields=None, force_refresh=False):
+    """
+    Query IB account balances.
+
+    Awaitable equivalent of `quantrocket.account.download_account_balances`,
+    which documents the parameters.
+    """
+    params = _get_account_balances_params(start_date=start_date, end_date=end_date,
+                                          latest=latest, accounts=accounts,
+                                          below=below, fields=fields,
+                                          force_refresh=force_refresh)
+
+    output = output or "csv"
+
+    if output not in ("csv", "json", "txt"):
+        raise ValueError("Invalid ouput: {0}".format(output))
+
+    response = await houston.get("/account/balances.{0}".format(output), params=params)
+
+    await houston.raise_for_status_with_json(response)
+
+    # Don't write a null response to file when using below filters
+    if below and response.content[:4] == b"null":
+        return
+
+    filepath_or_buffer = filepath_or_buffer or sys.stdout
+
+    await write_response_to_filepath_or_buffer(filepath_or_buffer, response)
+
+async def download_account_portfolio(filepath_or_buffer=None, output="csv",
+                                     accounts=None, sec_types=None,
+                                     exchanges=None, conids=None, symbols=None,
+                                     include_zero=False, fields=None):
+    """
+    Download current IB portfolio.
+
+    Awaitable equivalent of `quantrocket.account.download_account_portfolio`,
+    which documents the parameters.
+    """
+    params = _get_account_portfolio_params(accounts=accounts, sec_types=sec_types,
+                                           exchanges=exchanges, conids=conids,
+                                           symbols=symbols, include_zero=include_zero,
+                                           fields=fields)
+
+    output = output or "csv"
+
+    if output not in ("csv", "json"):
+        raise ValueError("Invalid ouput: {0}".format(output))
+
+    response = await houston.get("/account/portfolio.{0}".format(output), params=params)
+
+    await houston.raise_for_status_with_json(response)
+
+    # Don't write a null response to file
+    if response.content[:4] == b"null":
+        return
+
+    filepath_or_buffer = filepath_or_buffer or sys.stdout
+
+    await write_response_to_filepath_or_buffer(filepath_or_buffer, response)
+
+async def download_exchange_rates(filepath_or_buffer=None, output="csv",
+                                  start_date=None, end_date=None, latest=False,
+                                  base_currencies=None, quote_currencies=None):
+    """
+    Query exchange rates for the base currency.
+
+    Awaitable equivalent of `quantrocket.account.download_exchange_rates`,
+    which documents the parameters.
+    """
+    params = _get_exchange_rates_params(start_date=start_date, end_date=end_date,
+                                        latest=latest, base_currencies=base_currencies,
+                                        quote_currencies=quote_currencies)
+
+    output = output or "csv"
+
+    if output not in ("csv", "json", "txt"):
+        raise ValueError("Invalid ouput: {0}".format(output))
+
+    response = await houston.get("/account/rates.{0}".format(output), params=params)
+
+    await houston.raise_for_status_with_json(response)
+
+    filepath_or_buffer = filepath_or_buffer or sys.stdout
+
+    await write_response_to_filepath_or_buffer(filepath_or_buffer, response)
@@ -0,0 +1,120 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+from quantrocket.aio.houston import houston
+from quantrocket.aio.files import write_response_to_filepath_or_buffer
+from quantrocket.blotter import (
+    _get_order_statuses_params,
+    _get_positions_params,
+    _get_executions_params)
+
+async def download_order_statuses(filepath_or_buffer=None, output="csv",
+                                  order_ids=None, conids=None, order_refs=None,
+                                  accounts=None, open_orders=None,
+                                  start_date=None, end_date=None, fields=None):
+    """
+    Download order statuses.
+
+    Awaitable equivalent of `quantrocket.blotter.download_order_statuses`,
+    which documents the parameters.
+    """
+    params = _get_order_statuses_params(order_ids=order_ids, conids=conids,
+                                        order_refs=order_refs, accounts=accounts,
+                                        open_orders=open_orders, start_date=start_date,
+                                        end_date=end_date, fields=fields)
+
+    output = output or "csv"
+
+    if output not in ("csv", "json"):
+        raise ValueError("Invalid ouput: {0}".format(output))
+
+    response = await houston.get("/blotter/orders.{0}".format(output), params=params)
+
+    await houston.raise_for_status_with_json(response)
+
+    # Don't write a null response to file
+    if response.content[:4] == b"null":
+        return
+
+    filepath_or_buffer = filepath_or_buffer or sys.stdout
+
+    await write_response_to_filepath_or_buffer(filepath_or_buffer, response)
+
+async def download_positions(filepath_or_buffer=None, output="csv",
+                             order_refs=None, accounts=None, conids=None,
+                             view="blotter", diff=False):
+    """
+    Query current positions and write results to file.
+
+    Awaitable equivalent of `quantrocket.blotter.download_positions`, which
+    documents the parameters.
+    """
+    params = _get_positions_params(order_refs=order_refs, accounts=accounts,
+                                   conids=conids, view=view, diff=diff)
+
+    output = output or "csv"
+
+    if output not in ("csv", "json"):
+        raise ValueError("Invalid ouput: {0}".format(output))
+
+    response = await houston.get("/blotter/positions.{0}".format(output), params=params)
+
+    await houston.raise_for_status_with_json(response)
+
+    # Don't write a null response to file
+    if response.content[:4] == b"null":
+        return
+
+    filepath_or_buffer = filepath_or_buffer or sys.stdout
+
+    await write_response_to_filepath_or_buffer(filepath_or_buffer, response)
+
+async def list_positions(order_refs=None, accounts=None, conids=None,
+                         view="blotter", diff=False):
+    """
+    Query current positions and return them as a Python list.
+
+    Awaitable equivalent of `quantrocket.blotter.list_positions`, which
+    documents the parameters.
+    """
+    params = _get_positions_params(order_refs=order_refs, accounts=accounts,
+                                   conids=conids, view=view, diff=diff)
+
+    response = await houston.get("/blotter/positions.json", params=params)
+
+    await houston.raise_for_status_with_json(response)
+
+    return response.json() or []
+
+async def download_executions(filepath_or_buffer=None,
+                              order_refs=None, accounts=None, conids=None,
+                              start_date=None, end_date=None):
+    """
+    Query executions from the executions database.
+
+    Awaitable equivalent of `quantrocket.blotter.download_executions`,
+    which documents the parameters.
+    """
+    params = _get_executions_params(order_refs=order_refs, accounts=accounts,
+                                    conids=conids, start_date=start_date,
+                                    end_date=end_date)
+
+    response = await houston.get("/blotter/executions.csv", params=params)
+
+    await houston.raise_for_status_with_json(response)
+
+    filepath_or_buffer = filepath_or_buffer or sys.stdout
+
+    await write_response_to_filepath_or_buffer(filepath_or_buffer, response)
@@ -0,0 +1,52 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+import codecs
+import asyncio
+from quantrocket.cli.utils.files import DOWNLOAD_CHUNK_SIZE, _get_buffer_mode
+
+async def write_response_to_filepath_or_buffer(filepath_or_buffer, response):
+    """
+    Writes the (optionally streamed) httpx response content to the filepath
+    or buffer, then closes the response.
+    """
+    try:
+        if hasattr(filepath_or_buffer, "write"):
+            if filepath_or_buffer is sys.stdout:
+                filepath_or_buffer = filepath_or_buffer.buffer
+            mode = _get_buffer_mode(filepath_or_buffer)
+            decoder = None
+            if "b" not in mode:
+                decoder = codecs.getincrementaldecoder("utf-8")()
+            async for chunk in response.aiter_bytes(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                if decoder:
+                    chunk = decoder.decode(chunk)
+                filepath_or_buffer.write(chunk)
+            if decoder:
+                filepath_or_buffer.write(decoder.decode(b"", final=True))
+            if filepath_or_buffer.seekable():
+                filepath_or_buffer.seek(0)
+        else:
+            # open, write and close the file in the executor so that disk I/O
+            # doesn't block the event loop
+            loop = asyncio.get_event_loop()
+            f = await loop.run_in_executor(None, open, filepath_or_buffer, "wb")
+            try:
+                async for chunk in response.aiter_bytes(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    await loop.run_in_executor(None, f.write, chunk)
+            finally:
+                await loop.run_in_executor(None, f.close)
+    finally:
+        await response.aclose()
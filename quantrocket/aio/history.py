@@ -0,0 +1,234 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import asyncio
+import tempfile
+import requests
+from quantrocket.aio.houston import houston
+from quantrocket.aio.files import write_response_to_filepath_or_buffer
+from quantrocket.exceptions import NoHistoricalData, ParameterError
+from quantrocket.history import (
+    TMP_DIR,
+    SEGMENT_DOWNLOAD_ATTEMPTS,
+    SEGMENT_RETRY_DELAY,
+    _get_collect_history_params,
+    _get_history_file_params,
+    _get_segment_params,
+    _write_csv_files_to_filepath_or_buffer)
+
+async def get_db_config(code):
+    """
+    Return the configuration for a history database.
+
+    Awaitable equivalent of `quantrocket.history.get_db_config`, which
+    documents the parameters.
+    """
+    response = await houston.get("/history/databases/{0}".format(code))
+    await houston.raise_for_status_with_json(response)
+    return response.json()
+
+async def list_databases():
+    """
+    List history databases.
+
+    Awaitable equivalent of `quantrocket.history.list_databases`.
+    """
+    response = await houston.get("/history/databases")
+    await houston.raise_for_status_with_json(response)
+    return response.json()
+
+async def collect_history(codes, priority=False, conids=None, universes=None,
+                          start_date=None, end_date=None, availability_only=False,
+                          delist_missing=False):
+    """
+    Collect historical market data from IB and save it to a history database.
+
+    Awaitable equivalent of `quantrocket.history.collect_history`, which
+    documents the parameters.
+    """
+    params = _get_collect_history_params(codes=codes, priority=priority, conids=conids,
+                                         universes=universes, start_date=start_date,
+                                         end_date=end_date,
+                                         availability_only=availability_only,
+                                         delist_missing=delist_missing)
+    response = await houston.post("/history/queue", params=params)
+
+    await houston.raise_for_status_with_json(response)
+    return response.json()
+
+async def get_history_queue():
+    """
+    Get the current queue of historical data collections.
+
+    Awaitable equivalent of `quantrocket.history.get_history_queue`.
+    """
+    response = await houston.get("/history/queue")
+    await houston.raise_for_status_with_json(response)
+    return response.json()
+
+async def download_history_file(code, filepath_or_buffer=None, output="csv",
+                                start_date=None, end_date=None,
+                                universes=None, conids=None,
+                                exclude_universes=None, exclude_conids=None,
+                                times=None, cont_fut=None, fields=None, tz_naive=False,
+                                segment=None, conid_batch_size=None, max_workers=None):
+    """
+    Query historical market data from a history database and download to file.
+
+    Awaitable equivalent of `quantrocket.history.download_history_file`,
+    which documents the parameters. Segments are downloaded concurrently on
+    the event loop, up to `max_workers` at a time. Binary output formats are
+    not supported.
+    """
+    params = _get_history_file_params(start_date=start_date, end_date=end_date,
+                                      universes=universes, conids=conids,
+                                      exclude_universes=exclude_universes,
+                                      exclude_conids=exclude_conids, times=times,
+                                      cont_fut=cont_fut, fields=fields,
+                                      tz_naive=tz_naive)
+
+    output = output or "csv"
+
+    if output not in ("csv", "json", "txt"):
+        raise ValueError("Invalid ouput: {0}".format(output))
+
+    filepath_or_buffer = filepath_or_buffer or sys.stdout
+
+    if segment or conid_batch_size:
+        if output != "csv":
+            raise ParameterError(
+                "segment and conid_batch_size are only supported for csv output")
+
+        await _download_history_file_in_segments(
+            code, filepath_or_buffer, params,
+            segment=segment, conid_batch_size=conid_batch_size,
+            max_workers=max_workers)
+        return
+
+    response = await _get_history_response(code, output, params)
+    await write_response_to_filepath_or_buffer(filepath_or_buffer, response)
+
+async def _get_history_response(code, output, params):
+    """
+    Requests the history file as a stream and returns the response, raising
+    NoHistoricalData if applicable.
+    """
+    response = await houston.get("/history/{0}.{1}".format(code, output), params=params.copy(),
+                                 timeout=60*30, stream=True)
+
+    try:
+        await houston.raise_for_status_with_json(response)
+    except requests.HTTPError as e:
+        await response.aclose()
+        # Raise a dedicated exception
+        if "no history matches the query parameters" in repr(e).lower():
+            raise NoHistoricalData(e)
+        raise
+
+    return response
+
+async def _download_history_file_in_segments(code, filepath_or_buffer, params,
+                                             segment=None, conid_batch_size=None,
+                                             max_workers=None):
+    """
+    Downloads the query in date segments and/or conid batches to temp files,
+    then stitches them together in order and writes the result to the
+    filepath or buffer.
+    """
+    all_segment_params = _get_segment_params(
+        params, segment=segment, conid_batch_size=conid_batch_size)
+
+    # Creating, stitching and removing the temp files is blocking disk I/O,
+    # so do it in the executor rather than on the event loop
+    loop = asyncio.get_event_loop()
+    semaphore = asyncio.Semaphore(max_workers or 1)
+    tmp_filepaths = []
+    no_data_errors = []
+
+    def _make_tmp_filepath():
+        fd, tmp_filepath = tempfile.mkstemp(
+            dir=TMP_DIR, prefix="history.{0}.".format(code), suffix=".csv")
+        os.close(fd)
+        return tmp_filepath
+
+    def _remove_tmp_filepaths():
+        for tmp_filepath in tmp_filepaths:
+            if os.path.exists(tmp_filepath):
+                os.remove(tmp_filepath)
+
+    async def _download_segment(segment_params):
+        tmp_filepath = await loop.run_in_executor(None, _make_tmp_filepath)
+        tmp_filepaths.append(tmp_filepath)
+        async with semaphore:
+            try:
+                await _download_history_segment(code, segment_params, tmp_filepath)
+            except NoHistoricalData as e:
+                # some segments may legitimately be empty; only complain if
+                # they all are
+                no_data_errors.append(e)
+                return None
+        return tmp_filepath
+
+    try:
+        tasks = [asyncio.ensure_future(_download_segment(segment_params))
+                 for segment_params in all_segment_params]
+        try:
+            segment_filepaths = await asyncio.gather(*tasks)
+        except BaseException:
+            # don't leave the other segments writing to files we're about
+            # to delete
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        segment_filepaths = [f for f in segment_filepaths if f]
+
+        if not segment_filepaths:
+            raise no_data_errors[0]
+
+        await loop.run_in_executor(
+            None, _write_csv_files_to_filepath_or_buffer, segment_filepaths,
+            filepath_or_buffer)
+    finally:
+        await loop.run_in_executor(None, _remove_tmp_filepaths)
+
+async def _download_history_segment(code, params, filepath):
+    """
+    Downloads one segment of a segmented query to a file, retrying if the
+    connection drops, times out, or houston is temporarily unavailable.
+    """
+    import httpx
+
+    for attempt in range(1, SEGMENT_DOWNLOAD_ATTEMPTS + 1):
+        try:
+            response = await _get_history_response(code, "csv", params)
+            await write_response_to_filepath_or_buffer(filepath, response)
+            return
+
+        except NoHistoricalData:
+            raise
+
+        except (requests.ConnectionError,
+                requests.Timeout,
+                # raised if the stream drops
+                httpx.TransportError,
+                requests.HTTPError) as e:
+            if isinstance(e, requests.HTTPError) and (
+                    e.response is None or e.response.status_code not in (502, 503, 504)):
+                raise
+            if attempt == SEGMENT_DOWNLOAD_ATTEMPTS:
+                raise
+            await asyncio.sleep(SEGMENT_RETRY_DELAY * attempt)
@@ -0,0 +1,164 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import asyncio
+import requests
+from quantrocket.houston import (
+    _HoustonRequestMixin,
+    _get_force_timeout,
+    _get_compression_config,
+    _get_transport_config)
+
+class AsyncHouston(_HoustonRequestMixin):
+    """
+    asyncio counterpart of `quantrocket.houston.Houston`, backed by a
+    keep-alive httpx connection pool (httpx must be installed; HTTP/2 also
+    requires h2 and QUANTROCKET_HTTP2=1). Pool size and retries are read
+    from the same environment variables as Houston. Long conid lists are
+    always sent inline (QUANTROCKET_CONID_SETS has no effect).
+
+    Requests take the same arguments as Houston requests and raise the same
+    exceptions (requests.HTTPError, requests.ConnectionError,
+    requests.Timeout, CannotConnectToHouston):
+
+    >>> response = await houston.get("/countdown/crontab")
+    >>> await houston.raise_for_status_with_json(response)
+
+    Pass stream=True to iterate over the response with
+    `response.aiter_bytes()` rather than loading it into memory; streamed
+    responses must be closed with `await response.aclose()`.
+
+    The module provides a shared instance of `AsyncHouston`, named `houston`.
+    """
+
+    def __init__(self):
+        self.auth = None
+        if "HOUSTON_USERNAME" in os.environ and "HOUSTON_PASSWORD" in os.environ:
+            self.auth = (os.environ["HOUSTON_USERNAME"], os.environ["HOUSTON_PASSWORD"])
+        self.force_timeout = _get_force_timeout()
+        self.compression_config = _get_compression_config()
+        self._client = None
+        self._loop = None
+
+    def _get_client(self):
+        """
+        Returns the httpx client, creating it on first use. Connections are
+        bound to the event loop, so a new client is created if the loop has
+        changed (e.g. across calls to asyncio.run).
+        """
+        loop = asyncio.get_event_loop()
+        if self._client is not None and self._loop is loop:
+            return self._client
+
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError("httpx must be installed to use quantrocket.aio")
+
+        config = _get_transport_config()
+        limits = httpx.Limits(
+            max_connections=config["pool_maxsize"],
+            max_keepalive_connections=config["pool_maxsize"])
+        transport = httpx.AsyncHTTPTransport(
+            http2=config["http2"], limits=limits, retries=config["max_retries"])
+
+        headers = {}
+        if self.compression_config["accept_encoding"]:
+            headers["Accept-Encoding"] = self.compression_config["accept_encoding"]
+
+        self._client = httpx.AsyncClient(auth=self.auth, transport=transport, headers=headers)
+        self._loop = loop
+        return self._client
+
+    async def aclose(self):
+        """
+        Closes the connection pool.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+    async def request(self, method, url, **kwargs):
+        import httpx
+
+        url = self._prepare_request_kwargs(url, kwargs)
+        stream = kwargs.pop("stream", False)
+        # requests waits indefinitely if no timeout is given; httpx doesn't
+        timeout = kwargs.pop("timeout", None)
+
+        params = kwargs.pop("params", None)
+        if params:
+            # requests sends booleans as True/False, httpx as true/false
+            params = dict(
+                (k, str(v) if isinstance(v, bool) else v) for k, v in params.items())
+
+        client = self._get_client()
+        request = client.build_request(method, url, params=params, timeout=timeout, **kwargs)
+
+        try:
+            return await client.send(request, stream=stream)
+        except httpx.ConnectError as error:
+            cannot_connect_error = self._get_cannot_connect_error(error, str(request.url))
+            if cannot_connect_error is not None:
+                raise cannot_connect_error
+            raise requests.ConnectionError(str(error))
+        except httpx.TimeoutException as error:
+            raise requests.Timeout(str(error))
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url, **kwargs):
+        return await self.request("PUT", url, **kwargs)
+
+    async def patch(self, url, **kwargs):
+        return await self.request("PATCH", url, **kwargs)
+
+    async def delete(self, url, **kwargs):
+        return await self.request("DELETE", url, **kwargs)
+
+    @staticmethod
+    async def raise_for_status_with_json(response):
+        """
+        Raises 400/500 error codes as requests.HTTPError, attaching a json
+        response to the exception, if possible.
+        """
+        if response.status_code < 400:
+            return
+
+        if response.status_code < 500:
+            kind = "Client Error"
+        else:
+            kind = "Server Error"
+
+        e = requests.HTTPError("{0} {1}: {2} for url: {3}".format(
+            response.status_code, kind, response.reason_phrase, response.url))
+        e.response = response
+
+        try:
+            await response.aread()
+            e.json_response = response.json()
+            e.args = e.args + (e.json_response,)
+        except:
+            e.json_response = {}
+            e.args = e.args + ("please check the logs for more details",)
+        raise e
+
+# Instantiate houston so that all coroutines can share a connection pool
+houston = AsyncHouston()
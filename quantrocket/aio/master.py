@@ -0,0 +1,87 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+from quantrocket.aio.houston import houston
+from quantrocket.aio.files import write_response_to_filepath_or_buffer
+from quantrocket.master import (
+    _get_master_file_params,
+    _get_calendar_statuses_params)
+
+async def download_master_file(filepath_or_buffer=None, output="csv", exchanges=None, sec_types=None,
+                               currencies=None, universes=None, symbols=None, conids=None,
+                               exclude_universes=None, exclude_conids=None,
+                               sectors=None, industries=None, categories=None,
+                               exclude_delisted=False, delisted=True, frontmonth=False, fields=None,
+                               domain=None):
+    """
+    Query security details from the securities master database and download to file.
+
+    Awaitable equivalent of `quantrocket.master.download_master_file`,
+    which documents the parameters. Binary output formats are not supported.
+    """
+    params = _get_master_file_params(exchanges=exchanges, sec_types=sec_types,
+                                     currencies=currencies, universes=universes,
+                                     symbols=symbols, conids=conids,
+                                     exclude_universes=exclude_universes,
+                                     exclude_conids=exclude_conids, sectors=sectors,
+                                     industries=industries, categories=categories,
+                                     exclude_delisted=exclude_delisted,
+                                     delisted=delisted, frontmonth=frontmonth,
+                                     fields=fields)
+
+    output = output or "csv"
+
+    if output not in ("csv", "json", "txt"):
+        raise ValueError("Invalid ouput: {0}".format(output))
+
+    url = "/master/{0}securities.{1}".format(
+        "{0}/".format(domain) if domain else "",
+        output)
+
+    response = await houston.get(url, params=params)
+
+    await houston.raise_for_status_with_json(response)
+
+    filepath_or_buffer = filepath_or_buffer or sys.stdout
+
+    await write_response_to_filepath_or_buffer(filepath_or_buffer, response)
+
+async def list_universes(domain=None):
+    """
+    List universes and their size.
+
+    Awaitable equivalent of `quantrocket.master.list_universes`, which
+    documents the parameters.
+    """
+    url = "/master/{0}universes".format(
+        "{0}/".format(domain) if domain else "")
+
+    response = await houston.get(url)
+    await houston.raise_for_status_with_json(response)
+    return response.json()
+
+async def list_calendar_statuses(exchanges, sec_type=None, in_=None, ago=None, outside_rth=False):
+    """
+    Check whether exchanges are open or closed.
+
+    Awaitable equivalent of `quantrocket.master.list_calendar_statuses`,
+    which documents the parameters.
+    """
+    params = _get_calendar_statuses_params(exchanges=exchanges, sec_type=sec_type,
+                                           in_=in_, ago=ago, outside_rth=outside_rth)
+
+    response = await houston.get("/master/calendar", params=params)
+    await houston.raise_for_status_with_json(response)
+    return response.json()
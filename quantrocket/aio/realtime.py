@@ -0,0 +1,94 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+import requests
+from quantrocket.aio.houston import houston
+from quantrocket.aio.files import write_response_to_filepath_or_buffer
+from quantrocket.exceptions import NoRealtimeData
+from quantrocket.realtime import (
+    _get_active_collections_params,
+    _get_market_data_file_params)
+
+async def get_db_config(code):
+    """
+    Return the configuration for a tick database or aggregate database.
+
+    Awaitable equivalent of `quantrocket.realtime.get_db_config`, which
+    documents the parameters.
+    """
+    response = await houston.get("/realtime/databases/{0}".format(code))
+    await houston.raise_for_status_with_json(response)
+    return response.json()
+
+async def list_databases():
+    """
+    List tick databases and associated aggregate databases.
+
+    Awaitable equivalent of `quantrocket.realtime.list_databases`.
+    """
+    response = await houston.get("/realtime/databases")
+    await houston.raise_for_status_with_json(response)
+    return response.json()
+
+async def get_active_collections(detail=False):
+    """
+    Return the number of tickers currently being collected, by vendor and
+    database.
+
+    Awaitable equivalent of `quantrocket.realtime.get_active_collections`,
+    which documents the parameters.
+    """
+    params = _get_active_collections_params(detail=detail)
+
+    response = await houston.get("/realtime/collections", params=params)
+    await houston.raise_for_status_with_json(response)
+    return response.json()
+
+async def download_market_data_file(code, filepath_or_buffer=None, output="csv",
+                                    start_date=None, end_date=None,
+                                    universes=None, conids=None,
+                                    exclude_universes=None, exclude_conids=None,
+                                    fields=None):
+    """
+    Query market data from a tick database or aggregate database and download to file.
+
+    Awaitable equivalent of `quantrocket.realtime.download_market_data_file`,
+    which documents the parameters. Binary output formats are not supported.
+    """
+    params = _get_market_data_file_params(start_date=start_date, end_date=end_date,
+                                          universes=universes, conids=conids,
+                                          exclude_universes=exclude_universes,
+                                          exclude_conids=exclude_conids, fields=fields)
+
+    output = output or "csv"
+
+    if output not in ("csv", "json"):
+        raise ValueError("Invalid ouput: {0}".format(output))
+
+    response = await houston.get("/realtime/{0}.{1}".format(code, output), params=params,
+                                 timeout=60*30, stream=True)
+
+    try:
+        await houston.raise_for_status_with_json(response)
+    except requests.HTTPError as e:
+        await response.aclose()
+        # Raise a dedicated exception
+        if "no market data matches the query parameters" in repr(e).lower():
+            raise NoRealtimeData(e)
+        raise
+
+    filepath_or_buffer = filepath_or_buffer or sys.stdout
+
+    await write_response_to_filepath_or_buffer(filepath_or_buffer, response)
@@ -222,23 +222,10 @@ def download_order_statuses(filepath_or_buffer=None, output="csv",
 
     >>> download_order_statuses(order_refs=['my-strategy'], open_orders=True)
     """
-    params = {}
-    if order_ids:
-        params["order_ids"] = order_ids
-    if conids:
-        params["conids"] = conids
-    if order_refs:
-        params["order_refs"] = order_refs
-    if accounts:
-        params["accounts"] = accounts
-    if open_orders:
-        params["open_orders"] = open_orders
-    if fields:
-        params["fields"] = fields
-    if start_date:
-        params["start_date"] = start_date
-    if end_date:
-        params["end_date"] = end_date
+    params = _get_order_statuses_params(order_ids=order_ids, conids=conids,
+                                        order_refs=order_refs, accounts=accounts,
+                                        open_orders=open_orders, start_date=start_date,
+                                        end_date=end_date, fields=fields)
 
     output = output or "csv"
 
@@ -257,6 +244,31 @@ def download_order_statuses(filepath_or_buffer=None, output="csv",
 
     write_response_to_filepath_or_buffer(filepath_or_buffer, response)
 
+def _get_order_statuses_params(order_ids=None, conids=None, order_refs=None,
+                               accounts=None, open_orders=None, start_date=None,
+                               end_date=None, fields=None):
+    """
+    Returns the query params for `download_order_statuses`.
+    """
+    params = {}
+    if order_ids:
+        params["order_ids"] = order_ids
+    if conids:
+        params["conids"] = conids
+    if order_refs:
+        params["order_refs"] = order_refs
+    if accounts:
+        params["accounts"] = accounts
+    if open_orders:
+        params["open_orders"] = open_orders
+    if fields:
+        params["fields"] = fields
+    if start_date:
+        params["start_date"] = start_date
+    if end_date:
+        params["end_date"] = end_date
+    return params
+
 def _cli_download_order_statuses(*args, **kwargs):
     return json_to_cli(download_order_statuses, *args, **kwargs)
 
@@ -312,17 +324,8 @@ def download_positions(filepath_or_buffer=None, output="csv",
     --------
     list_positions : load positions into Python list
     """
-    params = {}
-    if order_refs:
-        params["order_refs"] = order_refs
-    if accounts:
-        params["accounts"] = accounts
-    if conids:
-        params["conids"] = conids
-    if view:
-        params["view"] = view
-    if diff:
-        params["diff"] = diff
+    params = _get_positions_params(order_refs=order_refs, accounts=accounts,
+                                   conids=conids, view=view, diff=diff)
 
     output = output or "csv"
 
@@ -341,6 +344,24 @@ def download_positions(filepath_or_buffer=None, output="csv",
 
     write_response_to_filepath_or_buffer(filepath_or_buffer, response)
 
+def _get_positions_params(order_refs=None, accounts=None, conids=None, view="blotter",
+                          diff=False):
+    """
+    Returns the query params for `download_positions` and `list_positions`.
+    """
+    params = {}
+    if order_refs:
+        params["order_refs"] = order_refs
+    if accounts:
+        params["accounts"] = accounts
+    if conids:
+        params["conids"] = conids
+    if view:
+        params["view"] = view
+    if diff:
+        params["diff"] = diff
+    return params
+
 def _cli_download_positions(*args, **kwargs):
     return json_to_cli(download_positions, *args, **kwargs)
 
@@ -509,6 +530,23 @@ def download_executions(filepath_or_buffer=None,
     -------
     None
     """
+    params = _get_executions_params(order_refs=order_refs, accounts=accounts,
+                                    conids=conids, start_date=start_date,
+                                    end_date=end_date)
+
+    response = houston.get("/blotter/executions.csv", params=params)
+
+    houston.raise_for_status_with_json(response)
+
+    filepath_or_buffer = filepath_or_buffer or sys.stdout
+
+    write_response_to_filepath_or_buffer(filepath_or_buffer, response)
+
+def _get_executions_params(order_refs=None, accounts=None, conids=None,
+                           start_date=None, end_date=None):
+    """
+    Returns the query params for `download_executions`.
+    """
     params = {}
     if order_refs:
         params["order_refs"] = order_refs
@@ -520,14 +558,7 @@ def download_executions(filepath_or_buffer=None,
         params["start_date"] = start_date
     if end_date:
         params["end_date"] = end_date
-
-    response = houston.get("/blotter/executions.csv", params=params)
-
-    houston.raise_for_status_with_json(response)
-
-    filepath_or_buffer = filepath_or_buffer or sys.stdout
-
-    write_response_to_filepath_or_buffer(filepath_or_buffer, response)
+    return params
 
 def _cli_download_executions(*args, **kwargs):
     return json_to_cli(download_executions, *args, **kwargs)
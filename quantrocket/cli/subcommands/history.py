@@ -340,6 +340,10 @@ Download a CSV of all historical market data since 2015 from a database called
 "arca-eod" to a file called arca.csv:
 
     quantrocket history get arca-eod --start-date 2015-01-01 -o arca.csv
+
+Download 15 years of minute bars in quarterly segments, 4 at a time:
+
+    quantrocket history get usa-stk-1min --start-date 2005-01-01 --end-date 2019-12-31 --segment Q --max-workers 4 -o usa-stk-1min.csv
     """
     parser = _subparsers.add_parser(
         "get",
@@ -422,6 +426,25 @@ Download a CSV of all historical market data since 2015 from a database called
         metavar="HOW",
         help="stitch futures into continuous contracts using this method "
         "(default is not to stitch together). Possible choices: %(choices)s")
+    segmenting = parser.add_argument_group("segmenting options")
+    segmenting.add_argument(
+        "--segment",
+        metavar="FREQ",
+        help="split the query into date segments of this size and download them "
+        "separately (use Pandas frequency string, e.g. 'A' for annual segments or 'Q' "
+        "for quarterly segments). Requires --start-date and --end-date. CSV output only.")
+    segmenting.add_argument(
+        "--conid-batch-size",
+        type=int,
+        metavar="INT",
+        help="split the query into batches of this many conids and download them "
+        "separately. Requires --conids. CSV output only.")
+    segmenting.add_argument(
+        "--max-workers",
+        type=int,
+        metavar="INT",
+        help="download segments or batches concurrently using up to this many "
+        "threads (default is to download them one after another)")
     parser.set_defaults(func="quantrocket.history._cli_download_history_file")
 
     examples = """
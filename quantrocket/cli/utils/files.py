@@ -12,27 +12,236 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import io
+import os
 import six
 import sys
+import time
+import base64
+import codecs
+import hashlib
+import requests
+from quantrocket.exceptions import IncompleteDownload
+
+# Size of the chunks in which responses are read and written (default 1MB)
+DOWNLOAD_CHUNK_SIZE = int(os.environ.get("QUANTROCKET_DOWNLOAD_CHUNK_SIZE", 1024*1024))
+# Number of times to resume a download whose connection drops (0 to disable)
+DOWNLOAD_RESUME_ATTEMPTS = int(os.environ.get("QUANTROCKET_DOWNLOAD_RESUME_ATTEMPTS", 3))
+DOWNLOAD_RESUME_DELAY = 1
+# Read timeout for resumed downloads, matching the timeout of file downloads
+DOWNLOAD_RESUME_TIMEOUT = 60*30
 
 def write_response_to_filepath_or_buffer(filepath_or_buffer, response):
     """
     Writes the response content to the filepath or buffer.
+
+    The response is read in chunks of QUANTROCKET_DOWNLOAD_CHUNK_SIZE bytes.
+    For text buffers, chunks are decoded incrementally so that multibyte
+    characters split across chunks are decoded correctly.
+
+    If the connection drops mid-stream, the rest of the response is
+    requested with a Range header and appended, up to
+    QUANTROCKET_DOWNLOAD_RESUME_ATTEMPTS times. (If the server doesn't
+    support Range requests, seekable targets are rewritten from the start.)
+    The length and checksum of the content are verified against the
+    Content-Length and Digest or Content-MD5 headers, if present, and
+    IncompleteDownload is raised if they don't match.
     """
     if hasattr(filepath_or_buffer, "write"):
         if six.PY3 and filepath_or_buffer is sys.stdout:
             # Write bytes to stdout (https://stackoverflow.com/a/23932488)
             filepath_or_buffer = filepath_or_buffer.buffer
-        mode = getattr(filepath_or_buffer, "mode", "w")
-        for chunk in response.iter_content(chunk_size=1024):
-            if chunk:
-                if "b" not in mode and six.PY3:
-                    chunk = chunk.decode("utf-8")
-                filepath_or_buffer.write(chunk)
-        if filepath_or_buffer.seekable():
-            filepath_or_buffer.seek(0)
+        mode = _get_buffer_mode(filepath_or_buffer)
+        _write_response(filepath_or_buffer, response, text="b" not in mode and six.PY3)
+        if hasattr(filepath_or_buffer, "seek"):
+            try:
+                filepath_or_buffer.seek(0)
+            except (IOError, ValueError):
+                pass
     else:
         with open(filepath_or_buffer, "wb") as f:
-            for chunk in response.iter_content(chunk_size=1024):
+            _write_response(f, response)
+
+def _get_buffer_mode(buf):
+    """
+    Returns the mode of the buffer. Buffers without a mode (e.g. BytesIO)
+    are binary unless they are text buffers.
+    """
+    return getattr(
+        buf, "mode",
+        "wb" if isinstance(buf, (io.BufferedIOBase, io.RawIOBase)) else "w")
+
+class _ContentVerifier(object):
+    """
+    Tracks the length and checksum of the (decoded) content written, and
+    compares them to what the server advertised.
+    """
+
+    def __init__(self, response):
+        self.written = 0
+        self.expected_length = None
+        self.expected_digest = None
+        self.hasher = None
+
+        # Lengths and digests describe the encoded content, which is only
+        # the content we write if it isn't compressed
+        if response.headers.get("Content-Encoding", "identity") != "identity":
+            return
+
+        if response.headers.get("Content-Length", "").isdigit():
+            self.expected_length = int(response.headers["Content-Length"])
+
+        digests = dict(
+            digest.strip().split("=", 1) for digest in response.headers.get("Digest", "").split(",")
+            if "=" in digest)
+        digests = dict((algo.lower(), value) for algo, value in digests.items())
+        if "sha-256" in digests:
+            self.hasher = hashlib.sha256()
+            self.expected_digest = digests["sha-256"]
+        elif "md5" in digests or "Content-MD5" in response.headers:
+            self.hasher = hashlib.md5()
+            self.expected_digest = digests.get("md5", response.headers.get("Content-MD5"))
+
+    def update(self, chunk):
+        self.written += len(chunk)
+        if self.hasher:
+            self.hasher.update(chunk)
+
+    def is_complete(self):
+        return self.expected_length is not None and self.written == self.expected_length
+
+    def verify(self):
+        if self.expected_length is not None and self.written != self.expected_length:
+            raise IncompleteDownload(
+                "download incomplete: received {0} bytes, expected {1}".format(
+                    self.written, self.expected_length))
+
+        if self.hasher:
+            digest = base64.b64encode(self.hasher.digest()).decode("ascii")
+            if digest != self.expected_digest.strip():
+                raise IncompleteDownload(
+                    "download corrupted: checksum {0} does not match expected checksum {1}".format(
+                        digest, self.expected_digest))
+
+def _write_response(f, response, text=False):
+    """
+    Writes the response to the open file or buffer, resuming the download
+    if the connection drops.
+    """
+    # py2 files have no seekable(), and unseekable streams can't tell()
+    try:
+        start = f.tell()
+    except (IOError, ValueError, AttributeError):
+        start = None
+    decoder = codecs.getincrementaldecoder("utf-8")() if text else None
+    verifier = _ContentVerifier(response)
+    write = f.write
+
+    attempt = 0
+    while True:
+        try:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
                 if chunk:
-                    f.write(chunk)
+                    verifier.update(chunk)
+                    write(decoder.decode(chunk) if decoder else chunk)
+            break
+        except (requests.exceptions.ChunkedEncodingError,
+                requests.ConnectionError,
+                requests.Timeout):
+            if verifier.is_complete():
+                # the connection dropped after all the content arrived
+                break
+
+            attempt += 1
+            if attempt > DOWNLOAD_RESUME_ATTEMPTS or not _can_resume(response):
+                raise
+
+            time.sleep(DOWNLOAD_RESUME_DELAY * attempt)
+
+            rest_of_response = _request_rest_of_response(response, verifier.written)
+            if rest_of_response is None:
+                raise
+
+            if rest_of_response.status_code == 206:
+                # the resumed response is uncompressed, so its total length
+                # can be checked even if the original response's couldn't
+                total_length = rest_of_response.headers["Content-Range"].rsplit("/", 1)[-1]
+                if verifier.expected_length is None and total_length.isdigit():
+                    verifier.expected_length = int(total_length)
+            else:
+                # the server ignored the Range header and sent everything
+                if start is None:
+                    rest_of_response.close()
+                    raise
+                f.seek(start)
+                f.truncate()
+                if decoder:
+                    decoder.reset()
+                verifier = _ContentVerifier(rest_of_response)
+
+            response = rest_of_response
+
+    if decoder:
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            write(tail)
+
+    verifier.verify()
+
+def _can_resume(response):
+    """
+    Returns True if the request can be sent again, i.e. its body, if any,
+    wasn't a stream that has been consumed.
+    """
+    if response.request is None:
+        return False
+    body = response.request.body
+    return body is None or isinstance(body, (bytes, six.text_type))
+
+def _request_rest_of_response(response, offset):
+    """
+    Requests the content of the response from `offset` onward. Returns the
+    new response (206 if the server honored the Range header, 200 if it
+    sent the whole content again), or None if the request failed.
+    """
+    from quantrocket.houston import houston
+
+    response.close()
+
+    request = response.request.copy()
+    if offset:
+        # Ranges refer to the uncompressed content, so offsets into the
+        # decoded content written so far are valid even if the original
+        # response was compressed
+        request.headers["Range"] = "bytes={0}-".format(offset)
+        request.headers["Accept-Encoding"] = "identity"
+        # only resume if the content hasn't changed in the meantime (weak
+        # ETags, e.g. of compressed responses, can't be used for this)
+        validator = response.headers.get("ETag")
+        if not validator or validator.startswith("W/"):
+            validator = response.headers.get("Last-Modified")
+        if validator:
+            request.headers["If-Range"] = validator
+
+    try:
+        rest_of_response = houston.send(
+            request, stream=True, timeout=houston.force_timeout or DOWNLOAD_RESUME_TIMEOUT)
+    except (requests.ConnectionError, requests.Timeout):
+        return None
+
+    if rest_of_response.status_code == 206:
+        content_range = rest_of_response.headers.get("Content-Range", "")
+        if not content_range.startswith("bytes {0}-".format(offset)):
+            rest_of_response.close()
+            return None
+        # keep the validators for subsequent resumes
+        for header in ("ETag", "Last-Modified"):
+            if header in response.headers and header not in rest_of_response.headers:
+                rest_of_response.headers[header] = response.headers[header]
+        return rest_of_response
+
+    if rest_of_response.status_code == 200:
+        return rest_of_response
+
+    rest_of_response.close()
+    return None
@@ -15,6 +15,7 @@
 import getpass
 from quantrocket.houston import houston
 from quantrocket.cli.utils.output import json_to_cli
+from quantrocket.cli.utils.files import write_response_to_filepath_or_buffer
 
 def list_databases(services=None, codes=None, detail=False, expand=False,
                    service=None):
@@ -125,10 +126,7 @@ def download_database(database, outfile):
         DeprecationWarning)
     response = houston.get("/db/databases/{0}".format(database), stream=True)
     houston.raise_for_status_with_json(response)
-    with open(outfile, "wb") as f:
-        for chunk in response.iter_content(chunk_size=1024):
-            if chunk:
-                f.write(chunk)
+    write_response_to_filepath_or_buffer(outfile, response)
 
 def _cli_download_database(*args, **kwargs):
     return json_to_cli(download_database, *args, **kwargs)
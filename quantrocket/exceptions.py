@@ -55,3 +55,10 @@ class NoFundamentalData(requests.HTTPError):
             super(NoFundamentalData, self).__init__(e.args)
         else:
             super(NoFundamentalData, self).__init__(e)
+
+class IncompleteDownload(requests.exceptions.ChunkedEncodingError):
+    """
+    Raised when a downloaded file is shorter than the server said it would
+    be, or doesn't match the server's checksum.
+    """
+    pass
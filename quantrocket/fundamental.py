@@ -15,13 +15,266 @@
 import six
 import sys
 import os
+import threading
+import collections
+import multiprocessing
 import requests
 from quantrocket.houston import houston
-from quantrocket.master import download_master_file
+from quantrocket.master import (
+    download_master_file,
+    get_securities_reindexed_like,
+    _get_securities_from_mirror)
 from quantrocket.cli.utils.output import json_to_cli
 from quantrocket.cli.utils.files import write_response_to_filepath_or_buffer
 from quantrocket.exceptions import ParameterError, MissingData, NoFundamentalData
 from quantrocket.utils.warn import deprecated_replaced_by
+from quantrocket.utils.parse import _read_csv
+from quantrocket.utils.threads import _map_in_threads
+
+def _get_security_timezones(conids, prefetched_timezones=None):
+    """
+    Returns a DataFrame of the Timezone of each conid, indexed by ConId,
+    using the prefetched timezones (as returned by this function) if they
+    include all the conids.
+    """
+    if (prefetched_timezones is not None
+            and (prefetched_timezones.index.get_indexer(conids) >= 0).all()):
+        return prefetched_timezones.loc[conids]
+
+    timezones = _get_securities_from_mirror(conids, fields=["Timezone"])
+    if timezones is not None:
+        return timezones
+
+    f = six.StringIO()
+    download_master_file(f, conids=list(conids), fields=["Timezone"])
+    return _read_csv(f, "master", index_col="ConId")
+
+def _check_reindex_like(reindex_like):
+    """
+    Raises ParameterError if reindex_like doesn't have a DatetimeIndex called
+    Date.
+    """
+    index_levels = reindex_like.index.names
+    if "Time" in index_levels:
+        raise ParameterError(
+            "reindex_like should not have 'Time' in index, please take a cross-section first, "
+            "for example: `prices.loc['Close'].xs('15:45:00', level='Time')`")
+
+    if index_levels != ["Date"]:
+        raise ParameterError(
+            "reindex_like must have index called 'Date', but has {0}".format(
+                ",".join([str(name) for name in index_levels])))
+
+    if not hasattr(reindex_like.index, "date"):
+        raise ParameterError("reindex_like must have a DatetimeIndex")
+
+def _reset_houston_connections():
+    """
+    Closes houston connections inherited from the parent process, so that
+    worker processes don't share sockets with it.
+    """
+    houston.close()
+
+def _get_reindexed_like_chunk(task):
+    """
+    Calls a reindexed_like function on a chunk of reindex_like, returning
+    None if there is no data for the chunk.
+    """
+    func, reindex_like, kwargs = task
+    try:
+        return func(reindex_like=reindex_like, **kwargs)
+    except NoFundamentalData:
+        return None
+
+def _get_reindexed_like_in_chunks(func, reindex_like, chunksize, processes=None, **kwargs):
+    """
+    Calls a reindexed_like function on blocks of at most `chunksize` columns
+    (conids) of `reindex_like`, optionally in a pool of `processes`
+    processes, and writes the results into a single preallocated array, so
+    that peak memory is bounded by the chunk size rather than the number of
+    conids.
+    """
+    import numpy as np
+    import pandas as pd
+
+    tasks = [
+        (func, reindex_like.iloc[:, i:i+chunksize], kwargs)
+        for i in range(0, len(reindex_like.columns), chunksize)]
+
+    pool = None
+    if processes and processes > 1:
+        pool = multiprocessing.Pool(
+            min(processes, len(tasks)), initializer=_reset_houston_connections)
+        # receive results in order, one at a time
+        results = pool.imap(_get_reindexed_like_chunk, tasks, chunksize=1)
+    else:
+        results = six.moves.map(_get_reindexed_like_chunk, tasks)
+
+    output = None
+    output_index = None
+    # the dtypes of the chunks before they were made NaN-able
+    chunk_dtypes = set()
+    try:
+        for i, result in enumerate(results):
+            if result is None:
+                continue
+
+            values = result.values
+            chunk_dtypes.add(values.dtype)
+            # make integers and bools NaN-able (as unchunked results are if
+            # they have missing values)
+            if values.dtype.kind in ("i", "u"):
+                values = values.astype(np.float64)
+            elif values.dtype.kind == "b":
+                values = values.astype(object)
+            fill_value = np.datetime64("NaT") if values.dtype.kind == "M" else np.nan
+
+            if output is None:
+                output_index = result.index
+                output = np.full(
+                    (len(output_index), len(reindex_like.columns)), fill_value, dtype=values.dtype)
+            else:
+                # fields (etc.) which weren't in any earlier chunk
+                new_index = result.index[~result.index.isin(output_index)]
+                if len(new_index):
+                    output_index = output_index.append(new_index)
+                    output = np.concatenate((output, np.full(
+                        (len(new_index), output.shape[1]), fill_value, dtype=output.dtype)))
+                if values.dtype != output.dtype:
+                    try:
+                        dtype = np.result_type(output.dtype, values.dtype)
+                    except TypeError:
+                        dtype = object
+                    output = output.astype(dtype)
+
+            start = i * chunksize
+            output[output_index.get_indexer(result.index), start:start + values.shape[1]] = values
+            del result, values
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    if output is None:
+        raise NoFundamentalData(requests.HTTPError(
+            "no fundamental data match the query parameters"))
+
+    # restore integers and bools if nothing is missing, as in unchunked
+    # results (conids without data are NaN)
+    chunk_kinds = set(dtype.kind for dtype in chunk_dtypes)
+    if chunk_kinds and (chunk_kinds <= set("iu") or chunk_kinds == set("b")):
+        if not pd.isnull(output).any():
+            output = output.astype(np.result_type(*chunk_dtypes))
+
+    return pd.DataFrame(output, index=output_index, columns=reindex_like.columns)
+
+def _reindex_events_like(events, index, columns, strict=False):
+    """
+    Point-in-time as-of join of sparse events (e.g. financial statements) to
+    a dense (date x conid) shape, without materializing an intermediate
+    grid of the unioned dates.
+
+    For each field, each (date, conid) cell gets the conid's latest non-null
+    value with a Date on or before the date (or strictly before the date if
+    `strict`, to avoid lookahead bias), else NaN.
+
+    Parameters
+    ----------
+    events : DataFrame, required
+        DataFrame with ConId and Date columns and one column per field.
+        There should be at most one event per (ConId, Date). Dates must have
+        the same tz-awareness as `index`.
+
+    index : DatetimeIndex, required
+        the dates of the result
+
+    columns : Index, required
+        the conids of the result
+
+    strict : bool
+        only use events dated before (rather than on or before) each date
+
+    Returns
+    -------
+    dict
+        dict of field: DataFrame shaped like (index, columns)
+    """
+    import numpy as np
+    import pandas as pd
+
+    index_dates = pd.DatetimeIndex(index).asi8
+    # work on sorted dates, restoring the original order at the end
+    index_order = None
+    if not (np.diff(index_dates) >= 0).all():
+        index_order = np.argsort(index_dates, kind="mergesort")
+        index_dates = index_dates[index_order]
+
+    event_dates = pd.DatetimeIndex(events["Date"]).asi8
+    event_columns = pd.Index(columns).get_indexer(events["ConId"])
+    # the first row of the result on which each event is available
+    event_rows = np.searchsorted(index_dates, event_dates, side="right" if strict else "left")
+    is_used = (event_columns >= 0) & (event_rows < len(index_dates))
+
+    results = {}
+    for field in events.columns:
+        if field in ("ConId", "Date"):
+            continue
+
+        values = events[field]
+        event_idx = np.flatnonzero(values.notnull().values & is_used)
+        # sort by date so that later events overwrite earlier ones
+        event_idx = event_idx[np.argsort(event_dates[event_idx], kind="mergesort")]
+
+        # Place the (sorted) position of each event on the row and column
+        # where it becomes available, then carry the positions forward. As
+        # positions increase with date, the running maximum is the latest
+        # event as of each row.
+        cells = event_rows[event_idx] * len(columns) + event_columns[event_idx]
+        # keep the latest of several events available on the same row
+        _, last = np.unique(cells[::-1], return_index=True)
+        last = len(cells) - 1 - last
+        positions = np.full((len(index_dates), len(columns)), -1, dtype=np.int64)
+        positions.ravel()[cells[last]] = last
+        np.maximum.accumulate(positions, axis=0, out=positions)
+        if index_order is not None:
+            positions[index_order] = positions.copy()
+
+        take_idx = np.where(positions >= 0, event_idx[positions], -1)
+        values = values.values
+        field_values = pd.api.extensions.take(
+            values, take_idx.ravel(), allow_fill=True)
+        if not isinstance(field_values, np.ndarray):
+            field_values = np.asarray(field_values, dtype=object)
+
+        results[field] = pd.DataFrame(
+            field_values.reshape(len(index), len(columns)),
+            index=index, columns=columns)
+
+    return results
+
+def _get_within_max_lag(fiscal_period_end_dates, max_lag):
+    """
+    Returns a boolean array, shaped like `fiscal_period_end_dates`, which is
+    True where the fiscal period ended no more than `max_lag` (a Pandas
+    offset alias) before the index date.
+    """
+    import numpy as np
+    import pandas as pd
+
+    # compare wall times (fiscal period end dates are tz-naive)
+    index = pd.DatetimeIndex(fiscal_period_end_dates.index)
+    if index.tz:
+        index = index.tz_localize(None)
+
+    # subtract the max_lag from the index date to get the earliest possible
+    # fiscal period end date for each row, as int64 nanoseconds
+    earliest_allowed_fiscal_period_end_dates = index.asi8 - pd.Timedelta(max_lag).value
+
+    # NaT is the minimum int64 so is never within the max lag
+    fiscal_period_end_dates = fiscal_period_end_dates.values.astype(
+        "datetime64[ns]", copy=False).view(np.int64)
+
+    return fiscal_period_end_dates >= earliest_allowed_fiscal_period_end_dates[:, np.newaxis]
 
 def collect_reuters_financials(universes=None, conids=None, force=True):
     """
@@ -308,7 +561,8 @@ def _cli_download_reuters_financials(*args, **kwargs):
     return json_to_cli(download_reuters_financials, *args, **kwargs)
 
 def get_reuters_financials_reindexed_like(reindex_like, coa_codes, fields=["Amount"],
-                           interim=False, exclude_restatements=False, max_lag=None):
+                           interim=False, exclude_restatements=False, max_lag=None,
+                           chunksize=None, processes=None):
     """
     Return a multiindex (CoaCode, Field, Date) DataFrame of point-in-time
     Reuters financial statements for one or more Chart of Account (COA)
@@ -348,6 +602,15 @@ def get_reuters_financials_reindexed_like(reindex_like, coa_codes, fields=["Amou
         data. Specify as a Pandas offset alias, e.g. '500D'. By default, no
         maximum limit is applied.
 
+    chunksize : int, optional
+        process the conids in blocks of this many columns and combine the
+        results, to limit peak memory usage for large universes. Default is
+        to process all conids at once.
+
+    processes : int, optional
+        process the blocks concurrently in this many processes (requires
+        chunksize). Default is to process them one after another.
+
     Returns
     -------
     DataFrame
@@ -371,25 +634,32 @@ def get_reuters_financials_reindexed_like(reindex_like, coa_codes, fields=["Amou
     >>> shares_out = financials.loc["QTCO"].loc["Amount"]
     >>> book_values_per_share = (tot_assets - tot_liabilities)/shares_out
 
+    """
+    _check_reindex_like(reindex_like)
+
+    return _get_reuters_financials_reindexed_like(reindex_like, coa_codes=coa_codes,
+        fields=fields, interim=interim,
+        exclude_restatements=exclude_restatements, max_lag=max_lag,
+        chunksize=chunksize, processes=processes)
+
+def _get_reuters_financials_reindexed_like(reindex_like, coa_codes, fields=["Amount"],
+                                           interim=False, exclude_restatements=False,
+                                           max_lag=None, chunksize=None,
+                                           processes=None):
+    """
+    Does the work of `get_reuters_financials_reindexed_like`, without validating
+    reindex_like.
     """
     try:
         import pandas as pd
     except ImportError:
         raise ImportError("pandas must be installed to use this function")
 
-    index_levels = reindex_like.index.names
-    if "Time" in index_levels:
-        raise ParameterError(
-            "reindex_like should not have 'Time' in index, please take a cross-section first, "
-            "for example: `prices.loc['Close'].xs('15:45:00', level='Time')`")
-
-    if index_levels != ["Date"]:
-        raise ParameterError(
-            "reindex_like must have index called 'Date', but has {0}".format(
-                ",".join([str(name) for name in index_levels])))
-
-    if not hasattr(reindex_like.index, "date"):
-        raise ParameterError("reindex_like must have a DatetimeIndex")
+    if chunksize and len(reindex_like.columns) > chunksize:
+        return _get_reindexed_like_in_chunks(
+            _get_reuters_financials_reindexed_like, reindex_like, chunksize,
+            processes=processes, coa_codes=coa_codes, fields=fields, interim=interim,
+            exclude_restatements=exclude_restatements, max_lag=max_lag)
 
     conids = list(reindex_like.columns)
     start_date = reindex_like.index.min().date()
@@ -409,35 +679,25 @@ def get_reuters_financials_reindexed_like(reindex_like, coa_codes, fields=["Amou
     download_reuters_financials(
         coa_codes, f, conids=conids, start_date=start_date, end_date=end_date,
         fields=fields, interim=interim, exclude_restatements=exclude_restatements)
-    financials = pd.read_csv(
-        f, parse_dates=["SourceDate","FiscalPeriodEndDate"])
+    # Only load the fields we need
+    needed_fields = set(fields)
+    needed_fields.update(set(("ConId", "SourceDate", "CoaCode")))
+    parse_dates = ["SourceDate"]
+    if max_lag or "FiscalPeriodEndDate" in fields:
+        needed_fields.add("FiscalPeriodEndDate")
+        parse_dates.append("FiscalPeriodEndDate")
+    financials = _read_csv(
+        f, "fundamentals", usecols=needed_fields, parse_dates=parse_dates)
 
     # Rename SourceDate to match price history index name
     financials = financials.rename(columns={"SourceDate": "Date"})
 
-    # Drop any fields we don't need
-    needed_fields = set(fields)
-    needed_fields.update(set(("ConId", "Date", "CoaCode")))
-    if max_lag:
-        needed_fields.add("FiscalPeriodEndDate")
-    unneeded_fields = set(financials.columns) - needed_fields
-    if unneeded_fields:
-        financials = financials.drop(unneeded_fields, axis=1)
-
     # if reindex_like.index is tz-aware, make financials tz-aware so they can
     # be joined (tz-aware or tz-naive are both fine, as SourceDate represents
     # dates which are assumed to be in the local timezone of the reported
     # company)
     if reindex_like.index.tz:
         financials.loc[:, "Date"] = financials.Date.dt.tz_localize(reindex_like.index.tz.zone)
-        deduped_source_dates = financials.Date.drop_duplicates()
-    else:
-        # joining to tz-naive requires using values, whereas joining to
-        # tz-aware requires not using it. Why?
-        deduped_source_dates = financials.Date.drop_duplicates().values
-
-    # Create a unioned index of input DataFrame and statement SourceDates
-    union_date_idx = reindex_like.index.union(deduped_source_dates).sort_values()
 
     all_financials = {}
     for code in coa_codes:
@@ -450,30 +710,16 @@ def get_reuters_financials_reindexed_like(reindex_like, coa_codes, fields=["Amou
         # reports for several fiscal periods at once. In this case we keep
         # only the last value (i.e. latest fiscal period)
         financials_for_code = financials_for_code.drop_duplicates(subset=["ConId", "Date"], keep="last")
-        financials_for_code = financials_for_code.pivot(index="ConId",columns="Date").T
-        multiidx = pd.MultiIndex.from_product(
-            (financials_for_code.index.get_level_values(0).unique(), union_date_idx),
-            names=["Field", "Date"])
-        financials_for_code = financials_for_code.reindex(index=multiidx, columns=reindex_like.columns)
-
-        # financial values are sparse so ffill (one field at a time)
-        all_fields_for_code = {}
-        for field in financials_for_code.index.get_level_values("Field").unique():
-            field_for_code = financials_for_code.loc[field].fillna(method="ffill")
 
-            # Shift to avoid lookahead bias
-            field_for_code = field_for_code.shift()
-
-            all_fields_for_code[field] = field_for_code
+        # financial values are sparse so use the latest available value as
+        # of the day before each date (to avoid lookahead bias)
+        all_fields_for_code = _reindex_events_like(
+            financials_for_code, reindex_like.index, reindex_like.columns, strict=True)
 
         # Filter stale values if asked to
         if max_lag:
-            fiscal_period_end_dates = all_fields_for_code["FiscalPeriodEndDate"]
-            # subtract the max_lag from the index date to get the
-            # earliest possible fiscal period end date for that row
-            earliest_allowed_fiscal_period_end_dates = fiscal_period_end_dates.apply(
-                lambda x: fiscal_period_end_dates.index - pd.Timedelta(max_lag))
-            within_max_timedelta = fiscal_period_end_dates.apply(pd.to_datetime) >= earliest_allowed_fiscal_period_end_dates
+            within_max_timedelta = _get_within_max_lag(
+                all_fields_for_code["FiscalPeriodEndDate"], max_lag)
 
             for field, field_for_code in all_fields_for_code.items():
                 field_for_code = field_for_code.where(within_max_timedelta)
@@ -485,12 +731,6 @@ def get_reuters_financials_reindexed_like(reindex_like, coa_codes, fields=["Amou
 
         financials_for_code = pd.concat(all_fields_for_code, names=["Field", "Date"])
 
-        # In cases the statements included dates not in the input
-        # DataFrame, drop those now that we've ffilled
-        extra_dates = union_date_idx.difference(reindex_like.index)
-        if not extra_dates.empty:
-            financials_for_code.drop(extra_dates, axis=0, level="Date", inplace=True)
-
         all_financials[code] = financials_for_code
 
     financials = pd.concat(all_financials, names=["CoaCode", "Field", "Date"])
@@ -606,7 +846,7 @@ def _cli_download_reuters_estimates(*args, **kwargs):
 
 def get_reuters_estimates_reindexed_like(reindex_like, codes, fields=["Actual"],
                                          period_types=["Q"], ffill=True, shift=True,
-                                         max_lag=None):
+                                         max_lag=None, chunksize=None, processes=None):
     """
     Return a multiindex (Indicator, Field, Date) DataFrame of point-in-time
     Reuters estimates and actuals for one or more indicator codes, reindexed
@@ -656,6 +896,15 @@ def get_reuters_estimates_reindexed_like(reindex_like, codes, fields=["Actual"],
         data. Specify as a Pandas offset alias, e.g. '500D'. By default, no
         maximum limit is applied.
 
+    chunksize : int, optional
+        process the conids in blocks of this many columns and combine the
+        results, to limit peak memory usage for large universes. Default is
+        to process all conids at once.
+
+    processes : int, optional
+        process the blocks concurrently in this many processes (requires
+        chunksize). Default is to process them one after another.
+
     Returns
     -------
     DataFrame
@@ -681,24 +930,32 @@ def get_reuters_estimates_reindexed_like(reindex_like, codes, fields=["Actual"],
     >>> announced_before_market_opens = announce_hours < 9
     >>> announced_after_market_closes = announce_hours >= 16
     """
+    _check_reindex_like(reindex_like)
+
+    return _get_reuters_estimates_reindexed_like(reindex_like, codes=codes,
+        fields=fields, period_types=period_types, ffill=ffill, shift=shift,
+        max_lag=max_lag, chunksize=chunksize, processes=processes)
+
+def _get_reuters_estimates_reindexed_like(reindex_like, codes, fields=["Actual"],
+                                          period_types=["Q"], ffill=True, shift=True,
+                                          max_lag=None, chunksize=None, processes=None,
+                                          security_timezones=None):
+    """
+    Does the work of `get_reuters_estimates_reindexed_like`, without validating
+    reindex_like.
+    """
     try:
         import pandas as pd
+        import numpy as np
     except ImportError:
         raise ImportError("pandas must be installed to use this function")
 
-    index_levels = reindex_like.index.names
-    if "Time" in index_levels:
-        raise ParameterError(
-            "reindex_like should not have 'Time' in index, please take a cross-section first, "
-            "for example: `prices.loc['Close'].xs('15:45:00', level='Time')`")
-
-    if index_levels != ["Date"]:
-        raise ParameterError(
-            "reindex_like must have index called 'Date', but has {0}".format(
-                ",".join([str(name) for name in index_levels])))
-
-    if not hasattr(reindex_like.index, "date"):
-        raise ParameterError("reindex_like must have a DatetimeIndex")
+    if chunksize and len(reindex_like.columns) > chunksize:
+        return _get_reindexed_like_in_chunks(
+            _get_reuters_estimates_reindexed_like, reindex_like, chunksize,
+            processes=processes, codes=codes, fields=fields, period_types=period_types,
+            ffill=ffill, shift=shift, max_lag=max_lag,
+            security_timezones=security_timezones)
 
     conids = list(reindex_like.columns)
     start_date = reindex_like.index.min().date()
@@ -729,18 +986,20 @@ def get_reuters_estimates_reindexed_like(reindex_like, codes, fields=["Actual"],
         parse_dates.append("FiscalPeriodEndDate")
     if "AnnounceDate" in fields:
         parse_dates.append("AnnounceDate")
-    estimates = pd.read_csv(
-        f, parse_dates=parse_dates)
+    # Only load the fields we need
+    needed_fields = set(query_fields)
+    needed_fields.update(set(("ConId", "Indicator")))
+    needed_fields.update(set(parse_dates))
+    estimates = _read_csv(
+        f, "fundamentals", usecols=needed_fields, parse_dates=parse_dates)
 
     # Drop records with no actuals
     estimates = estimates.loc[estimates.UpdatedDate.notnull()]
 
     # Convert UTC UpdatedDate to security timezone, and cast to date for
     # index
-    f = six.StringIO()
-    download_master_file(f, conids=list(estimates.ConId.unique()),
-                         fields=["Timezone"])
-    timezones = pd.read_csv(f, index_col="ConId")
+    timezones = _get_security_timezones(
+        list(estimates.ConId.unique()), prefetched_timezones=security_timezones)
     estimates = estimates.join(timezones, on="ConId")
     if estimates.Timezone.isnull().any():
         conids_missing_timezones = list(estimates.ConId[estimates.Timezone.isnull()].unique())
@@ -749,16 +1008,15 @@ def get_reuters_estimates_reindexed_like(reindex_like, codes, fields=["Actual"],
                               ",".join([str(conid) for conid in conids_missing_timezones])
                           ))
 
-    # If only 1 timezone in data, use a faster method
-    if len(estimates.Timezone.unique()) == 1:
-        timezone = list(estimates.Timezone.unique())[0]
-        estimates["Date"] = pd.to_datetime(estimates.UpdatedDate.values).tz_localize("UTC").tz_convert(timezone)
-    else:
-        estimates["Date"] = estimates.apply(lambda row: row.UpdatedDate.tz_localize("UTC").tz_convert(row.Timezone), axis=1)
-
-    # Convert to dates (i.e. time = 00:00:00)
-    estimates.loc[:, "Date"] = pd.to_datetime(estimates.Date.apply(
-        lambda x: pd.datetime.combine(x, pd.Timestamp("00:00:00").time())))
+    # Convert each timezone's UpdatedDates at once, and cast to dates (i.e.
+    # time = 00:00:00)
+    updated_dates = pd.DatetimeIndex(estimates.UpdatedDate.values)
+    dates = np.empty(len(estimates), dtype="datetime64[ns]")
+    timezones = estimates.Timezone.astype(str)
+    for timezone, positions in timezones.groupby(timezones).indices.items():
+        dates[positions] = updated_dates[positions].tz_localize("UTC").tz_convert(
+            timezone).tz_localize(None).normalize().values
+    estimates["Date"] = dates
 
     # Drop any fields we don't need
     needed_fields = set(fields)
@@ -779,14 +1037,6 @@ def get_reuters_estimates_reindexed_like(reindex_like, codes, fields=["Actual"],
     # already converted above to the local timezone of the reported company)
     if reindex_like.index.tz:
         estimates.loc[:, "Date"] = estimates.Date.dt.tz_localize(reindex_like.index.tz.zone)
-        deduped_updated_dates = estimates.Date.drop_duplicates()
-    else:
-        # joining to tz-naive requires using values, whereas joining to
-        # tz-aware requires not using it. Why?
-        deduped_updated_dates = estimates.Date.drop_duplicates().values
-
-    # Create a unioned index of input DataFrame and UpdatedDate
-    union_date_idx = reindex_like.index.union(deduped_updated_dates).sort_values()
 
     all_estimates = {}
     for code in codes:
@@ -799,31 +1049,16 @@ def get_reuters_estimates_reindexed_like(reindex_like, codes, fields=["Actual"],
         # reports for several fiscal periods at once. In this case we keep
         # only the last value (i.e. latest fiscal period)
         estimates_for_code = estimates_for_code.drop_duplicates(subset=["ConId","Date"], keep="last")
-        estimates_for_code = estimates_for_code.pivot(index="ConId",columns="Date").T
-        multiidx = pd.MultiIndex.from_product(
-            (estimates_for_code.index.get_level_values(0).unique(), union_date_idx),
-            names=["Field", "Date"])
-        estimates_for_code = estimates_for_code.reindex(index=multiidx, columns=reindex_like.columns)
-
-        # estimates are sparse so ffill (one field at a time)
-        all_fields_for_code = {}
-        for field in estimates_for_code.index.get_level_values("Field").unique():
-            field_for_code = estimates_for_code.loc[field].fillna(method="ffill")
-
-            # Shift to avoid lookahead bias
-            if shift:
-                field_for_code = field_for_code.shift()
 
-            all_fields_for_code[field] = field_for_code
+        # estimates are sparse so use the latest available value as of each
+        # date (or as of the day before, to avoid lookahead bias)
+        all_fields_for_code = _reindex_events_like(
+            estimates_for_code, reindex_like.index, reindex_like.columns, strict=shift)
 
         # Filter stale values if asked to
         if max_lag:
-            fiscal_period_end_dates = all_fields_for_code["FiscalPeriodEndDate"]
-            # subtract the max_lag from the index date to get the
-            # earliest possible fiscal period end date for that row
-            earliest_allowed_fiscal_period_end_dates = fiscal_period_end_dates.apply(
-                lambda x: fiscal_period_end_dates.index - pd.Timedelta(max_lag))
-            within_max_timedelta = fiscal_period_end_dates.apply(pd.to_datetime) >= earliest_allowed_fiscal_period_end_dates
+            within_max_timedelta = _get_within_max_lag(
+                all_fields_for_code["FiscalPeriodEndDate"], max_lag)
 
             for field, field_for_code in all_fields_for_code.items():
                 field_for_code = field_for_code.where(within_max_timedelta)
@@ -835,15 +1070,9 @@ def get_reuters_estimates_reindexed_like(reindex_like, codes, fields=["Actual"],
 
         estimates_for_code = pd.concat(all_fields_for_code, names=["Field", "Date"])
 
-        # In cases the statements included dates not in the input
-        # DataFrame, drop those now that we've ffilled
-        extra_dates = union_date_idx.difference(reindex_like.index)
-        if not extra_dates.empty:
-            estimates_for_code.drop(extra_dates, axis=0, level="Date", inplace=True)
-
         # If not ffilling, mask any values that aren't the newest for that
-        # update (must be done after removing extra dates in case the
-        # UpdatedDate got dropped due to not being in reindex_like)
+        # update (this is done on the reindex_like dates in case the
+        # UpdatedDate isn't in reindex_like)
         if not ffill:
             are_new_updates = estimates_for_code.loc["UpdatedDateInt"].fillna(0).diff().abs() > 0
             estimates_for_code.drop("UpdatedDateInt", level="Field", inplace=True)
@@ -952,7 +1181,8 @@ def _cli_download_wsh_earnings_dates(*args, **kwargs):
     return json_to_cli(download_wsh_earnings_dates, *args, **kwargs)
 
 def get_wsh_earnings_dates_reindexed_like(reindex_like, fields=["Time"],
-                                          statuses=["Confirmed"]):
+                                          statuses=["Confirmed"], chunksize=None,
+                                          processes=None):
     """
     Return a multiindex (Field, Date) DataFrame of earnings announcement dates,
     reindexed to match the index (dates) and columns (conids) of `reindex_like`.
@@ -973,6 +1203,15 @@ def get_wsh_earnings_dates_reindexed_like(reindex_like, fields=["Time"],
         limit to these confirmation statuses. By default only confirmed
         announcements are returned. Possible choices: Confirmed, Unconfirmed.
 
+    chunksize : int, optional
+        process the conids in blocks of this many columns and combine the
+        results, to limit peak memory usage for large universes. Default is
+        to process all conids at once.
+
+    processes : int, optional
+        process the blocks concurrently in this many processes (requires
+        chunksize). Default is to process them one after another.
+
     Returns
     -------
     DataFrame
@@ -1012,24 +1251,27 @@ def get_wsh_earnings_dates_reindexed_like(reindex_like, fields=["Time"],
     >>> closes = closes.drop(next_session)
     >>> announces_before_next_open = announces_before_next_open.drop(next_session)
     """
+    _check_reindex_like(reindex_like)
+
+    return _get_wsh_earnings_dates_reindexed_like(reindex_like, fields=fields,
+        statuses=statuses, chunksize=chunksize, processes=processes)
+
+def _get_wsh_earnings_dates_reindexed_like(reindex_like, fields=["Time"],
+                                           statuses=["Confirmed"], chunksize=None,
+                                           processes=None):
+    """
+    Does the work of `get_wsh_earnings_dates_reindexed_like`, without validating
+    reindex_like.
+    """
     try:
         import pandas as pd
     except ImportError:
         raise ImportError("pandas must be installed to use this function")
 
-    index_levels = reindex_like.index.names
-    if "Time" in index_levels:
-        raise ParameterError(
-            "reindex_like should not have 'Time' in index, please take a cross-section first, "
-            "for example: `prices.loc['Close'].xs('15:45:00', level='Time')`")
-
-    if index_levels != ["Date"]:
-        raise ParameterError(
-            "reindex_like must have index called 'Date', but has {0}".format(
-                ",".join([str(name) for name in index_levels])))
-
-    if not hasattr(reindex_like.index, "date"):
-        raise ParameterError("reindex_like must have a DatetimeIndex")
+    if chunksize and len(reindex_like.columns) > chunksize:
+        return _get_reindexed_like_in_chunks(
+            _get_wsh_earnings_dates_reindexed_like, reindex_like, chunksize,
+            processes=processes, fields=fields, statuses=statuses)
 
     conids = list(reindex_like.columns)
     start_date = reindex_like.index.min().date()
@@ -1049,7 +1291,7 @@ def get_wsh_earnings_dates_reindexed_like(reindex_like, fields=["Time"],
     download_wsh_earnings_dates(
         f, conids=conids, start_date=start_date, end_date=end_date,
         fields=query_fields, statuses=statuses)
-    announcements = pd.read_csv(f, parse_dates=["Date", "LastUpdated"])
+    announcements = _read_csv(f, "fundamentals", parse_dates=["Date", "LastUpdated"])
 
     # if reindex_like.index is tz-aware, make announcements tz-aware too
     if reindex_like.index.tz:
@@ -1248,7 +1490,8 @@ def _cli_download_sharadar_fundamentals(*args, **kwargs):
     return json_to_cli(download_sharadar_fundamentals, *args, **kwargs)
 
 def get_sharadar_fundamentals_reindexed_like(reindex_like, domain, fields=None,
-                                             dimension="ART"):
+                                             dimension="ART", chunksize=None,
+                                             processes=None, incremental=False):
     """
     Return a multiindex (Field, Date) DataFrame of point-in-time
     Sharadar US Fundamentals, reindexed to match the index (dates)
@@ -1280,6 +1523,25 @@ def get_sharadar_fundamentals_reindexed_like(reindex_like, domain, fields=None,
         MRY, MRT. AR=As Reported, MR=Most Recent Reported, Q=Quarterly,
         Y=Annual, T=Trailing Twelve Month.
 
+    chunksize : int, optional
+        process the conids in blocks of this many columns and combine the
+        results, to limit peak memory usage for large universes. Default is
+        to process all conids at once.
+
+    processes : int, optional
+        process the blocks concurrently in this many processes (requires
+        chunksize). Default is to process them one after another.
+
+    incremental : bool
+        cache the result and the latest fundamentals for each conid in the
+        current process, and on subsequent calls with the same arguments and
+        a `reindex_like` that has grown by one or more dates, only query
+        fundamentals filed on or after the latest cached filing date and
+        compute the new dates. Intended for live trading, where the same
+        query is repeated daily. Fundamentals filed late with a DATEKEY
+        earlier than the latest cached DATEKEY are not picked up. Default
+        False.
+
     Returns
     -------
     DataFrame
@@ -1311,98 +1573,226 @@ def get_sharadar_fundamentals_reindexed_like(reindex_like, domain, fields=None,
                                                                 fields=["SHARESWA"])
     >>> shares_out = fundamentals.loc["SHARESWA"]
     """
+    _check_reindex_like(reindex_like)
+
+    return _get_sharadar_fundamentals_reindexed_like(reindex_like, domain=domain,
+        fields=fields, dimension=dimension, chunksize=chunksize,
+        processes=processes, incremental=incremental)
+
+def _get_sharadar_fundamentals_reindexed_like(reindex_like, domain, fields=None,
+                                              dimension="ART", chunksize=None,
+                                              processes=None, incremental=False):
+    """
+    Does the work of `get_sharadar_fundamentals_reindexed_like`, without validating
+    reindex_like.
+    """
     try:
         import pandas as pd
     except ImportError:
         raise ImportError("pandas must be installed to use this function")
 
-    index_levels = reindex_like.index.names
-    if "Time" in index_levels:
-        raise ParameterError(
-            "reindex_like should not have 'Time' in index, please take a cross-section first, "
-            "for example: `prices.loc['Close'].xs('15:45:00', level='Time')`")
+    if chunksize and len(reindex_like.columns) > chunksize:
+        return _get_reindexed_like_in_chunks(
+            _get_sharadar_fundamentals_reindexed_like, reindex_like, chunksize,
+            processes=processes, domain=domain, fields=fields, dimension=dimension,
+            incremental=incremental)
 
-    if index_levels != ["Date"]:
-        raise ParameterError(
-            "reindex_like must have index called 'Date', but has {0}".format(
-                ",".join([str(name) for name in index_levels])))
+    if fields and not isinstance(fields, (list,tuple)):
+        fields = [fields]
 
-    if not hasattr(reindex_like.index, "date"):
-        raise ParameterError("reindex_like must have a DatetimeIndex")
+    if incremental:
+        all_fields = _get_sharadar_fundamentals_incrementally(
+            reindex_like, domain, fields, dimension)
+    else:
+        start_date = reindex_like.index.min().date()
+        # Since financial reports are sparse, start well before the reindex_like
+        # min date
+        start_date -= pd.Timedelta(days=365+180)
+        financials = _get_sharadar_fundamentals_events(
+            reindex_like, domain, fields, dimension, start_date)
+
+        # financial values are sparse so use the latest available value as of
+        # the day before each date (to avoid lookahead bias)
+        all_fields = _reindex_events_like(
+            financials, reindex_like.index, reindex_like.columns, strict=True)
+
+    financials = pd.concat(all_fields, names=["Field", "Date"])
+
+    return financials
+
+def _get_sharadar_fundamentals_events(reindex_like, domain, fields, dimension, start_date):
+    """
+    Downloads Sharadar fundamentals for the conids in reindex_like, filed
+    from start_date through the reindex_like max date, and returns them as
+    events for _reindex_events_like.
+    """
+    import pandas as pd
 
     conids = list(reindex_like.columns)
-    start_date = reindex_like.index.min().date()
-    # Since financial reports are sparse, start well before the reindex_like
-    # min date
-    start_date -= pd.Timedelta(days=365+180)
     start_date = start_date.isoformat()
     end_date = reindex_like.index.max().date().isoformat()
 
-    if fields and not isinstance(fields, (list,tuple)):
-        fields = [fields]
-
     f = six.StringIO()
     download_sharadar_fundamentals(
         domain=domain, filepath_or_buffer=f, conids=conids, start_date=start_date, end_date=end_date,
         fields=fields, dimensions=dimension)
-    financials = pd.read_csv(
-        f, parse_dates=["DATEKEY","REPORTPERIOD"])
+    # Only load the fields we need
+    needed_fields = None
+    parse_dates = ["DATEKEY","REPORTPERIOD"]
+    if fields:
+        needed_fields = set(fields)
+        needed_fields.update(set(("ConId", "DATEKEY")))
+        parse_dates = [field for field in parse_dates if field in needed_fields]
+    financials = _read_csv(
+        f, "fundamentals", usecols=needed_fields, parse_dates=parse_dates)
 
     # Rename DATEKEY to match price history index name
     financials = financials.rename(columns={"DATEKEY": "Date"})
 
-    # Drop any fields we don't need
-    if fields:
-        needed_fields = set(fields)
-        needed_fields.update(set(("ConId", "Date")))
-        unneeded_fields = set(financials.columns) - needed_fields
-        if unneeded_fields:
-            financials = financials.drop(unneeded_fields, axis=1)
-
     # if reindex_like.index is tz-aware, make financials tz-aware so they can
     # be joined (tz-aware or tz-naive are both fine, as DATEKEY represents
     # dates which are assumed to be in the local timezone of the reported
     # company)
     if reindex_like.index.tz:
         financials.loc[:, "Date"] = financials.Date.dt.tz_localize(reindex_like.index.tz.zone)
-        deduped_datekeys = financials.Date.drop_duplicates()
-    else:
-        # joining to tz-naive requires using values, whereas joining to
-        # tz-aware requires not using it. Why?
-        deduped_datekeys = financials.Date.drop_duplicates().values
-
-    # Create a unioned index of input DataFrame and statement DATEKEYs
-    union_date_idx = reindex_like.index.union(deduped_datekeys).sort_values()
 
     # There might be duplicate DATEKEYs if a company announced
     # reports for several fiscal periods at once. In this case we keep
     # only the last value (i.e. latest fiscal period)
     financials = financials.drop_duplicates(subset=["ConId", "Date"], keep="last")
-    financials = financials.pivot(index="ConId",columns="Date").T
-    multiidx = pd.MultiIndex.from_product(
-        (financials.index.get_level_values(0).unique(), union_date_idx),
-        names=["Field", "Date"])
-    financials = financials.reindex(index=multiidx, columns=reindex_like.columns)
 
-    # financial values are sparse so ffill (one field at a time)
-    all_fields = {}
-    for fieldname in financials.index.get_level_values("Field").unique():
-        field = financials.loc[fieldname].fillna(method="ffill")
+    return financials
 
-        # Shift to avoid lookahead bias
-        field = field.shift()
+# Results and as-of state of incremental Sharadar queries, keyed by query
+_sharadar_incremental_cache = collections.OrderedDict()
+_sharadar_incremental_cache_lock = threading.Lock()
+SHARADAR_INCREMENTAL_CACHE_SIZE = 4
 
-        all_fields[fieldname] = field
+def _get_sharadar_fundamentals_incrementally(reindex_like, domain, fields, dimension):
+    """
+    Returns a dict of field: DataFrame of Sharadar fundamentals shaped like
+    reindex_like, computing only the dates after those of the cached result
+    of the previous call for the same query, if possible.
+
+    The cache holds the previous result, the fundamentals filed before the
+    latest cached filing date (the watermark), and, for each field and
+    conid, the latest value filed before the watermark (the state).
+    Fundamentals filed on or after the watermark are queried again, so
+    combined with the state they give the same result as querying the full
+    history. Fundamentals filed before the start of the lookback window
+    (which moves with the reindex_like min date) are dropped, and cached
+    values which only came from them are cleared.
+    """
+    import numpy as np
+    import pandas as pd
 
-    financials = pd.concat(all_fields, names=["Field", "Date"])
+    key = (os.environ.get("HOUSTON_URL"), domain, dimension,
+           tuple(fields) if fields else None, str(reindex_like.index.tz),
+           tuple(reindex_like.columns))
 
-    # In cases the statements included dates not in the input
-    # DataFrame, drop those now that we've ffilled
-    extra_dates = union_date_idx.difference(reindex_like.index)
-    if not extra_dates.empty:
-        financials.drop(extra_dates, axis=0, level="Date", inplace=True)
+    with _sharadar_incremental_cache_lock:
+        cached = _sharadar_incremental_cache.get(key, None)
 
-    return financials
+    index = reindex_like.index
+    # Since financial reports are sparse, start well before the reindex_like
+    # min date
+    start_date = index.min().date() - pd.Timedelta(days=365+180)
+    lookback_start = pd.Timestamp(start_date)
+    if index.tz:
+        lookback_start = lookback_start.tz_localize(index.tz.zone)
+
+    is_cache_hit = False
+    if cached is not None and cached["watermark"] is not None:
+        max_cached_date = cached["index"].max()
+        old_dates = index[index <= max_cached_date]
+        # the old dates must all have been computed before
+        is_cache_hit = (cached["index"].get_indexer(old_dates) >= 0).all()
+
+    if is_cache_hit:
+        new_dates = index[index > max_cached_date]
+        try:
+            new_financials = _get_sharadar_fundamentals_events(
+                reindex_like, domain, fields, dimension, cached["watermark"].date())
+        except NoFundamentalData:
+            new_financials = cached["events"].iloc[0:0]
+
+        columns = cached["events"].columns
+        financials = pd.concat(
+            [cached["events"], new_financials], ignore_index=True, sort=False)[columns]
+        financials = financials.loc[financials.Date >= lookback_start]
+        state = cached["state"].loc[cached["state"].Date >= lookback_start]
+
+        new_fields = _reindex_events_like(
+            pd.concat([state, new_financials], ignore_index=True, sort=False)[columns],
+            new_dates, reindex_like.columns, strict=True)
+
+        old_dates_i8 = pd.DatetimeIndex(old_dates).asi8
+        all_fields = {}
+        for field, field_values in cached["fields"].items():
+            old_values = field_values.reindex(old_dates)
+            if lookback_start > cached["lookback_start"]:
+                # clear values which were only filed before the lookback
+                # window, that is, on dates no later than the conid's
+                # first filing in the window
+                first_dates = financials.loc[
+                    financials[field].notnull()].groupby("ConId").Date.min()
+                first_dates = pd.DatetimeIndex(
+                    first_dates.reindex(reindex_like.columns)).asi8.copy()
+                first_dates[first_dates == pd.NaT.value] = np.iinfo(np.int64).max
+                expiring = np.flatnonzero(first_dates >= old_dates_i8.min()) if len(old_dates) else []
+                if len(expiring):
+                    is_expired = old_dates_i8[:, None] <= first_dates[None, expiring]
+                    values = old_values.values
+                    if values.dtype.kind in ("i", "u"):
+                        values = values.astype(np.float64)
+                    elif values.dtype.kind == "b":
+                        values = values.astype(object)
+                    else:
+                        values = values.copy()
+                    fill_value = np.datetime64("NaT") if values.dtype.kind == "M" else np.nan
+                    values[:, expiring] = np.where(is_expired, fill_value, values[:, expiring])
+                    old_values = pd.DataFrame(
+                        values, index=old_values.index, columns=old_values.columns)
+            all_fields[field] = pd.concat([old_values, new_fields[field]])
+            all_fields[field].index = index
+    else:
+        financials = _get_sharadar_fundamentals_events(
+            reindex_like, domain, fields, dimension, start_date)
+
+        all_fields = _reindex_events_like(
+            financials, index, reindex_like.columns, strict=True)
+
+    # Keep the fundamentals filed before the watermark, and the latest value
+    # of each field for each conid among them; anything filed on or after
+    # the watermark is queried again next time
+    watermark = financials.Date.max() if not financials.empty else None
+    events = state = financials.iloc[0:0]
+    if watermark is not None:
+        events = financials.loc[financials.Date < watermark].sort_values(
+            "Date", kind="mergesort")
+        state_fields = []
+        for field in financials.columns:
+            if field in ("ConId", "Date"):
+                continue
+            state_fields.append(
+                events.loc[events[field].notnull(), ["ConId", "Date", field]]
+                .drop_duplicates(subset=["ConId"], keep="last"))
+        state = pd.concat([state] + state_fields, ignore_index=True, sort=False)[financials.columns]
+
+    with _sharadar_incremental_cache_lock:
+        _sharadar_incremental_cache.pop(key, None)
+        _sharadar_incremental_cache[key] = {
+            "index": index,
+            "fields": all_fields,
+            "events": events,
+            "state": state,
+            "watermark": watermark,
+            "lookback_start": lookback_start,
+        }
+        while len(_sharadar_incremental_cache) > SHARADAR_INCREMENTAL_CACHE_SIZE:
+            _sharadar_incremental_cache.popitem(last=False)
+
+    return all_fields
 
 def collect_shortable_shares(countries=None):
     """
@@ -1633,7 +2023,8 @@ def _cli_download_borrow_fees(*args, **kwargs):
     return json_to_cli(download_borrow_fees, *args, **kwargs)
 
 def _get_stockloan_data_reindexed_like(stockloan_func, stockloan_field, reindex_like,
-                                       time=None):
+                                       time=None, chunksize=None, processes=None,
+                                       security_timezones=None):
     """
     Common base function for get_shortable_shares_reindexed_like and
     get_borrow_fees_reindexed_like.
@@ -1643,19 +2034,30 @@ def _get_stockloan_data_reindexed_like(stockloan_func, stockloan_field, reindex_
     except ImportError:
         raise ImportError("pandas must be installed to use this function")
 
-    index_levels = reindex_like.index.names
-    if "Time" in index_levels:
-        raise ParameterError(
-            "reindex_like should not have 'Time' in index, please take a cross-section first, "
-            "for example: `prices.loc['Close'].xs('15:45:00', level='Time')`")
-
-    if index_levels != ["Date"]:
-        raise ParameterError(
-            "reindex_like must have index called 'Date', but has {0}".format(
-                ",".join([str(name) for name in index_levels])))
-
-    if not hasattr(reindex_like.index, "date"):
-        raise ParameterError("reindex_like must have a DatetimeIndex")
+    if chunksize and len(reindex_like.columns) > chunksize:
+        chunked_reindex_like = reindex_like
+        if not reindex_like.index.tz and not (time and " " in time):
+            # infer the timezone from all the conids so that each chunk uses
+            # the same one
+            security_timezones = _get_security_timezones(
+                list(reindex_like.columns), prefetched_timezones=security_timezones)
+            security_timezones = list(security_timezones.Timezone.unique())
+            if len(security_timezones) > 1:
+                raise ParameterError(
+                    "no timezone specified and cannot infer because multiple timezones are "
+                    "present in data, please specify timezone (timezones in data: {0})".format(
+                    ", ".join(security_timezones)))
+            if time:
+                time = "{0} {1}".format(time, security_timezones[0])
+            else:
+                chunked_reindex_like = reindex_like.tz_localize(security_timezones[0])
+
+        stockloan_data = _get_reindexed_like_in_chunks(
+            _get_stockloan_data_reindexed_like, chunked_reindex_like, chunksize,
+            processes=processes, stockloan_func=stockloan_func,
+            stockloan_field=stockloan_field, time=time)
+        stockloan_data.index = reindex_like.index
+        return stockloan_data
 
     conids = list(reindex_like.columns)
     start_date = reindex_like.index.min().date()
@@ -1668,7 +2070,7 @@ def _get_stockloan_data_reindexed_like(stockloan_func, stockloan_field, reindex_
     f = six.StringIO()
     stockloan_func(
         f, conids=conids, start_date=start_date, end_date=end_date)
-    stockloan_data = pd.read_csv(f)
+    stockloan_data = _read_csv(f, "fundamentals")
     stockloan_data.loc[:, "Date"] = pd.to_datetime(stockloan_data.Date, utc=True)
 
     # Determine timezone, from:
@@ -1690,10 +2092,8 @@ def _get_stockloan_data_reindexed_like(stockloan_func, stockloan_field, reindex_
             timezone = reindex_like.index.tz.zone
         else:
             # try to infer from component securities
-            f = six.StringIO()
-            download_master_file(f, conids=list(stockloan_data.ConId.unique()),
-                                 fields=["Timezone"])
-            security_timezones = pd.read_csv(f, index_col="ConId")
+            security_timezones = _get_security_timezones(
+                list(stockloan_data.ConId.unique()), prefetched_timezones=security_timezones)
             security_timezones = list(security_timezones.Timezone.unique())
             if len(security_timezones) > 1:
                 raise ParameterError(
@@ -1709,8 +2109,14 @@ def _get_stockloan_data_reindexed_like(stockloan_func, stockloan_field, reindex_
         except ValueError as e:
             raise ParameterError("could not parse time '{0}': {1}".format(
                 time, str(e)))
-        index_at_time = pd.Index(reindex_like.index.to_series().apply(
-            lambda x: pd.datetime.combine(x, time)))
+        # Use wall-clock dates so that the time is the same local time on
+        # either side of DST transitions
+        index_at_time = reindex_like.index
+        if index_at_time.tz:
+            index_at_time = index_at_time.tz_localize(None)
+        index_at_time = index_at_time.normalize() + pd.Timedelta(
+            hours=time.hour, minutes=time.minute, seconds=time.second,
+            microseconds=time.microsecond)
     else:
         index_at_time = reindex_like.index
 
@@ -1719,20 +2125,10 @@ def _get_stockloan_data_reindexed_like(stockloan_func, stockloan_field, reindex_
 
     index_at_time = index_at_time.tz_convert("UTC")
 
-    stockloan_data = stockloan_data.pivot(index="ConId",columns="Date").T
-    stockloan_data = stockloan_data.loc[stockloan_field]
-
-    # Create a unioned index of requested times and stockloan data timestamps
-    unioned_idx = index_at_time.union(stockloan_data.index)
-    # performance boost: don't need to reindex and ffill earlier than the
-    # stockloan data start date
-    unioned_idx = unioned_idx[unioned_idx >= stockloan_data.index.min()]
-    stockloan_data = stockloan_data.reindex(index=unioned_idx, columns=reindex_like.columns)
-
-    stockloan_data = stockloan_data.fillna(method="ffill")
-
-    # Keep only the requested times, now that we've ffilled
-    stockloan_data = stockloan_data.reindex(index=index_at_time)
+    # Use the latest available value as of each requested time
+    stockloan_data = _reindex_events_like(
+        stockloan_data[["ConId", "Date", stockloan_field]],
+        index_at_time, reindex_like.columns)[stockloan_field]
 
     # Replace index_at_time with the original reindex_like index (this needs
     # to be done because index_at_time is tz-aware and reindex_like may not
@@ -1743,7 +2139,8 @@ def _get_stockloan_data_reindexed_like(stockloan_func, stockloan_field, reindex_
 
     return stockloan_data
 
-def get_shortable_shares_reindexed_like(reindex_like, time=None):
+def get_shortable_shares_reindexed_like(reindex_like, time=None, chunksize=None,
+                                        processes=None):
     """
     Return a DataFrame of shortable shares, reindexed to match the index
     (dates) and columns (conids) of `reindex_like`.
@@ -1767,6 +2164,15 @@ def get_shortable_shares_reindexed_like(reindex_like, time=None):
         will be inferred from the component securities, if all securities
         share the same timezone.
 
+    chunksize : int, optional
+        process the conids in blocks of this many columns and combine the
+        results, to limit peak memory usage for large universes. Default is
+        to process all conids at once.
+
+    processes : int, optional
+        process the blocks concurrently in this many processes (requires
+        chunksize). Default is to process them one after another.
+
     Returns
     -------
     DataFrame
@@ -1791,9 +2197,21 @@ def get_shortable_shares_reindexed_like(reindex_like, time=None):
     >>> closes = prices.loc["Close"]
     >>> shortables = get_shortable_shares_reindexed_like(closes, time="09:20:00 America/New_York")
     """
+    _check_reindex_like(reindex_like)
+
+    return _get_shortable_shares_reindexed_like(reindex_like, time=time, chunksize=chunksize,
+        processes=processes)
+
+def _get_shortable_shares_reindexed_like(reindex_like, time=None, chunksize=None, processes=None,
+                                         security_timezones=None):
+    """
+    Does the work of `get_shortable_shares_reindexed_like`, without validating
+    reindex_like.
+    """
     shortable_shares = _get_stockloan_data_reindexed_like(
         download_shortable_shares, "Quantity",
-        reindex_like=reindex_like, time=time)
+        reindex_like=reindex_like, time=time, chunksize=chunksize,
+        processes=processes, security_timezones=security_timezones)
 
     # fillna(0) where date > 2018-04-15, the data start date (NaNs after that
     # date indicate no shortable shares, NaNs before that date indicate don't
@@ -1805,7 +2223,8 @@ def get_shortable_shares_reindexed_like(reindex_like, time=None):
 
     return shortable_shares
 
-def get_borrow_fees_reindexed_like(reindex_like, time=None):
+def get_borrow_fees_reindexed_like(reindex_like, time=None, chunksize=None,
+                                    processes=None):
     """
     Return a DataFrame of borrow fees, reindexed to match the index
     (dates) and columns (conids) of `reindex_like`.
@@ -1829,6 +2248,15 @@ def get_borrow_fees_reindexed_like(reindex_like, time=None):
         will be inferred from the component securities, if all securities
         share the same timezone.
 
+    chunksize : int, optional
+        process the conids in blocks of this many columns and combine the
+        results, to limit peak memory usage for large universes. Default is
+        to process all conids at once.
+
+    processes : int, optional
+        process the blocks concurrently in this many processes (requires
+        chunksize). Default is to process them one after another.
+
     Returns
     -------
     DataFrame
@@ -1853,9 +2281,21 @@ def get_borrow_fees_reindexed_like(reindex_like, time=None):
     >>> closes = prices.loc["Close"]
     >>> borrow_fees = get_borrow_fees_reindexed_like(closes, time="16:30:00 America/New_York")
     """
+    _check_reindex_like(reindex_like)
+
+    return _get_borrow_fees_reindexed_like(reindex_like, time=time, chunksize=chunksize,
+        processes=processes)
+
+def _get_borrow_fees_reindexed_like(reindex_like, time=None, chunksize=None, processes=None,
+                                    security_timezones=None):
+    """
+    Does the work of `get_borrow_fees_reindexed_like`, without validating
+    reindex_like.
+    """
     return _get_stockloan_data_reindexed_like(
         download_borrow_fees, "FeeRate",
-        reindex_like=reindex_like, time=time)
+        reindex_like=reindex_like, time=time, chunksize=chunksize,
+        processes=processes, security_timezones=security_timezones)
 
 @deprecated_replaced_by(collect_reuters_financials)
 def fetch_reuters_financials(*args, **kwargs):
@@ -1884,3 +2324,99 @@ def fetch_reuters_estimates(*args, **kwargs):
 @deprecated_replaced_by("collect-estimates", old_name="fetch-estimates")
 def _cli_fetch_reuters_estimates(*args, **kwargs):
     return json_to_cli(collect_reuters_estimates, *args, **kwargs)
+
+def get_reindexed_like_bundle(reindex_like, datasets, max_workers=None):
+    """
+    Return several datasets reindexed to match the index (dates) and columns
+    (conids) of `reindex_like`, loading them concurrently.
+
+    Compared to calling each `get_*_reindexed_like` function in turn, the
+    datasets are downloaded in parallel and security timezones (needed for
+    estimates and, if the timezone isn't otherwise known, stockloan data) are
+    looked up once for all datasets.
+
+    Parameters
+    ----------
+    reindex_like : DataFrame, required
+        a DataFrame (usually of prices) with dates for the index and conids
+        for the columns, to which the shape of the resulting DataFrames will
+        be conformed
+
+    datasets : dict, required
+        dict of name: dataset spec. Each spec is a dict with a "dataset" key
+        and any other keys are passed as keyword arguments to the function
+        that loads the dataset. Possible datasets: reuters_financials
+        (`get_reuters_financials_reindexed_like`), reuters_estimates
+        (`get_reuters_estimates_reindexed_like`), wsh_earnings_dates
+        (`get_wsh_earnings_dates_reindexed_like`), sharadar_fundamentals
+        (`get_sharadar_fundamentals_reindexed_like`), shortable_shares
+        (`get_shortable_shares_reindexed_like`), borrow_fees
+        (`get_borrow_fees_reindexed_like`), securities
+        (`quantrocket.master.get_securities_reindexed_like`)
+
+    max_workers : int, optional
+        maximum number of datasets to load at once (default is to load them
+        all at once)
+
+    Returns
+    -------
+    dict
+        dict of name: DataFrame
+
+    Examples
+    --------
+    Load financials, estimates, shortable shares, and securities master data
+    for a DataFrame of historical prices:
+
+    >>> closes = prices.loc["Close"]
+    >>> data = get_reindexed_like_bundle(closes, {
+            "financials": {"dataset": "reuters_financials", "coa_codes": ["ATOT", "LTLL"]},
+            "estimates": {"dataset": "reuters_estimates", "codes": ["EPS"]},
+            "shortable_shares": {"dataset": "shortable_shares", "time": "09:20:00"},
+            "securities": {"dataset": "securities", "domain": "main", "fields": ["PrimaryExchange"]},
+        })
+    >>> tot_assets = data["financials"].loc["ATOT"].loc["Amount"]
+    >>> shortable_shares = data["shortable_shares"]
+    """
+    funcs = {
+        "reuters_financials": _get_reuters_financials_reindexed_like,
+        "reuters_estimates": _get_reuters_estimates_reindexed_like,
+        "wsh_earnings_dates": _get_wsh_earnings_dates_reindexed_like,
+        "sharadar_fundamentals": _get_sharadar_fundamentals_reindexed_like,
+        "shortable_shares": _get_shortable_shares_reindexed_like,
+        "borrow_fees": _get_borrow_fees_reindexed_like,
+        "securities": get_securities_reindexed_like,
+    }
+
+    _check_reindex_like(reindex_like)
+
+    items = []
+    for name, spec in datasets.items():
+        spec = dict(spec)
+        dataset = spec.pop("dataset", None)
+        if dataset not in funcs:
+            raise ParameterError(
+                "invalid dataset for {0}: {1} (possible choices: {2})".format(
+                    name, dataset, ", ".join(sorted(funcs))))
+        items.append((name, funcs[dataset], spec))
+
+    # Look up timezones once if more than one dataset may need them
+    needs_timezones = [
+        name for name, func, kwargs in items
+        if func is _get_reuters_estimates_reindexed_like
+        or (func in (_get_shortable_shares_reindexed_like, _get_borrow_fees_reindexed_like)
+            and not reindex_like.index.tz and " " not in (kwargs.get("time", None) or ""))]
+
+    if len(needs_timezones) > 1:
+        timezones = _get_security_timezones(list(reindex_like.columns))
+        items = [
+            (name, func, dict(kwargs, security_timezones=timezones)
+             if name in needs_timezones else kwargs)
+            for name, func, kwargs in items]
+
+    results = _map_in_threads(
+        lambda item: item[1](reindex_like, **item[2]),
+        items,
+        max_workers=max_workers or len(items))
+
+    return dict(zip([name for name, func, kwargs in items], results))
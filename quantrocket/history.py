@@ -13,18 +13,32 @@
 # limitations under the License.
 
 import six
+import io
 import os
 import sys
+import time
+import shutil
+import tempfile
 import requests
 from quantrocket.houston import houston
 from quantrocket.cli.utils.output import json_to_cli
 from quantrocket.cli.utils.stream import to_bytes
-from quantrocket.cli.utils.files import write_response_to_filepath_or_buffer
-from quantrocket.exceptions import NoHistoricalData
+from quantrocket.cli.utils.files import write_response_to_filepath_or_buffer, _get_buffer_mode
+from quantrocket.exceptions import NoHistoricalData, ParameterError
 from quantrocket.utils.warn import deprecated_replaced_by
+from quantrocket.utils.dt import segmented_date_range
+from quantrocket.utils.threads import _map_in_threads
+from quantrocket.utils.formats import BINARY_OUTPUTS, _get_with_output_fallback
+from quantrocket.utils.cache import cache_metadata, invalidates_metadata
 
 TMP_DIR = os.environ.get("QUANTROCKET_TMP_DIR", "/tmp")
 
+# Segmented downloads retry each segment up to this many times (waiting a
+# little longer after each failure) if the connection drops or times out
+SEGMENT_DOWNLOAD_ATTEMPTS = int(os.environ.get("QUANTROCKET_HISTORY_SEGMENT_ATTEMPTS", 3))
+SEGMENT_RETRY_DELAY = 2
+
+@invalidates_metadata("history.databases")
 def create_db(code, universes=None, conids=None, start_date=None, end_date=None,
               vendor=None, bar_size=None, bar_type=None, outside_rth=False,
               primary_exchange=False, times=None, between_times=None,
@@ -159,6 +173,7 @@ def create_db(code, universes=None, conids=None, start_date=None, end_date=None,
 def _cli_create_db(*args, **kwargs):
     return json_to_cli(create_db, *args, **kwargs)
 
+@cache_metadata("history.databases")
 def get_db_config(code):
     """
     Return the configuration for a history database.
@@ -181,6 +196,7 @@ def get_db_config(code):
 def _cli_get_db_config(*args, **kwargs):
     return json_to_cli(get_db_config, *args, **kwargs)
 
+@invalidates_metadata("history.databases")
 def drop_db(code, confirm_by_typing_db_code_again=None):
     """
     Delete a history database.
@@ -208,6 +224,7 @@ def drop_db(code, confirm_by_typing_db_code_again=None):
 def _cli_drop_db(*args, **kwargs):
     return json_to_cli(drop_db, *args, **kwargs)
 
+@cache_metadata("history.databases")
 def list_databases():
     """
     List history databases.
@@ -266,6 +283,22 @@ def collect_history(codes, priority=False, conids=None, universes=None,
     dict
         status message
 
+    """
+    params = _get_collect_history_params(codes=codes, priority=priority, conids=conids,
+                                         universes=universes, start_date=start_date,
+                                         end_date=end_date,
+                                         availability_only=availability_only,
+                                         delist_missing=delist_missing)
+    response = houston.post("/history/queue", params=params)
+
+    houston.raise_for_status_with_json(response)
+    return response.json()
+
+def _get_collect_history_params(codes, priority=False, conids=None, universes=None,
+                                start_date=None, end_date=None,
+                                availability_only=False, delist_missing=False):
+    """
+    Returns the query params for `collect_history`.
     """
     params = {}
     if codes:
@@ -284,10 +317,7 @@ def collect_history(codes, priority=False, conids=None, universes=None,
         params["availability_only"] = availability_only
     if delist_missing:
         params["delist_missing"] = delist_missing
-    response = houston.post("/history/queue", params=params)
-
-    houston.raise_for_status_with_json(response)
-    return response.json()
+    return params
 
 def _cli_collect_history(*args, **kwargs):
     return json_to_cli(collect_history, *args, **kwargs)
@@ -461,7 +491,8 @@ def download_history_file(code, filepath_or_buffer=None, output="csv",
                           start_date=None, end_date=None,
                           universes=None, conids=None,
                           exclude_universes=None, exclude_conids=None,
-                          times=None, cont_fut=None, fields=None, tz_naive=False):
+                          times=None, cont_fut=None, fields=None, tz_naive=False,
+                          segment=None, conid_batch_size=None, max_workers=None):
     """
     Query historical market data from a history database and download to file.
 
@@ -474,7 +505,10 @@ def download_history_file(code, filepath_or_buffer=None, output="csv",
         filepath to write the data to, or file-like object (defaults to stdout)
 
     output : str
-        output format (json, csv, txt, default is csv)
+        output format (json, csv, txt, arrow, parquet, default is csv). The
+        binary formats (arrow, parquet) require a filepath or binary buffer
+        and fall back to csv, with a warning, if the history service doesn't
+        support them
 
     start_date : str (YYYY-MM-DD), optional
         limit to history on or after this date
@@ -509,6 +543,21 @@ def download_history_file(code, filepath_or_buffer=None, output="csv",
         return timestamps without UTC offsets: 2018-02-01T10:00:00 (default is to
         include UTC offsets: 2018-02-01T10:00:00-4000)
 
+    segment : str, optional
+        split the query into date segments of this size and download them
+        separately (use Pandas frequency string, e.g. 'A' for annual segments
+        or 'Q' for quarterly segments). Requires start_date and end_date.
+        Segmented downloads are only supported for CSV output.
+
+    conid_batch_size : int, optional
+        split the query into batches of this many conids and download them
+        separately. Requires conids. Batched downloads are only supported for
+        CSV output.
+
+    max_workers : int, optional
+        download segments or batches concurrently using up to this many
+        threads (default is to download them one after another)
+
     Returns
     -------
     None
@@ -521,10 +570,63 @@ def download_history_file(code, filepath_or_buffer=None, output="csv",
     >>> download_history_file("my-db", f)
     >>> history = pd.read_csv(f, parse_dates=["Date"])
 
+    Download a long history of minute bars in quarterly segments, 4 at a time.
+    Each segment is retried on its own if the connection drops, and the
+    segments are combined in date order:
+
+    >>> download_history_file("usa-stk-1min", "usa-stk-1min.csv",
+                              start_date="2005-01-01", end_date="2019-12-31",
+                              segment="Q", max_workers=4)
+
     See Also
     --------
     quantrocket.get_prices : load prices into a DataFrame
     """
+    params = _get_history_file_params(start_date=start_date, end_date=end_date,
+                                      universes=universes, conids=conids,
+                                      exclude_universes=exclude_universes,
+                                      exclude_conids=exclude_conids, times=times,
+                                      cont_fut=cont_fut, fields=fields,
+                                      tz_naive=tz_naive)
+
+    output = output or "csv"
+
+    if output not in ("csv", "json", "txt") + BINARY_OUTPUTS:
+        raise ValueError("Invalid ouput: {0}".format(output))
+
+    if segment or conid_batch_size:
+        if output != "csv":
+            raise ParameterError(
+                "segment and conid_batch_size are only supported for csv output")
+
+        _download_history_file_in_segments(
+            code, filepath_or_buffer or sys.stdout, params,
+            segment=segment, conid_batch_size=conid_batch_size,
+            max_workers=max_workers)
+        return
+
+    response, output = _get_with_output_fallback(
+        "history", "/history/" + code + ".{output}", output, params=params,
+        timeout=60*30, stream=True)
+
+    try:
+        houston.raise_for_status_with_json(response)
+    except requests.HTTPError as e:
+        # Raise a dedicated exception
+        if "no history matches the query parameters" in repr(e).lower():
+            raise NoHistoricalData(e)
+        raise
+
+    filepath_or_buffer = filepath_or_buffer or sys.stdout
+
+    write_response_to_filepath_or_buffer(filepath_or_buffer, response)
+
+def _get_history_file_params(start_date=None, end_date=None, universes=None,
+                             conids=None, exclude_universes=None, exclude_conids=None,
+                             times=None, cont_fut=None, fields=None, tz_naive=False):
+    """
+    Returns the query params for `download_history_file`.
+    """
     params = {}
     if start_date:
         params["start_date"] = start_date
@@ -546,26 +648,159 @@ def download_history_file(code, filepath_or_buffer=None, output="csv",
         params["fields"] = fields
     if tz_naive:
         params["tz_naive"] = tz_naive
+    return params
 
-    output = output or "csv"
+def _download_history_file_in_segments(code, filepath_or_buffer, params,
+                                       segment=None, conid_batch_size=None,
+                                       max_workers=None):
+    """
+    Downloads the query in date segments and/or conid batches to temp files,
+    then stitches them together in order (date segment, then conid batch) and
+    writes the result to the filepath or buffer.
+    """
+    all_segment_params = _get_segment_params(
+        params, segment=segment, conid_batch_size=conid_batch_size)
+
+    tmp_filepaths = []
+    no_data_errors = []
+
+    def _download_segment(segment_params):
+        fd, tmp_filepath = tempfile.mkstemp(
+            dir=TMP_DIR, prefix="history.{0}.".format(code), suffix=".csv")
+        os.close(fd)
+        tmp_filepaths.append(tmp_filepath)
+        try:
+            _download_history_segment(code, segment_params, tmp_filepath)
+        except NoHistoricalData as e:
+            # some segments may legitimately be empty; only complain if
+            # they all are
+            no_data_errors.append(e)
+            return None
+        return tmp_filepath
 
-    if output not in ("csv", "json", "txt"):
-        raise ValueError("Invalid ouput: {0}".format(output))
+    try:
+        segment_filepaths = _map_in_threads(
+            _download_segment, all_segment_params, max_workers=max_workers)
+        segment_filepaths = [f for f in segment_filepaths if f]
 
-    response = houston.get("/history/{0}.{1}".format(code, output), params=params,
-                           timeout=60*30)
+        if not segment_filepaths:
+            raise no_data_errors[0]
 
-    try:
-        houston.raise_for_status_with_json(response)
-    except requests.HTTPError as e:
-        # Raise a dedicated exception
-        if "no history matches the query parameters" in repr(e).lower():
-            raise NoHistoricalData(e)
-        raise
+        _write_csv_files_to_filepath_or_buffer(segment_filepaths, filepath_or_buffer)
+    finally:
+        for tmp_filepath in tmp_filepaths:
+            if os.path.exists(tmp_filepath):
+                os.remove(tmp_filepath)
 
-    filepath_or_buffer = filepath_or_buffer or sys.stdout
+def _get_segment_params(params, segment=None, conid_batch_size=None):
+    """
+    Returns the query params of each date segment and conid batch, in the
+    order in which they should be stitched together.
+    """
+    start_date = params.get("start_date")
+    end_date = params.get("end_date")
+    date_ranges = [(start_date, end_date)]
+    if segment:
+        if not start_date or not end_date:
+            raise ParameterError("start_date and end_date are required when using segment")
+        date_ranges = segmented_date_range(start_date, end_date, segment=segment)
+
+    conid_batches = [params.get("conids")]
+    if conid_batch_size:
+        if not params.get("conids"):
+            raise ParameterError("conids are required when using conid_batch_size")
+        conids = list(params["conids"])
+        conid_batches = [conids[i:i+conid_batch_size]
+                         for i in range(0, len(conids), conid_batch_size)]
+
+    all_segment_params = []
+    for start_date, end_date in date_ranges:
+        for conids in conid_batches:
+            segment_params = params.copy()
+            segment_params.pop("start_date", None)
+            segment_params.pop("end_date", None)
+            segment_params.pop("conids", None)
+            if start_date:
+                segment_params["start_date"] = start_date
+            if end_date:
+                segment_params["end_date"] = end_date
+            if conids:
+                segment_params["conids"] = conids
+            all_segment_params.append(segment_params)
+
+    return all_segment_params
+
+def _download_history_segment(code, params, filepath):
+    """
+    Downloads one segment of a segmented query to a file, retrying if the
+    connection drops, times out, or houston is temporarily unavailable.
+    """
+    for attempt in range(1, SEGMENT_DOWNLOAD_ATTEMPTS + 1):
+        try:
+            response = houston.get("/history/{0}.csv".format(code), params=params.copy(),
+                                   timeout=60*30, stream=True)
+            try:
+                houston.raise_for_status_with_json(response)
+            except requests.HTTPError as e:
+                # Raise a dedicated exception
+                if "no history matches the query parameters" in repr(e).lower():
+                    raise NoHistoricalData(e)
+                raise
+
+            write_response_to_filepath_or_buffer(filepath, response)
+            return
+
+        except NoHistoricalData:
+            raise
+
+        except (requests.ConnectionError,
+                requests.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+                requests.HTTPError) as e:
+            if isinstance(e, requests.HTTPError) and (
+                    e.response is None or e.response.status_code not in (502, 503, 504)):
+                raise
+            if attempt == SEGMENT_DOWNLOAD_ATTEMPTS:
+                raise
+            time.sleep(SEGMENT_RETRY_DELAY * attempt)
+
+def _write_csv_files_to_filepath_or_buffer(filepaths, filepath_or_buffer):
+    """
+    Writes the CSV files to the filepath or buffer one after another, keeping
+    only the header row of the first file.
+    """
+    if hasattr(filepath_or_buffer, "write"):
+        if six.PY3 and filepath_or_buffer is sys.stdout:
+            # Write bytes to stdout (https://stackoverflow.com/a/23932488)
+            filepath_or_buffer = filepath_or_buffer.buffer
+        mode = _get_buffer_mode(filepath_or_buffer)
+        text = "b" not in mode and six.PY3
+        outfile = filepath_or_buffer
+    else:
+        text = False
+        outfile = open(filepath_or_buffer, "wb")
 
-    write_response_to_filepath_or_buffer(filepath_or_buffer, response)
+    try:
+        for i, filepath in enumerate(filepaths):
+            if text:
+                infile = io.open(filepath, "r", encoding="utf-8", newline="")
+            else:
+                infile = open(filepath, "rb")
+            with infile:
+                if i > 0:
+                    # skip the header
+                    infile.readline()
+                shutil.copyfileobj(infile, outfile)
+    finally:
+        if outfile is not filepath_or_buffer:
+            outfile.close()
+
+    if outfile is filepath_or_buffer and hasattr(filepath_or_buffer, "seek"):
+        try:
+            filepath_or_buffer.seek(0)
+        # unseekable streams such as stdout
+        except (IOError, ValueError):
+            pass
 
 def _cli_download_history_file(*args, **kwargs):
     return json_to_cli(download_history_file, *args, **kwargs)
@@ -14,7 +14,14 @@
 
 import os
 import six
+import zlib
+import time
+import hashlib
+import threading
+import collections
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from .exceptions import ImproperlyConfigured, CannotConnectToHouston
 from quantrocket.cli.utils.output import json_to_cli
 
@@ -53,36 +60,316 @@ def _get_force_timeout():
     except:
         return None
 
-class Houston(requests.Session):
+def _get_int_from_env(name, default):
+    value = os.environ.get(name, None)
+    if not value:
+        return default
+
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+def _get_float_from_env(name, default):
+    value = os.environ.get(name, None)
+    if not value:
+        return default
+
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+def _get_transport_config():
     """
-    Subclass of `requests.Session` that provides an interface to the houston
-    API gateway. Reads HOUSTON_URL (and Basic Auth credentials if applicable)
-    from environment variables and applies them to each request. Simply provide
-    the path, starting with /, for example:
+    Returns the connection pool and retry settings for houston sessions,
+    read from environment variables:
+
+    - QUANTROCKET_HTTP_POOL_CONNECTIONS: number of connection pools to
+      cache (one per host, default 10)
+    - QUANTROCKET_HTTP_POOL_MAXSIZE: maximum number of connections to keep
+      alive per host (default 32), which should be at least the number of
+      threads sharing the session
+    - QUANTROCKET_HTTP_MAX_RETRIES: number of times to retry failed
+      connections and 502/503/504 responses to idempotent requests (default
+      0)
+    - QUANTROCKET_HTTP_BACKOFF_FACTOR: backoff factor between retries, in
+      seconds (default 0.5)
+    - QUANTROCKET_HTTP2: set to use HTTP/2 where supported (async sessions
+      only)
+    """
+    return {
+        "pool_connections": _get_int_from_env("QUANTROCKET_HTTP_POOL_CONNECTIONS", 10),
+        "pool_maxsize": _get_int_from_env("QUANTROCKET_HTTP_POOL_MAXSIZE", 32),
+        "max_retries": _get_int_from_env("QUANTROCKET_HTTP_MAX_RETRIES", 0),
+        "backoff_factor": _get_float_from_env("QUANTROCKET_HTTP_BACKOFF_FACTOR", 0.5),
+        "http2": os.environ.get("QUANTROCKET_HTTP2", "").lower() in ("1", "true", "yes"),
+    }
+
+def _get_compression_config():
+    """
+    Returns the compression settings for houston sessions, read from
+    environment variables:
+
+    - QUANTROCKET_COMPRESS_UPLOADS: compress request bodies (uploaded files)
+      with this encoding: gzip, or zstd (requires zstandard). Default is
+      not to compress. Can be overridden per request with compress=...
+    - QUANTROCKET_COMPRESS_LEVEL: compression level (default 1 for gzip, 3
+      for zstd, which favor speed)
+    - QUANTROCKET_ACCEPT_ENCODING: Accept-Encoding header to send (default is
+      the encodings requests can decode, e.g. "gzip, deflate"); set to
+      "identity" to turn off response compression on fast links
+    """
+    compress_uploads = os.environ.get("QUANTROCKET_COMPRESS_UPLOADS", "").lower()
+    if compress_uploads in ("", "0", "false", "no"):
+        compress_uploads = None
+    elif compress_uploads in ("1", "true", "yes"):
+        compress_uploads = "gzip"
+
+    return {
+        "compress_uploads": compress_uploads,
+        "compress_level": _get_int_from_env("QUANTROCKET_COMPRESS_LEVEL", None),
+        "accept_encoding": os.environ.get("QUANTROCKET_ACCEPT_ENCODING", None),
+    }
+
+def _iter_body_chunks(data, chunk_size=1024*1024):
+    """
+    Yields a request body (bytes, str, file-like, or iterable of either) as
+    chunks of bytes.
+    """
+    if isinstance(data, six.text_type):
+        data = data.encode("utf-8")
+    if isinstance(data, bytes):
+        yield data
+        return
 
-    >>> response = houston.get("/countdown/crontab")
+    if hasattr(data, "read"):
+        read = data.read
+        data = iter(lambda: read(chunk_size), read(0))
 
-    Since each instance of Houston is a session, you can improve performance
-    by using a single session for all requests. The module provides an instance
-    of `Houston`, named `houston`.
+    for chunk in data:
+        if isinstance(chunk, six.text_type):
+            chunk = chunk.encode("utf-8")
+        yield chunk
 
-    Use the same session as other requests:
+def _compress_body(data, encoding, level=None):
+    """
+    Compresses a request body with gzip or zstd. Bytes and str are
+    compressed up front; file-like objects and iterables are compressed as
+    they are streamed.
+    """
+    if encoding == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstandard must be installed to use zstd compression")
+        compressor = zstandard.ZstdCompressor(level=level or 3).compressobj()
+    elif encoding == "gzip":
+        # wbits=31 writes a gzip header and trailer
+        compressor = zlib.compressobj(level or 1, zlib.DEFLATED, 31)
+    else:
+        raise ValueError("unsupported compression: {0}".format(encoding))
+
+    if isinstance(data, (bytes, six.text_type)):
+        return b"".join(
+            [compressor.compress(chunk) for chunk in _iter_body_chunks(data)]
+            + [compressor.flush()])
+
+    def _iter_compressed():
+        for chunk in _iter_body_chunks(data):
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    return _iter_compressed()
+
+def _get_params_to_move_to_body(params, max_query_length):
+    """
+    Returns the names of the params which should be sent in the request body
+    rather than the query string so that the encoded query string doesn't
+    exceed `max_query_length` characters. The params that take the most
+    space are moved first.
+    """
+    lengths = {}
+    for param_name, param_vals in params.items():
+        if param_vals is None:
+            continue
+        if isinstance(param_vals, (list, tuple)):
+            param_vals = list(param_vals)
+        lengths[param_name] = len(
+            six.moves.urllib.parse.urlencode({param_name: param_vals}, doseq=True))
+
+    # params are joined with &
+    query_length = sum(lengths.values()) + max(len(lengths) - 1, 0)
+
+    param_names_to_move = []
+    for param_name in sorted(lengths, key=lengths.get, reverse=True):
+        if query_length <= max_query_length:
+            break
+        param_names_to_move.append(param_name)
+        query_length -= lengths[param_name] + 1
+
+    return param_names_to_move
+
+def _get_conid_set_config():
+    """
+    Returns the conid set settings for houston sessions, read from
+    environment variables:
+
+    - QUANTROCKET_CONID_SETS: set to 1 to send long conid lists as conid
+      set handles rather than inline (default off, as it requires services
+      that support conid sets)
+    - QUANTROCKET_CONID_SET_MIN_SIZE: minimum number of conids for which a
+      conid set is used (default 1000)
+    - QUANTROCKET_CONID_SET_CACHE_SIZE: number of conid set handles to
+      remember per session (default 128)
+    - QUANTROCKET_CONID_SET_RETRY_DELAY: seconds to wait after a failed
+      upload before uploading to that service again (default 300)
+
+    Conid sets are only used by the sync houston session, not by
+    quantrocket.aio.houston.AsyncHouston.
+    """
+    return {
+        "enabled": os.environ.get("QUANTROCKET_CONID_SETS", "").lower() in ("1", "true", "yes"),
+        "min_size": _get_int_from_env("QUANTROCKET_CONID_SET_MIN_SIZE", 1000),
+        "cache_size": _get_int_from_env("QUANTROCKET_CONID_SET_CACHE_SIZE", 128),
+        "retry_delay": _get_float_from_env("QUANTROCKET_CONID_SET_RETRY_DELAY", 300),
+    }
+
+class _ConidSetRegistry(object):
+    """
+    Remembers conid lists which have been uploaded to houston services so
+    that later GET requests can refer to them by handle (a hash of the list)
+    instead of resending them.
+
+    Conid sets are uploaded per service with PUT /{service}/conidsets/{handle}
+    and referenced with a conid_set (or exclude_conid_set) param. Services
+    that don't support conid sets are remembered and sent the conids inline,
+    as are services whose last upload failed, until retry_delay has passed.
+    """
 
-    >>> from quantrocket.houston import houston
+    # params that can be replaced with a handle, and the replacement
+    PARAMS = {
+        "conids": "conid_set",
+        "exclude_conids": "exclude_conid_set",
+    }
+
+    def __init__(self, min_size=1000, cache_size=128, retry_delay=300):
+        self.min_size = min_size
+        self.cache_size = cache_size
+        self.retry_delay = retry_delay
+        # (houston url, service, handle) keys, least recently used first
+        self._handles = collections.OrderedDict()
+        # (houston url, service) keys
+        self._unsupported_services = set()
+        # (houston url, service) keys mapped to the time after which uploads
+        # may be retried
+        self._failed_services = {}
+        self._lock = threading.Lock()
 
-    Use a new session:
+    @staticmethod
+    def _get_handle(conids):
+        return hashlib.sha1(
+            ",".join([str(conid) for conid in conids]).encode("utf-8")).hexdigest()
 
-    >>> from quantrocket.houston import Houston
-    >>> houston = Houston()
+    def replace_conids(self, session, url, params):
+        """
+        Returns a copy of params with long conid lists replaced with conid set
+        handles, uploading them first if needed, and a list of the handle keys
+        used. Returns None if no params were replaced.
+        """
+        if not params or not url.startswith("/"):
+            return None
+
+        params_to_replace = [
+            param_name for param_name in self.PARAMS
+            if isinstance(params.get(param_name, None), (list, tuple))
+            and len(params[param_name]) >= self.min_size]
+
+        if not params_to_replace:
+            return None
+
+        service = url.lstrip("/").split("/")[0]
+        base_url = session.base_url
+        if (base_url, service) in self._unsupported_services:
+            return None
+        if self._failed_services.get((base_url, service), 0) > time.time():
+            return None
+
+        params = dict(params)
+        keys = []
+        for param_name in params_to_replace:
+            conids = list(params[param_name])
+            handle = self._get_handle(conids)
+            key = (base_url, service, handle)
+            with self._lock:
+                is_known = key in self._handles
+                if is_known:
+                    # mark as most recently used
+                    self._handles[key] = self._handles.pop(key)
+            if not is_known and not self._upload(session, service, handle, conids):
+                continue
+            del params[param_name]
+            params[self.PARAMS[param_name]] = handle
+            keys.append(key)
+
+        if not keys:
+            return None
+
+        return params, keys
+
+    def _upload(self, session, service, handle, conids):
+        """
+        Uploads a conid set to the service. Returns True if the service
+        accepted it.
+        """
+        response = session.put(
+            "/{0}/conidsets/{1}".format(service, handle), data={"conids": conids})
+
+        if response.status_code in (404, 405, 501):
+            with self._lock:
+                self._unsupported_services.add((session.base_url, service))
+            return False
+
+        if response.status_code >= 400:
+            with self._lock:
+                self._failed_services[(session.base_url, service)] = time.time() + self.retry_delay
+            return False
+
+        with self._lock:
+            self._failed_services.pop((session.base_url, service), None)
+            self._handles[(session.base_url, service, handle)] = None
+            while len(self._handles) > self.cache_size:
+                self._handles.popitem(last=False)
+
+        return True
+
+    @staticmethod
+    def is_unknown_handle_response(response):
+        """
+        Returns True if the service didn't recognize a conid set handle (for
+        example because it restarted).
+        """
+        return (
+            response.status_code in (404, 410)
+            and "conid set" in response.text.lower())
+
+    def forget(self, keys):
+        with self._lock:
+            for key in keys:
+                self._handles.pop(key, None)
+
+class _HoustonRequestMixin(object):
+    """
+    Request handling shared by the sync and async houston sessions.
     """
 
     DEFAULT_TIMEOUT = 30
 
-    def __init__(self):
-        super(Houston, self).__init__()
-        if "HOUSTON_USERNAME" in os.environ and "HOUSTON_PASSWORD" in os.environ:
-            self.auth = (os.environ["HOUSTON_USERNAME"], os.environ["HOUSTON_PASSWORD"])
-        self.force_timeout = _get_force_timeout()
+    # Maximum length of the query string, beyond which params are sent in
+    # the request body (servers typically limit the request line to 4-8KB)
+    max_query_length = _get_int_from_env("QUANTROCKET_MAX_QUERY_LENGTH", 2000)
 
     @property
     def base_url(self):
@@ -126,7 +413,29 @@ To set the environment variable on Linux, run:
 """)
         return os.environ["HOUSTON_URL"]
 
-    def request(self, method, url, *args, **kwargs):
+    def _prepare_request_kwargs(self, url, kwargs):
+        """
+        Prefixes the url with HOUSTON_URL, applies timeouts, compresses the
+        request body if requested, and moves long params to the request
+        body. Returns the url.
+        """
+        # compress=None uses the session default; compress=False turns
+        # compression off
+        compress = kwargs.pop("compress", None)
+        if compress is None:
+            compress = self.compression_config["compress_uploads"]
+        elif compress is True:
+            compress = "gzip"
+
+        data = kwargs.get("data", None)
+        # form data is left alone
+        if compress and data is not None and not isinstance(data, dict):
+            kwargs["data"] = _compress_body(
+                data, compress, level=self.compression_config["compress_level"])
+            headers = dict(kwargs.get("headers", None) or {})
+            headers["Content-Encoding"] = compress
+            kwargs["headers"] = headers
+
         if url.startswith('/'):
             url = self.base_url + url
         timeout = kwargs.get("timeout", None)
@@ -138,41 +447,147 @@ To set the environment variable on Linux, run:
                 kwargs["timeout"] = self.force_timeout
             elif timeout is None:
                 kwargs["timeout"] = self.DEFAULT_TIMEOUT
-
-        # Move params to data if too long
-        for param_name, param_vals in kwargs.get("params", {}).copy().items():
-            if isinstance(param_vals, list) and len(param_vals) > 50:
-                data = kwargs.get("data", {}) or {}
-                data[param_name] = param_vals
-                kwargs["params"].pop(param_name)
+        elif self.force_timeout and timeout is not None:
+            # Streamed downloads that set a timeout should still respect
+            # QUANTROCKET_TIMEOUT (open-ended streams set no timeout)
+            kwargs["timeout"] = self.force_timeout
+
+        # Move params to the (form-encoded) body if the query string would
+        # be too long. This isn't possible if the body is an upload.
+        params = kwargs.get("params", None)
+        data = kwargs.get("data", None)
+        if params and (data is None or isinstance(data, dict)):
+            param_names_to_move = _get_params_to_move_to_body(
+                params, self.max_query_length)
+            if param_names_to_move:
+                # don't modify the caller's dicts
+                params = dict(params)
+                data = dict(data or {})
+                for param_name in param_names_to_move:
+                    data[param_name] = params.pop(param_name)
+                kwargs["params"] = params
                 kwargs["data"] = data
 
+        return url
+
+    @staticmethod
+    def _get_cannot_connect_error(error, url):
+        """
+        Returns a CannotConnectToHouston exception with troubleshooting tips
+        for the connection error, or None if the error should be raised as
+        is.
+        """
+        parsed = six.moves.urllib.parse.urlparse(url)
+
+        if parsed.hostname == "houston" and parsed.port in (None, 80):
+            # don't do anything special within containers
+            return None
+
+        if parsed.port == 443:
+            return CannotConnectToHouston(CANNOT_CONNECT_TO_HOUSTON_ERROR_CLOUD.format(
+                error=error,
+                scheme=parsed.scheme,
+                netloc=parsed.netloc
+            ))
+
+        return CannotConnectToHouston(CANNOT_CONNECT_TO_HOUSTON_ERROR_LOCAL.format(
+            error=error,
+            scheme=parsed.scheme,
+            netloc=parsed.netloc,
+            port=parsed.port
+        ))
+
+class Houston(_HoustonRequestMixin, requests.Session):
+    """
+    Subclass of `requests.Session` that provides an interface to the houston
+    API gateway. Reads HOUSTON_URL (and Basic Auth credentials if applicable)
+    from environment variables and applies them to each request. Simply provide
+    the path, starting with /, for example:
+
+    >>> response = houston.get("/countdown/crontab")
+
+    Since each instance of Houston is a session, you can improve performance
+    by using a single session for all requests. The module provides an instance
+    of `Houston`, named `houston`.
+
+    Use the same session as other requests:
+
+    >>> from quantrocket.houston import houston
+
+    Use a new session:
+
+    >>> from quantrocket.houston import Houston
+    >>> houston = Houston()
+    """
+
+    def __init__(self):
+        super(Houston, self).__init__()
+        if "HOUSTON_USERNAME" in os.environ and "HOUSTON_PASSWORD" in os.environ:
+            self.auth = (os.environ["HOUSTON_USERNAME"], os.environ["HOUSTON_PASSWORD"])
+        self.force_timeout = _get_force_timeout()
+        self.compression_config = _get_compression_config()
+        if self.compression_config["accept_encoding"]:
+            self.headers["Accept-Encoding"] = self.compression_config["accept_encoding"]
+
+        config = _get_transport_config()
+        max_retries = config["max_retries"]
+        if max_retries:
+            # retry idempotent requests (urllib3's default) with backoff,
+            # returning the last response if the retries are exhausted
+            max_retries = Retry(
+                total=max_retries,
+                backoff_factor=config["backoff_factor"],
+                status_forcelist=(502, 503, 504),
+                raise_on_status=False)
+        adapter = HTTPAdapter(
+            pool_connections=config["pool_connections"],
+            pool_maxsize=config["pool_maxsize"],
+            max_retries=max_retries)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+        conid_set_config = _get_conid_set_config()
+        self.conid_sets = None
+        if conid_set_config["enabled"]:
+            self.conid_sets = _ConidSetRegistry(
+                min_size=conid_set_config["min_size"],
+                cache_size=conid_set_config["cache_size"],
+                retry_delay=conid_set_config["retry_delay"])
+
+    def request(self, method, url, *args, **kwargs):
+        # Refer to long conid lists by conid set handle if possible
+        replaced = None
+        if self.conid_sets and method.upper() == "GET" and kwargs.get("data", None) is None:
+            replaced = self.conid_sets.replace_conids(self, url, kwargs.get("params", None))
+
+        if not replaced:
+            return self._request(method, url, *args, **kwargs)
+
+        params, keys = replaced
+        response = self._request(method, url, *args, **dict(kwargs, params=params))
+        if not self.conid_sets.is_unknown_handle_response(response):
+            return response
+
+        # the service has forgotten the conid set, so send the conids
+        # inline (and upload them again next time)
+        response.close()
+        self.conid_sets.forget(keys)
+        return self._request(method, url, *args, **kwargs)
+
+    def _request(self, method, url, *args, **kwargs):
+        url = self._prepare_request_kwargs(url, kwargs)
+
         try:
             return super(Houston, self).request(method, url, *args, **kwargs)
         except requests.ConnectionError as error:
             if "Failed to establish a new connection" not in str(error):
                 raise
 
-            parsed = six.moves.urllib.parse.urlparse(error.request.url)
-
-            if parsed.hostname == "houston" and parsed.port in (None, 80):
-                # don't do anything special within containers
+            cannot_connect_error = self._get_cannot_connect_error(error, error.request.url)
+            if cannot_connect_error is None:
                 raise
 
-            if parsed.port == 443:
-                raise CannotConnectToHouston(CANNOT_CONNECT_TO_HOUSTON_ERROR_CLOUD.format(
-                    error=error,
-                    scheme=parsed.scheme,
-                    netloc=parsed.netloc
-                ))
-
-            raise CannotConnectToHouston(CANNOT_CONNECT_TO_HOUSTON_ERROR_LOCAL.format(
-                error=error,
-                scheme=parsed.scheme,
-                netloc=parsed.netloc,
-                port=parsed.port
-            ))
-
+            raise cannot_connect_error
 
     @staticmethod
     def raise_for_status_with_json(response):
@@ -18,6 +18,7 @@ import getpass
 from quantrocket.houston import houston
 from quantrocket.exceptions import UnavailableInsideJupyter
 from quantrocket.cli.utils.output import json_to_cli
+from quantrocket.utils.cache import cache_metadata, invalidates_metadata
 
 def list_gateway_statuses(exchanges=None, sec_type=None, research_vendors=None, status=None,
                           gateways=None):
@@ -150,6 +151,7 @@ def stop_gateways(exchanges=None, sec_type=None, research_vendors=None, gateways
 def _cli_stop_gateways(*args, **kwargs):
     return json_to_cli(stop_gateways, *args, **kwargs)
 
+@invalidates_metadata("launchpad.config")
 def load_launchpad_config(filename):
     """
     Uploads a new config.
@@ -169,6 +171,7 @@ def load_launchpad_config(filename):
     houston.raise_for_status_with_json(response)
     return response.json()
 
+@cache_metadata("launchpad.config")
 def get_launchpad_config():
     """
     Returns the current config.
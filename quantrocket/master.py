@@ -12,13 +12,42 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 import sys
 import six
-from quantrocket.houston import houston
+import json
+import time
+import tempfile
+import threading
+from quantrocket.houston import houston, _get_float_from_env
 from quantrocket.cli.utils.output import json_to_cli
 from quantrocket.cli.utils.stream import to_bytes
 from quantrocket.cli.utils.files import write_response_to_filepath_or_buffer
 from quantrocket.utils.warn import deprecated_replaced_by
+from quantrocket.utils.parse import _read_csv
+from quantrocket.utils.formats import BINARY_OUTPUTS, _get_with_output_fallback
+from quantrocket.utils.cache import cache_metadata, invalidates_metadata
+
+# sync_master_mirror() stores a local copy of the securities master for each
+# domain here, which functions that look up securities master fields by conid
+# read from rather than querying the master service, as long as the mirror
+# was fully synced within the max age (in seconds)
+MIRROR_DIR = os.environ.get(
+    "QUANTROCKET_MASTER_MIRROR_DIR", os.path.join(
+        os.environ.get("QUANTROCKET_TMP_DIR", tempfile.gettempdir()),
+        "quantrocket-master-mirror"))
+MIRROR_MAX_AGE = _get_float_from_env("QUANTROCKET_MASTER_MIRROR_MAX_AGE", 24*60*60)
+
+# domain -> (meta file mtime, securities indexed by ConId, meta)
+_mirrors = {}
+# guards loading mirrors into memory and writing mirror files
+_mirror_lock = threading.RLock()
+# serializes syncs
+_mirror_sync_lock = threading.Lock()
+_mirror_stats = {
+    "hits": 0,
+    "misses": 0,
+}
 
 def list_exchanges(regions=None, sec_types=None):
     """
@@ -296,7 +325,10 @@ def download_master_file(filepath_or_buffer=None, output="csv", exchanges=None,
         filepath to write the data to, or file-like object (defaults to stdout)
 
     output : str
-        output format (json, csv, txt, default is csv)
+        output format (json, csv, txt, arrow, parquet, default is csv). The
+        binary formats (arrow, parquet) require a filepath or binary buffer
+        and fall back to csv, with a warning, if the master service doesn't
+        support them
 
     exchanges : list of str, optional
         limit to these exchanges
@@ -371,6 +403,40 @@ def download_master_file(filepath_or_buffer=None, output="csv", exchanges=None,
 
     >>> download_master_file("sharadar_securities.csv", domain="sharadar")
     """
+    params = _get_master_file_params(exchanges=exchanges, sec_types=sec_types,
+                                     currencies=currencies, universes=universes,
+                                     symbols=symbols, conids=conids,
+                                     exclude_universes=exclude_universes,
+                                     exclude_conids=exclude_conids, sectors=sectors,
+                                     industries=industries, categories=categories,
+                                     exclude_delisted=exclude_delisted,
+                                     delisted=delisted, frontmonth=frontmonth,
+                                     fields=fields)
+
+    output = output or "csv"
+
+    url = "/master/{0}securities.{{output}}".format(
+        "{0}/".format(domain) if domain else "")
+
+    if output not in ("csv", "json", "txt") + BINARY_OUTPUTS:
+        raise ValueError("Invalid ouput: {0}".format(output))
+
+    response, output = _get_with_output_fallback("master", url, output, params=params)
+
+    houston.raise_for_status_with_json(response)
+
+    filepath_or_buffer = filepath_or_buffer or sys.stdout
+
+    write_response_to_filepath_or_buffer(filepath_or_buffer, response)
+
+def _get_master_file_params(exchanges=None, sec_types=None, currencies=None,
+                            universes=None, symbols=None, conids=None,
+                            exclude_universes=None, exclude_conids=None, sectors=None,
+                            industries=None, categories=None, exclude_delisted=False,
+                            delisted=True, frontmonth=False, fields=None):
+    """
+    Returns the query params for `download_master_file`.
+    """
     # Handle legacy param "delisted"
     if delisted is False and exclude_delisted is None:
         exclude_delisted = True
@@ -404,28 +470,261 @@ def download_master_file(filepath_or_buffer=None, output="csv", exchanges=None,
         params["frontmonth"] = frontmonth
     if fields:
         params["fields"] = fields
+    return params
 
-    output = output or "csv"
+def _cli_download_master_file(*args, **kwargs):
+    return json_to_cli(download_master_file, *args, **kwargs)
 
-    url = "/master/{0}securities.{1}".format(
-        "{0}/".format(domain) if domain else "",
-        output)
+def _get_mirror_filepaths(domain):
+    return (os.path.join(MIRROR_DIR, "{0}.feather".format(domain)),
+            os.path.join(MIRROR_DIR, "{0}.json".format(domain)))
 
-    if output not in ("csv", "json", "txt"):
-        raise ValueError("Invalid ouput: {0}".format(output))
+def _load_master_mirror(domain):
+    """
+    Returns (securities indexed by ConId, meta) for the domain's mirror,
+    loading it from disk if it isn't loaded or has been synced since, or
+    (None, None) if there is no mirror.
+    """
+    data_filepath, meta_filepath = _get_mirror_filepaths(domain)
+    try:
+        mtime = os.path.getmtime(meta_filepath)
+    except OSError:
+        return None, None
 
-    response = houston.get(url, params=params)
+    entry = _mirrors.get(domain, None)
+    if entry is not None and entry[0] == mtime:
+        return entry[1], entry[2]
 
-    houston.raise_for_status_with_json(response)
+    import pandas as pd
 
-    filepath_or_buffer = filepath_or_buffer or sys.stdout
+    with _mirror_lock:
+        try:
+            import pyarrow
+            with open(meta_filepath) as f:
+                meta = json.load(f)
+            securities = pd.read_feather(data_filepath).set_index("ConId")
+        except (ImportError, IOError, OSError, ValueError):
+            return None, None
+        _publish_master_mirror(domain, mtime, securities, meta)
 
-    write_response_to_filepath_or_buffer(filepath_or_buffer, response)
+    return securities, meta
 
-def _cli_download_master_file(*args, **kwargs):
-    return json_to_cli(download_master_file, *args, **kwargs)
+def _save_master_mirror(domain, securities, meta):
+    """
+    Writes the domain's mirror to disk and loads it in memory.
+    """
+    data_filepath, meta_filepath = _get_mirror_filepaths(domain)
+
+    with _mirror_lock:
+        if not os.path.exists(MIRROR_DIR):
+            os.makedirs(MIRROR_DIR)
+
+        # write to temp files then rename so that concurrent readers never
+        # see a partial file; the meta file is renamed last since readers
+        # check it first
+        tmp_data_filepath = "{0}.{1}.tmp".format(data_filepath, os.getpid())
+        securities.reset_index().to_feather(tmp_data_filepath)
+        tmp_meta_filepath = "{0}.{1}.tmp".format(meta_filepath, os.getpid())
+        with open(tmp_meta_filepath, "w") as f:
+            json.dump(meta, f)
+
+        for tmp_filepath, filepath in ((tmp_data_filepath, data_filepath),
+                                       (tmp_meta_filepath, meta_filepath)):
+            # replace atomically so that readers in other threads and
+            # processes never find the files missing
+            if hasattr(os, "replace"):
+                os.replace(tmp_filepath, filepath)
+            else:
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+                os.rename(tmp_filepath, filepath)
+
+        _publish_master_mirror(domain, os.path.getmtime(meta_filepath), securities, meta)
+
+def _publish_master_mirror(domain, mtime, securities, meta):
+    """
+    Makes the mirror available to lookups.
+    """
+    # pandas builds the ConId hash table and uniqueness check lazily, which
+    # isn't thread-safe, so build them before other threads can see the
+    # mirror
+    securities.index.is_unique
+    _mirrors[domain] = (mtime, securities, meta)
+
+def _is_mirror_fresh(meta):
+    return (
+        meta["houston_url"] == os.environ.get("HOUSTON_URL")
+        and time.time() - meta["last_full_sync"] < MIRROR_MAX_AGE)
+
+def _get_securities_from_mirror(conids, fields=None, domain=None):
+    """
+    Returns a DataFrame of securities master fields for the conids, indexed
+    by ConId, from the local mirror, or None if there is no fresh mirror for
+    the domain or it lacks any of the conids or fields (in which case the
+    caller should query the master service).
+    """
+    securities, meta = _load_master_mirror(domain or "main")
 
-def get_securities_reindexed_like(reindex_like, domain, fields=None):
+    if securities is not None and _is_mirror_fresh(meta):
+        positions = securities.index.get_indexer(list(conids))
+        fields = [field for field in fields or securities.columns if field != "ConId"]
+        if (positions >= 0).all() and set(fields).issubset(securities.columns):
+            with _mirror_lock:
+                _mirror_stats["hits"] += 1
+            return securities[fields].take(positions).copy()
+
+    with _mirror_lock:
+        _mirror_stats["misses"] += 1
+
+    return None
+
+def sync_master_mirror(domain=None, full=False):
+    """
+    Sync the local mirror of the securities master, from which functions
+    that look up securities master fields by conid (such as
+    `get_securities_reindexed_like`, and `get_prices` when inferring the
+    timezone) read while it is fresh, rather than querying the master
+    service.
+
+    The first sync, and any sync once the mirror is older than
+    QUANTROCKET_MASTER_MIRROR_MAX_AGE (default 1 day) or when full=True,
+    downloads all securities. Otherwise only the list of conids is
+    downloaded, then securities added since the last sync are downloaded
+    and securities no longer in the master service are removed. The mirror
+    is stored in QUANTROCKET_MASTER_MIRROR_DIR.
+
+    Requires pyarrow.
+
+    Parameters
+    ----------
+    domain : str, optional
+        the domain to mirror (default is 'main'. Possible choices: main,
+        sharadar)
+
+    full : bool
+        download all securities even if the mirror is fresh. Default False.
+
+    Returns
+    -------
+    dict
+        dict with keys full (whether all securities were downloaded),
+        securities (number of securities in the mirror), added, removed
+
+    Examples
+    --------
+    Sync the mirror at the start of each trading session:
+
+    >>> sync_master_mirror()
+    """
+    try:
+        import pandas as pd
+    except ImportError:
+        raise ImportError("pandas must be installed to use this function")
+
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("pyarrow must be installed to use the securities master mirror")
+
+    domain = domain or "main"
+
+    with _mirror_sync_lock:
+        securities, meta = _load_master_mirror(domain)
+
+        full = full or securities is None or not _is_mirror_fresh(meta)
+
+        if full:
+            f = six.StringIO()
+            download_master_file(f, domain=domain)
+            new_securities = _read_csv(f, "master", index_col="ConId")
+            conids = new_securities.index
+            meta = {
+                "houston_url": os.environ.get("HOUSTON_URL"),
+                "last_full_sync": time.time()
+            }
+        else:
+            f = six.StringIO()
+            download_master_file(f, domain=domain, fields=["ConId"])
+            conids = _read_csv(f, "master", index_col="ConId").index
+
+        if securities is None:
+            added = len(conids)
+            removed = 0
+        else:
+            added = (~conids.isin(securities.index)).sum()
+            removed = (~securities.index.isin(conids)).sum()
+
+        if full:
+            securities = new_securities
+
+        elif added or removed:
+            securities = securities.loc[securities.index.isin(conids)]
+            if added:
+                f = six.StringIO()
+                download_master_file(
+                    f, domain=domain, conids=list(conids[~conids.isin(securities.index)]))
+                new_securities = _read_csv(f, "master", index_col="ConId")
+                categories = [col for col in securities.columns
+                              if securities[col].dtype.name == "category"]
+                securities = pd.concat([securities, new_securities], sort=False)
+                # concatenating categoricals with different categories gives
+                # objects
+                for col in categories:
+                    securities[col] = securities[col].astype("category")
+
+        meta["last_sync"] = time.time()
+        _save_master_mirror(domain, securities, meta)
+
+    return {
+        "full": full,
+        "securities": len(securities),
+        "added": int(added),
+        "removed": int(removed),
+    }
+
+def clear_master_mirror(domain=None):
+    """
+    Delete the local mirror of the securities master.
+
+    Parameters
+    ----------
+    domain : str, optional
+        only delete the mirror of this domain. Default is to delete all
+        mirrors.
+
+    Returns
+    -------
+    None
+    """
+    with _mirror_lock:
+        if domain:
+            _mirrors.pop(domain, None)
+            filepaths = _get_mirror_filepaths(domain)
+        else:
+            _mirrors.clear()
+            if not os.path.exists(MIRROR_DIR):
+                return
+            filepaths = [os.path.join(MIRROR_DIR, filename)
+                         for filename in os.listdir(MIRROR_DIR)
+                         if filename.endswith((".feather", ".json", ".tmp"))]
+        for filepath in filepaths:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+
+def get_master_mirror_stats():
+    """
+    Return the number of securities master lookups served from the local
+    mirror (hits) and the number which weren't (misses).
+
+    Returns
+    -------
+    dict
+        dict with keys hits, misses
+    """
+    with _mirror_lock:
+        return dict(_mirror_stats)
+
+def get_securities_reindexed_like(reindex_like, domain, fields=None, lazy=False):
     """
     Return a multiindex DataFrame of securities master data, reindexed to
     match the index and columns (conids) of `reindex_like`.
@@ -446,11 +745,18 @@ def get_securities_reindexed_like(reindex_like, domain, fields=None):
         including all fields. For faster performance, limiting fields to
         those needed is highly recommended, especially for large universes.
 
+    lazy : bool
+        instead of a multiindex DataFrame, return a dict of DataFrames, one
+        per field, which are read-only views of the securities master data
+        repeated for each date. The views use almost no memory regardless of
+        the number of dates but can't be modified in place. Default False.
+
     Returns
     -------
-    DataFrame
+    DataFrame or dict
         a multiindex (Field, Date) DataFrame of securities master data, shaped
-        like the input DataFrame
+        like the input DataFrame, or a dict of DataFrames shaped like the
+        input DataFrame if lazy=True
 
     Examples
     --------
@@ -466,22 +772,35 @@ def get_securities_reindexed_like(reindex_like, domain, fields=None):
     """
     try:
         import pandas as pd
+        import numpy as np
     except ImportError:
         raise ImportError("pandas must be installed to use this function")
 
     conids = list(reindex_like.columns)
 
-    f = six.StringIO()
-    download_master_file(f, domain=domain, conids=conids, fields=fields)
-    securities = pd.read_csv(f, index_col="ConId")
+    securities = _get_securities_from_mirror(conids, fields=fields, domain=domain)
+    if securities is None:
+        f = six.StringIO()
+        download_master_file(f, domain=domain, conids=conids, fields=fields)
+        securities = _read_csv(f, "master", index_col="ConId")
 
     all_master_fields = {}
 
-    for col in securities.columns:
+    for col in sorted(securities.columns):
         this_col = securities[col]
         if col in ("Delisted", "Etf"):
             this_col = this_col.astype(bool)
-        all_master_fields[col] = reindex_like.apply(lambda x: this_col, axis=1)
+        elif this_col.dtype.name == "category":
+            this_col = this_col.astype(object)
+        # repeat the per-conid values for each date without copying them
+        # (the strides of the date axis are 0)
+        values = np.broadcast_to(
+            this_col.reindex(reindex_like.columns).values, reindex_like.shape)
+        all_master_fields[col] = pd.DataFrame(
+            values, index=reindex_like.index, columns=reindex_like.columns, copy=False)
+
+    if lazy:
+        return all_master_fields
 
     names = list(reindex_like.index.names)
     names.insert(0, "Field")
@@ -552,6 +871,7 @@ def translate_conids(conids, from_domain=None, to_domain=None):
 def _cli_translate_conids(*args, **kwargs):
     return json_to_cli(translate_conids, *args, **kwargs)
 
+@invalidates_metadata("master.universes")
 def create_universe(code, infilepath_or_buffer=None, from_universes=None,
                     exclude_delisted=False, append=False, replace=False,
                     domain=None):
@@ -641,6 +961,7 @@ def create_universe(code, infilepath_or_buffer=None, from_universes=None,
 def _cli_create_universe(*args, **kwargs):
     return json_to_cli(create_universe, *args, **kwargs)
 
+@invalidates_metadata("master.universes")
 def delete_universe(code, domain=None):
     """
     Delete a universe.
@@ -675,6 +996,7 @@ def delete_universe(code, domain=None):
 def _cli_delete_universe(*args, **kwargs):
     return json_to_cli(delete_universe, *args, **kwargs)
 
+@cache_metadata("master.universes")
 def list_universes(domain=None):
     """
     List universes and their size.
@@ -751,6 +1073,7 @@ def delist_security(conid=None, symbol=None, exchange=None, currency=None, sec_t
 def _cli_delist_security(*args, **kwargs):
     return json_to_cli(delist_security, *args, **kwargs)
 
+@invalidates_metadata("master.rollrules")
 def load_rollrules_config(filename):
     """
     Upload a new rollover rules config.
@@ -770,6 +1093,7 @@ def load_rollrules_config(filename):
     houston.raise_for_status_with_json(response)
     return response.json()
 
+@cache_metadata("master.rollrules")
 def get_rollrules_config():
     """
     Returns the current rollover rules config.
@@ -848,6 +1172,18 @@ def list_calendar_statuses(exchanges, sec_type=None, in_=None, ago=None, outside
     dict
         exchange calendar status
     """
+    params = _get_calendar_statuses_params(exchanges=exchanges, sec_type=sec_type,
+                                           in_=in_, ago=ago, outside_rth=outside_rth)
+
+    response = houston.get("/master/calendar", params=params)
+    houston.raise_for_status_with_json(response)
+    return response.json()
+
+def _get_calendar_statuses_params(exchanges, sec_type=None, in_=None, ago=None,
+                                  outside_rth=False):
+    """
+    Returns the query params for `list_calendar_statuses`.
+    """
     params = {}
     if exchanges:
         params["exchanges"] = exchanges
@@ -859,10 +1195,7 @@ def list_calendar_statuses(exchanges, sec_type=None, in_=None, ago=None, outside
         params["ago"] = ago
     if outside_rth:
         params["outside_rth"] = outside_rth
-
-    response = houston.get("/master/calendar", params=params)
-    houston.raise_for_status_with_json(response)
-    return response.json()
+    return params
 
 def _cli_list_calendar_statuses(*args, **kwargs):
     return json_to_cli(list_calendar_statuses, *args, **kwargs)
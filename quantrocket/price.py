@@ -12,13 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import io
 import six
 import os
 import time
+import json
+import hashlib
 import itertools
 import tempfile
-from quantrocket.master import download_master_file
+import threading
+from quantrocket.master import download_master_file, _get_securities_from_mirror
 from quantrocket.exceptions import ParameterError, NoHistoricalData, NoRealtimeData
+from quantrocket.utils.threads import _map_in_threads
+from quantrocket.utils.parse import _read_csv, _get_csv_engine, _read_arrow_or_csv
+from quantrocket.utils.formats import _quiet_output_fallback
 from quantrocket.history import (
     download_history_file,
     get_db_config as get_history_db_config,
@@ -29,13 +36,558 @@ from quantrocket.realtime import (
     list_databases as list_realtime_databases)
 
 TMP_DIR = os.environ.get("QUANTROCKET_TMP_DIR", tempfile.gettempdir())
+# By default, get_prices streams database responses straight into pandas.
+# Set QUANTROCKET_PRICES_USE_TMP_FILES to download to temp files in
+# QUANTROCKET_TMP_DIR instead.
+USE_TMP_FILES = bool(os.environ.get("QUANTROCKET_PRICES_USE_TMP_FILES", False))
+# get_prices requests CSV from the history and realtime services by default.
+# Set QUANTROCKET_PRICES_OUTPUT to arrow to request Arrow IPC streams instead
+# (falling back to CSV, with a warning, if they don't support it), or to
+# auto to request them only if pyarrow is installed and fall back silently.
+PRICES_OUTPUT = os.environ.get("QUANTROCKET_PRICES_OUTPUT", "csv")
+# get_prices(..., cache=True) stores query results here, evicting the least
+# recently used entries once the cache exceeds the max size (in MB)
+CACHE_DIR = os.environ.get(
+    "QUANTROCKET_PRICES_CACHE_DIR", os.path.join(TMP_DIR, "quantrocket-prices-cache"))
+CACHE_MAX_SIZE = int(os.environ.get("QUANTROCKET_PRICES_CACHE_MAX_SIZE", 1024))
+
+_cache_lock = threading.RLock()
+_cache_stats = {
+    "hits": 0,
+    "partial_hits": 0,
+    "misses": 0,
+    "evictions": 0,
+}
+
+def _use_arrow_output():
+    """
+    Returns True if get_prices should request arrow output.
+    """
+    if PRICES_OUTPUT != "auto":
+        return PRICES_OUTPUT == "arrow"
+
+    try:
+        import pyarrow
+    except ImportError:
+        return False
+
+    return True
+
+def _read_prices_csv(download_func, code, service, float32=False, **kwargs):
+    """
+    Downloads a CSV of prices using `download_func` (download_history_file or
+    download_market_data_file) and loads it into a DataFrame.
+
+    By default the download runs in a background thread which writes the
+    response to an OS pipe, while pandas parses the other end of the pipe as
+    the data arrives. The CSV is thus never held in memory or written to disk
+    in its entirety. If QUANTROCKET_PRICES_USE_TMP_FILES is set, the CSV is
+    instead downloaded to a temp file in QUANTROCKET_TMP_DIR, then loaded.
+
+    If QUANTROCKET_PRICES_OUTPUT is arrow (or auto and pyarrow is
+    installed), an Arrow IPC stream is requested instead, and whichever
+    format the service returns is loaded.
+    """
+    use_arrow = _use_arrow_output()
+    if use_arrow:
+        kwargs["output"] = "arrow"
+
+    if use_arrow and PRICES_OUTPUT == "auto":
+        # arrow was only chosen because pyarrow is installed, so fall back
+        # to csv quietly
+        _download_func = download_func
+
+        def download_func(*args, **kwargs):
+            with _quiet_output_fallback():
+                return _download_func(*args, **kwargs)
+
+    if USE_TMP_FILES:
+        tmp_filepath = "{dir}{sep}{service}.{db}.{pid}.{time}.{ext}".format(
+            dir=TMP_DIR, sep=os.path.sep, service=service, db=code,
+            pid=os.getpid(), time=time.time(), ext="arrow" if use_arrow else "csv")
+
+        download_func(code, tmp_filepath, **kwargs)
+
+        try:
+            if use_arrow:
+                with open(tmp_filepath, "rb") as f:
+                    return _read_arrow_or_csv(f, "prices", float32=float32)
+            return _read_csv(tmp_filepath, "prices", float32=float32)
+        finally:
+            os.remove(tmp_filepath)
+
+    # pyarrow and arrow streams read bytes, pandas reads text
+    if use_arrow or _get_csv_engine("prices", float32=float32) == "pyarrow":
+        read_mode = "rb"
+    else:
+        read_mode = "r"
+
+    read_fd, write_fd = os.pipe()
+    if six.PY3:
+        if read_mode == "rb":
+            reader = io.open(read_fd, read_mode)
+        else:
+            reader = io.open(read_fd, read_mode, encoding="utf-8")
+        if use_arrow:
+            writer = io.open(write_fd, "wb")
+        else:
+            writer = io.open(write_fd, "w", encoding="utf-8")
+    else:
+        reader = os.fdopen(read_fd, read_mode)
+        writer = os.fdopen(write_fd, "wb" if use_arrow else "w")
+
+    download_errors = []
+
+    def _download():
+        try:
+            download_func(code, writer, **kwargs)
+        except Exception as e:
+            download_errors.append(e)
+        finally:
+            # closing the writer signals EOF to the parser; this can fail if
+            # the parser already gave up and closed the reader
+            try:
+                writer.close()
+            except (IOError, OSError):
+                pass
+
+    download_thread = threading.Thread(target=_download)
+    download_thread.daemon = True
+    download_thread.start()
+
+    try:
+        if use_arrow:
+            prices = _read_arrow_or_csv(reader, "prices", float32=float32)
+        else:
+            prices = _read_csv(reader, "prices", float32=float32)
+    except Exception:
+        # closing the reader unblocks the download thread if it is waiting
+        # to write
+        reader.close()
+        download_thread.join()
+        # A failed download (e.g. NoHistoricalData) surfaces in the parser
+        # as empty or truncated data, so prefer the download error
+        if download_errors:
+            raise download_errors[0]
+        raise
+
+    reader.close()
+    download_thread.join()
+    if download_errors:
+        raise download_errors[0]
+
+    return prices
+
+def _read_cached_prices_csv(download_func, code, service, db_config, **kwargs):
+    """
+    Like `_read_prices_csv` but serves the query from the local cache if
+    possible.
+
+    Cache entries are keyed by the query parameters other than start_date
+    and end_date, and store the results in Feather format along with the
+    database config and the latest date in the results (the high-water mark).
+    A repeat query only downloads data on or after the high-water mark and
+    appends it to the cached results. Entries are discarded if the database
+    config changes, or if an earlier start date is requested than was
+    cached.
+    """
+    import pandas as pd
+
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("pyarrow must be installed to use the prices cache")
+
+    if service == "history":
+        no_data_exception = NoHistoricalData
+    else:
+        no_data_exception = NoRealtimeData
+
+    start_date = kwargs.pop("start_date", None)
+    end_date = kwargs.pop("end_date", None)
+    if start_date:
+        start_date = pd.Timestamp(start_date).date().isoformat()
+    if end_date:
+        end_date = pd.Timestamp(end_date).date().isoformat()
+
+    key_params = dict(service=service, code=code)
+    for param, value in kwargs.items():
+        if isinstance(value, (list, tuple, set)):
+            value = sorted(value, key=str)
+        key_params[param] = value
+    key = hashlib.sha1(
+        json.dumps(key_params, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    data_filepath = os.path.join(CACHE_DIR, "{0}.feather".format(key))
+    meta_filepath = os.path.join(CACHE_DIR, "{0}.json".format(key))
+
+    meta = None
+    with _cache_lock:
+        if os.path.exists(data_filepath) and os.path.exists(meta_filepath):
+            try:
+                with open(meta_filepath) as f:
+                    meta = json.load(f)
+            except ValueError:
+                meta = None
+
+    cache_is_usable = (
+        meta is not None
+        and meta["db_config"] == json.loads(json.dumps(db_config))
+        and (meta["start_date"] is None
+             or (start_date is not None and start_date >= meta["start_date"])))
+
+    if not cache_is_usable:
+        prices = _read_prices_csv(
+            download_func, code, service, start_date=start_date, end_date=end_date, **kwargs)
+        _save_to_cache(prices, data_filepath, meta_filepath, dict(
+            db_config=db_config,
+            start_date=start_date,
+            high_water_mark=prices.Date.str[:10].max()))
+        with _cache_lock:
+            _cache_stats["misses"] += 1
+
+    else:
+        prices = pd.read_feather(data_filepath)
+        high_water_mark = meta["high_water_mark"]
+
+        if end_date is not None and end_date < high_water_mark:
+            with _cache_lock:
+                os.utime(meta_filepath, None)
+                _cache_stats["hits"] += 1
+        else:
+            # re-download the high-water mark date too, since it may have
+            # been incomplete when cached
+            try:
+                new_prices = _read_prices_csv(
+                    download_func, code, service, start_date=high_water_mark,
+                    end_date=end_date, **kwargs)
+            except no_data_exception:
+                new_prices = None
+
+            if new_prices is not None:
+                prices = pd.concat((prices, new_prices), ignore_index=True, sort=False)
+                prices = prices.drop_duplicates(subset=["ConId", "Date"], keep="last")
+                prices = prices.reset_index(drop=True)
+
+            meta["high_water_mark"] = prices.Date.str[:10].max()
+            _save_to_cache(prices, data_filepath, meta_filepath, meta)
+            with _cache_lock:
+                _cache_stats["partial_hits"] += 1
+
+    # the cached data may extend beyond the requested dates
+    dates = prices.Date.str[:10]
+    if start_date and (dates < start_date).any():
+        prices = prices.loc[dates >= start_date]
+        dates = prices.Date.str[:10]
+    if end_date and (dates > end_date).any():
+        prices = prices.loc[dates <= end_date]
+
+    if prices.empty:
+        raise no_data_exception("no {0} matches the query parameters".format(
+            "history" if service == "history" else "market data"))
+
+    return prices.reset_index(drop=True)
+
+def _save_to_cache(prices, data_filepath, meta_filepath, meta):
+    """
+    Saves prices and metadata to the cache, then evicts the least recently
+    used entries if the cache exceeds CACHE_MAX_SIZE.
+    """
+    with _cache_lock:
+        if not os.path.exists(CACHE_DIR):
+            os.makedirs(CACHE_DIR)
+
+        # write to temp files then rename so that concurrent readers never
+        # see a partial file
+        tmp_data_filepath = "{0}.{1}.tmp".format(data_filepath, os.getpid())
+        prices.reset_index(drop=True).to_feather(tmp_data_filepath)
+        tmp_meta_filepath = "{0}.{1}.tmp".format(meta_filepath, os.getpid())
+        with open(tmp_meta_filepath, "w") as f:
+            json.dump(meta, f, default=str)
+
+        for tmp_filepath, filepath in ((tmp_data_filepath, data_filepath),
+                                       (tmp_meta_filepath, meta_filepath)):
+            if os.path.exists(filepath):
+                os.remove(filepath)
+            os.rename(tmp_filepath, filepath)
+
+        _evict_from_cache(keep=meta_filepath)
+
+def _evict_from_cache(keep=None):
+    """
+    Removes the least recently used cache entries (other than `keep`) until
+    the cache is no larger than CACHE_MAX_SIZE.
+    """
+    entries = []
+    total_size = 0
+    for filename in os.listdir(CACHE_DIR):
+        if not filename.endswith(".json"):
+            continue
+        meta_filepath = os.path.join(CACHE_DIR, filename)
+        data_filepath = meta_filepath[:-len(".json")] + ".feather"
+        try:
+            size = os.path.getsize(meta_filepath) + os.path.getsize(data_filepath)
+            last_used = os.path.getmtime(meta_filepath)
+        except OSError:
+            continue
+        total_size += size
+        entries.append((last_used, size, meta_filepath, data_filepath))
+
+    max_size = CACHE_MAX_SIZE * 1024 * 1024
+    for last_used, size, meta_filepath, data_filepath in sorted(entries):
+        if total_size <= max_size:
+            break
+        if meta_filepath == keep:
+            continue
+        for filepath in (meta_filepath, data_filepath):
+            if os.path.exists(filepath):
+                os.remove(filepath)
+        total_size -= size
+        _cache_stats["evictions"] += 1
+
+def clear_cache():
+    """
+    Delete all entries from the local prices cache used by
+    `get_prices(..., cache=True)`.
+
+    Returns
+    -------
+    None
+    """
+    with _cache_lock:
+        if not os.path.exists(CACHE_DIR):
+            return
+        for filename in os.listdir(CACHE_DIR):
+            if filename.endswith((".feather", ".json", ".tmp")):
+                os.remove(os.path.join(CACHE_DIR, filename))
+
+def get_cache_stats():
+    """
+    Return statistics about the local prices cache used by
+    `get_prices(..., cache=True)`.
+
+    Returns
+    -------
+    dict
+        dict with the number of cache hits (served from the cache), partial
+        hits (served from the cache plus newer data), misses and evictions
+        in this process, and the number and size in bytes of cache entries
+        on disk
+    """
+    with _cache_lock:
+        stats = _cache_stats.copy()
+        entries = 0
+        size = 0
+        if os.path.exists(CACHE_DIR):
+            for filename in os.listdir(CACHE_DIR):
+                if filename.endswith(".json"):
+                    entries += 1
+                if filename.endswith((".feather", ".json")):
+                    size += os.path.getsize(os.path.join(CACHE_DIR, filename))
+    stats["entries"] = entries
+    stats["size"] = size
+    return stats
+
+def _multiindex_from_codes(levels, codes, names):
+    """
+    Builds a MultiIndex directly from levels and integer codes.
+    """
+    import pandas as pd
+
+    try:
+        return pd.MultiIndex(levels=levels, codes=codes, names=names,
+                             verify_integrity=False)
+    except TypeError:
+        # pandas < 0.24 calls codes labels
+        return pd.MultiIndex(levels=levels, labels=codes, names=names,
+                             verify_integrity=False)
+
+def _get_multiindex_codes(index):
+    """
+    Returns the integer codes of each level of a MultiIndex.
+    """
+    try:
+        return index.codes
+    except AttributeError:
+        # pandas < 0.24 calls codes labels
+        return index.labels
+
+def _split_date_and_time(index):
+    """
+    Splits the datetimes of a (Field, Date) MultiIndex into a (Field, Date,
+    Time) MultiIndex of tz-naive (wall-clock) dates and HH:MM:SS times, with
+    sorted levels.
+
+    On large intraday frames this dominates, so rather than round-tripping
+    through tuples, each level is factorized and the index is built from
+    integer codes. Only the distinct times need to be formatted as strings.
+    """
+    import pandas as pd
+    import numpy as np
+
+    dts = index.get_level_values("Date")
+    if dts.tz is not None:
+        dts = dts.tz_localize(None) # drop tz-aware in Date index, keeping wall time
+    dates = dts.normalize()
+    field_codes, field_levels = pd.factorize(index.get_level_values("Field"), sort=True)
+    date_codes, date_levels = pd.factorize(dates, sort=True)
+    time_codes, time_deltas = pd.factorize(dts - dates, sort=True)
+    time_labels = np.asarray((pd.Timestamp(0) + pd.TimedeltaIndex(time_deltas)).strftime("%H:%M:%S"))
+    # sub-second differences can map distinct times to the same label
+    label_codes, time_levels = pd.factorize(time_labels, sort=True)
+    time_codes = label_codes[time_codes]
+
+    return _multiindex_from_codes(
+        levels=[field_levels, date_levels, time_levels],
+        codes=[field_codes, date_codes, time_codes],
+        names=["Field", "Date", "Time"])
+
+def _interpolate_times(index, master_fields=None):
+    """
+    Given a (Field, Date, Time) MultiIndex from `_split_date_and_time`,
+    returns a sorted MultiIndex with every date and time for each price
+    field, and only the min date and time for each master field.
+    """
+    import numpy as np
+
+    field_levels, date_levels, time_levels = index.levels
+    field_codes, date_codes, time_codes = [
+        np.asarray(codes) for codes in _get_multiindex_codes(index)]
+
+    num_dates = len(date_levels)
+    num_times = len(time_levels)
+    price_field_codes = np.array(
+        [i for i, field in enumerate(field_levels)
+         if not master_fields or field not in master_fields], dtype=np.intp)
+    # The price fields get every date and time (the product of the levels)
+    interpolated_codes = [
+        np.repeat(price_field_codes, num_dates * num_times),
+        np.tile(np.repeat(np.arange(num_dates), num_times), len(price_field_codes)),
+        np.tile(np.arange(num_times), num_dates * len(price_field_codes)),
+    ]
+    # Master fields only get their min date and time
+    master_field_codes = np.setdiff1d(np.arange(len(field_levels)), price_field_codes)
+    if len(master_field_codes):
+        date_time_codes = date_codes * num_times + time_codes
+        min_date_time_codes = np.array(
+            [date_time_codes[field_codes == i].min() for i in master_field_codes],
+            dtype=np.intp)
+        interpolated_codes = [
+            np.concatenate((interpolated_codes[0], master_field_codes)),
+            np.concatenate((interpolated_codes[1], min_date_time_codes // num_times)),
+            np.concatenate((interpolated_codes[2], min_date_time_codes % num_times)),
+        ]
+        # restore the field order
+        sort_order = np.argsort(interpolated_codes[0], kind="mergesort")
+        interpolated_codes = [codes[sort_order] for codes in interpolated_codes]
+
+    return _multiindex_from_codes(
+        levels=[field_levels, date_levels, time_levels],
+        codes=interpolated_codes,
+        names=["Field", "Date", "Time"])
+
+def _infer_timezone(securities):
+    """
+    Returns the timezone of the securities, complaining if there is more than
+    one.
+    """
+    timezones = securities.Timezone.unique()
+
+    if len(timezones) > 1:
+        raise ParameterError(
+            "cannot infer timezone because multiple timezones are present "
+            "in data, please specify timezone explicitly (timezones: {0})".format(
+                ", ".join(timezones)))
+
+    return timezones[0]
+
+def _pivot_prices_to_dict(prices, is_intraday, timezone=None, times=None):
+    """
+    Pivots long-format prices (a ConId column, a Date column, and a column
+    per field) into a dict of field -> DataFrame sharing an index of dates
+    (and times, if intraday) and a columns index of conids. Intraday
+    DataFrames contain every time for every date.
+
+    Each field is scattered straight into a 2D array by integer position.
+    Where a conid and date occur more than once (from multiple databases),
+    the first non-null value is kept.
+    """
+    import pandas as pd
+    import numpy as np
+
+    # parse each distinct date string once
+    dt_codes, dt_strings = pd.factorize(prices.Date)
+    if is_intraday:
+        dts = pd.to_datetime(dt_strings, utc=True)
+        if timezone:
+            dts = dts.tz_convert(timezone)
+    else:
+        dts = pd.to_datetime(dt_strings)
+    if dts.tz is not None:
+        dts = dts.tz_localize(None)
+    dates = dts.normalize()
+    date_codes, date_levels = pd.factorize(dates, sort=True)
+    num_dates = len(date_levels)
+
+    if is_intraday:
+        time_codes, time_deltas = pd.factorize(dts - dates, sort=True)
+        time_labels = np.asarray(
+            (pd.Timestamp(0) + pd.TimedeltaIndex(time_deltas)).strftime("%H:%M:%S"))
+        label_codes, time_levels = pd.factorize(time_labels, sort=True)
+        time_codes = label_codes[time_codes]
+        num_times = len(time_levels)
+
+        row_codes = (date_codes * num_times + time_codes)[dt_codes]
+        index = _multiindex_from_codes(
+            levels=[date_levels, time_levels],
+            codes=[np.repeat(np.arange(num_dates), num_times),
+                   np.tile(np.arange(num_times), num_dates)],
+            names=["Date", "Time"])
+    else:
+        row_codes = date_codes[dt_codes]
+        index = pd.DatetimeIndex(np.asarray(date_levels), name="Date")
+
+    keep_rows = None
+    if times and is_intraday:
+        if not isinstance(times, (list, tuple)):
+            times = [times]
+        keep_rows = np.asarray(index.get_level_values("Time").isin(times))
+        index = index[keep_rows]
+
+    conid_codes, conids = pd.factorize(prices.ConId, sort=True)
+    columns = pd.Index(conids, name="ConId")
+    num_rows = len(date_levels) * (num_times if is_intraday else 1)
+    cell_codes = row_codes.astype(np.int64) * len(columns) + conid_codes
+
+    all_fields = {}
+    for field in prices.columns:
+        if field in ("ConId", "Date"):
+            continue
+        values = prices[field].values
+        notnull = np.asarray(pd.notnull(values))
+        field_cell_codes, first_positions = np.unique(cell_codes[notnull], return_index=True)
+        if values.dtype.kind == "f":
+            dtype = values.dtype
+        elif values.dtype.kind in "biu":
+            dtype = np.float64
+        else:
+            dtype = object
+        data = np.full(num_rows * len(columns), np.nan, dtype=dtype)
+        data[field_cell_codes] = values[notnull][first_positions]
+        data = data.reshape(num_rows, len(columns))
+        if keep_rows is not None:
+            data = data[keep_rows]
+        all_fields[field] = pd.DataFrame(data, index=index, columns=columns, copy=False)
+
+    return all_fields
 
 def get_prices(codes, start_date=None, end_date=None,
                universes=None, conids=None,
                exclude_universes=None, exclude_conids=None,
                times=None, fields=None,
                timezone=None, infer_timezone=None,
-               cont_fut=None, master_fields=None):
+               cont_fut=None, master_fields=None, max_workers=None,
+               cache=False, as_dict=False, float32=False):
     """
     Query one or more history databases and/or real-time aggregate databases
     and load prices into a DataFrame.
@@ -101,10 +653,35 @@ def get_prices(codes, start_date=None, end_date=None,
         `quantrocket.master.get_securities_reindexed_like` to get securities master
         data shaped like prices.
 
+    max_workers : int, optional
+        when querying multiple databases, look up their configs and download
+        their data concurrently using up to this many threads (default is to
+        query the databases one after another). Results are combined in the
+        priority order of `codes` either way.
+
+    cache : bool
+        serve repeat queries from a local cache, only downloading data on or
+        after the latest cached date. Requires pyarrow. The cache is stored in
+        QUANTROCKET_PRICES_CACHE_DIR and limited to QUANTROCKET_PRICES_CACHE_MAX_SIZE
+        MB (default 1024). Use `quantrocket.price.clear_cache` to empty it.
+        Default False.
+
+    as_dict : bool
+        return a dict of field -> DataFrame instead of a single MultiIndex
+        DataFrame. Each DataFrame is equivalent to `prices.loc[field]` but is
+        built directly from the downloaded data, which uses less memory for
+        multi-field queries. The DataFrames share the same index and columns.
+        Not supported with `master_fields`. Default False.
+
+    float32 : bool
+        load prices as float32 rather than float64, halving their memory
+        footprint. float32 has about 7 significant digits, so large values
+        such as volumes lose precision. Default False.
+
     Returns
     -------
     DataFrame
-        a MultiIndex
+        a MultiIndex (or dict of DataFrames if as_dict=True)
 
     Notes
     -----
@@ -145,6 +722,11 @@ def get_prices(codes, start_date=None, end_date=None,
                 09:45:00	153.28	2725.0
                 09:50:00	153.18	2725.0
 
+    Or load each field into its own DataFrame:
+
+    >>> prices = get_prices('stk-sample-5min', fields=["Close", "Volume"], as_dict=True)
+    >>> closes = prices["Close"]
+
     Isolate the 15:45:00 prices:
 
     >>> session_closes = closes.xs("15:45:00", level="Time")
@@ -181,9 +763,17 @@ def get_prices(codes, start_date=None, end_date=None,
     if not isinstance(fields, (list, tuple)):
         fields = [fields]
 
+    if as_dict and master_fields:
+        raise ParameterError(
+            "as_dict does not support master_fields, please use "
+            "`quantrocket.master.get_securities_reindexed_like` instead")
+
     # separate history dbs from realtime dbs
-    history_dbs = set(list_history_databases())
-    realtime_dbs = list_realtime_databases()
+    history_dbs, realtime_dbs = _map_in_threads(
+        lambda list_databases: list_databases(),
+        [list_history_databases, list_realtime_databases],
+        max_workers=max_workers)
+    history_dbs = set(history_dbs)
     realtime_agg_dbs = set(itertools.chain(*realtime_dbs.values()))
 
     history_dbs.intersection_update(set(dbs))
@@ -208,8 +798,20 @@ def get_prices(codes, start_date=None, end_date=None,
     history_db_fields = {}
     realtime_db_fields = {}
 
-    for db in history_dbs:
-        db_config = get_history_db_config(db)
+    history_dbs = list(history_dbs)
+    realtime_agg_dbs = list(realtime_agg_dbs)
+
+    db_configs = _map_in_threads(
+        lambda db_and_get_config: db_and_get_config[1](db_and_get_config[0]),
+        [(db, get_history_db_config) for db in history_dbs]
+        + [(db, get_realtime_db_config) for db in realtime_agg_dbs],
+        max_workers=max_workers)
+    history_db_configs = db_configs[:len(history_dbs)]
+    realtime_db_configs = db_configs[len(history_dbs):]
+    history_db_configs_by_db = dict(zip(history_dbs, history_db_configs))
+    realtime_db_configs_by_db = dict(zip(realtime_agg_dbs, realtime_db_configs))
+
+    for db, db_config in zip(history_dbs, history_db_configs):
         bar_size = db_config.get("bar_size")
         db_bar_sizes.add(bar_size)
         # to validate uniform bar sizes, we need to parse them in case dbs
@@ -227,8 +829,7 @@ def get_prices(codes, start_date=None, end_date=None,
         db_domains.add(db_domain)
         history_db_fields[db] = db_config.get("fields", [])
 
-    for db in realtime_agg_dbs:
-        db_config = get_realtime_db_config(db)
+    for db, db_config in zip(realtime_agg_dbs, realtime_db_configs):
         bar_size = db_config.get("bar_size")
         db_bar_sizes.add(bar_size)
         db_bar_sizes_parsed.add(pd.Timedelta(bar_size))
@@ -252,76 +853,78 @@ def get_prices(codes, start_date=None, end_date=None,
             "use different domains: {1}".format(", ".join(dbs), ", ".join(db_domains))
         )
 
-    all_prices = []
+    def _get_history_prices(db):
+        # different DBs might support different fields so only request the
+        # subset of supported fields
+        fields_for_db = set(fields).intersection(set(history_db_fields[db]))
 
-    for db in dbs:
+        kwargs = dict(
+            start_date=start_date,
+            end_date=end_date,
+            universes=universes,
+            conids=conids,
+            exclude_universes=exclude_universes,
+            exclude_conids=exclude_conids,
+            times=times,
+            cont_fut=cont_fut,
+            fields=list(fields_for_db),
+            tz_naive=False,
+            float32=float32
+        )
 
+        try:
+            if cache:
+                return _read_cached_prices_csv(
+                    download_history_file, db, "history",
+                    history_db_configs_by_db[db], **kwargs)
+            return _read_prices_csv(download_history_file, db, "history", **kwargs)
+        except NoHistoricalData as e:
+            # don't complain about NoHistoricalData if we're checking
+            # multiple databases, unless none of them have data
+            if len(dbs) == 1:
+                raise
+            return None
+
+    def _get_realtime_prices(db):
+        fields_for_db = set(fields).intersection(set(realtime_db_fields[db]))
+
+        kwargs = dict(
+            start_date=start_date,
+            end_date=end_date,
+            universes=universes,
+            conids=conids,
+            exclude_universes=exclude_universes,
+            exclude_conids=exclude_conids,
+            fields=list(fields_for_db),
+            float32=float32)
+
+        try:
+            if cache:
+                return _read_cached_prices_csv(
+                    download_market_data_file, db, "realtime",
+                    realtime_db_configs_by_db[db], **kwargs)
+            return _read_prices_csv(download_market_data_file, db, "realtime", **kwargs)
+        except NoRealtimeData as e:
+            # don't complain about NoRealtimeData if we're checking
+            # multiple databases, unless none of them have data
+            if len(dbs) == 1:
+                raise
+            return None
+
+    # Build the downloads in the priority order of dbs; results are
+    # returned in the same order regardless of max_workers
+    downloads = []
+    for db in dbs:
         if db in history_dbs:
-            # different DBs might support different fields so only request the
-            # subset of supported fields
-            fields_for_db = set(fields).intersection(set(history_db_fields[db]))
-
-            kwargs = dict(
-                start_date=start_date,
-                end_date=end_date,
-                universes=universes,
-                conids=conids,
-                exclude_universes=exclude_universes,
-                exclude_conids=exclude_conids,
-                times=times,
-                cont_fut=cont_fut,
-                fields=list(fields_for_db),
-                tz_naive=False
-            )
-
-            tmp_filepath = "{dir}{sep}history.{db}.{pid}.{time}.csv".format(
-                dir=TMP_DIR, sep=os.path.sep, db=db, pid=os.getpid(), time=time.time())
-
-            try:
-                download_history_file(db, tmp_filepath, **kwargs)
-            except NoHistoricalData as e:
-                # don't complain about NoHistoricalData if we're checking
-                # multiple databases, unless none of them have data
-                if len(dbs) == 1:
-                    raise
-                else:
-                    continue
-
-            prices = pd.read_csv(tmp_filepath)
-            all_prices.append(prices)
-
-            os.remove(tmp_filepath)
-
+            downloads.append((_get_history_prices, db))
         if db in realtime_agg_dbs:
+            downloads.append((_get_realtime_prices, db))
 
-            fields_for_db = set(fields).intersection(set(realtime_db_fields[db]))
-
-            kwargs = dict(
-                start_date=start_date,
-                end_date=end_date,
-                universes=universes,
-                conids=conids,
-                exclude_universes=exclude_universes,
-                exclude_conids=exclude_conids,
-                fields=list(fields_for_db))
-
-            tmp_filepath = "{dir}{sep}realtime.{db}.{pid}.{time}.csv".format(
-                dir=TMP_DIR, sep=os.path.sep, db=db, pid=os.getpid(), time=time.time())
-
-            try:
-                download_market_data_file(db, tmp_filepath, **kwargs)
-            except NoRealtimeData as e:
-                # don't complain about NoRealtimeData if we're checking
-                # multiple databases, unless none of them have data
-                if len(dbs) == 1:
-                    raise
-                else:
-                    continue
-
-            prices = pd.read_csv(tmp_filepath)
-            all_prices.append(prices)
-
-            os.remove(tmp_filepath)
+    all_prices = _map_in_threads(
+        lambda get_prices_and_db: get_prices_and_db[0](get_prices_and_db[1]),
+        downloads,
+        max_workers=max_workers)
+    all_prices = [prices for prices in all_prices if prices is not None]
 
     # complain if multiple dbs and none had data
     if len(dbs) > 1 and not all_prices:
@@ -331,6 +934,30 @@ def get_prices(codes, start_date=None, end_date=None,
 
     prices = pd.concat(all_prices, sort=False)
 
+    is_intraday = list(db_bar_sizes_parsed)[0] < pd.Timedelta("1 day")
+
+    if as_dict:
+        if is_intraday and not timezone and infer_timezone is not False:
+            conids = prices.ConId.unique().tolist()
+            domain = list(db_domains)[0] if db_domains else None
+            securities = _get_securities_from_mirror(
+                conids, fields=["Timezone"], domain=domain)
+            if securities is None:
+                f = six.StringIO()
+                download_master_file(
+                    f,
+                    conids=conids,
+                    fields=["Timezone"],
+                    domain=domain
+                )
+                securities = _read_csv(f, "master", index_col="ConId")
+            timezone = _infer_timezone(securities)
+
+        return _pivot_prices_to_dict(
+            prices, is_intraday, timezone=timezone,
+            # see Notes in docstring
+            times=times if realtime_agg_dbs else None)
+
     try:
         prices = prices.pivot(index="ConId", columns="Date").T
     except ValueError as e:
@@ -372,8 +999,6 @@ def get_prices(codes, start_date=None, end_date=None,
     # the user (potentially Timezone)
     internal_master_fields = []
 
-    is_intraday = list(db_bar_sizes_parsed)[0] < pd.Timedelta("1 day")
-
     if is_intraday and not timezone and infer_timezone is not False:
         infer_timezone = True
         if not master_fields or "Timezone" not in master_fields:
@@ -385,14 +1010,17 @@ def get_prices(codes, start_date=None, end_date=None,
 
         domain = list(db_domains)[0] if db_domains else None
 
-        f = six.StringIO()
-        download_master_file(
-            f,
-            conids=conids,
-            fields=master_fields + internal_master_fields,
-            domain=domain
-        )
-        securities = pd.read_csv(f, index_col="ConId")
+        securities = _get_securities_from_mirror(
+            conids, fields=master_fields + internal_master_fields, domain=domain)
+        if securities is None:
+            f = six.StringIO()
+            download_master_file(
+                f,
+                conids=conids,
+                fields=master_fields + internal_master_fields,
+                domain=domain
+            )
+            securities = _read_csv(f, "master", index_col="ConId")
 
         if "Delisted" in securities.columns:
             securities.loc[:, "Delisted"] = securities.Delisted.astype(bool)
@@ -402,15 +1030,7 @@ def get_prices(codes, start_date=None, end_date=None,
 
         # Infer timezone if needed
         if not timezone and infer_timezone:
-            timezones = securities.Timezone.unique()
-
-            if len(timezones) > 1:
-                raise ParameterError(
-                    "cannot infer timezone because multiple timezones are present "
-                    "in data, please specify timezone explicitly (timezones: {0})".format(
-                        ", ".join(timezones)))
-
-            timezone = timezones[0]
+            timezone = _infer_timezone(securities)
 
         # Drop any internal-only fields
         if internal_master_fields:
@@ -441,14 +1061,8 @@ def get_prices(codes, start_date=None, end_date=None,
         ), names=("Field", "Date"))
 
     # Split date and time
-    dts = prices.index.get_level_values("Date")
-    dates = pd.to_datetime(dts.date).tz_localize(None) # drop tz-aware in Date index
-    prices.index = pd.MultiIndex.from_arrays(
-        (prices.index.get_level_values("Field"),
-         dates,
-         dts.strftime("%H:%M:%S")),
-        names=["Field", "Date", "Time"]
-    )
+    datetime_index = _split_date_and_time(prices.index)
+    prices.index = datetime_index
 
     # Align dates if there are any duplicate. Explanation: Suppose there are
     # two timezones represented in the data (e.g. history db in security
@@ -456,9 +1070,10 @@ def get_prices(codes, start_date=None, end_date=None,
     # common timezone, they will align properly, but we pivoted before
     # parsing the dates (for performance reasons), so they may not be
     # aligned. Thus we need to dedupe the index.
-    prices = prices.groupby(prices.index).first()
-    prices.index = pd.MultiIndex.from_tuples(prices.index)
-    prices.index.set_names(["Field", "Date", "Time"], inplace=True)
+    if prices.index.duplicated().any():
+        prices = prices.groupby(level=["Field", "Date", "Time"]).first()
+    else:
+        prices = prices.sort_index()
 
     # Drop time if not intraday
     if not is_intraday:
@@ -471,20 +1086,7 @@ def get_prices(codes, start_date=None, end_date=None,
     #   entries for future times
     # - early close dates will have a full set of times, with NaNs after the
     #   early close
-    unique_fields = prices.index.get_level_values("Field").unique()
-    unique_dates = prices.index.get_level_values("Date").unique()
-    unique_times = prices.index.get_level_values("Time").unique()
-    interpolated_index = None
-    for field in unique_fields:
-        if master_fields and field in master_fields:
-            min_date = prices.loc[field].index.min()
-            field_idx = pd.MultiIndex.from_tuples([(field,min_date[0], min_date[1])])
-        else:
-            field_idx = pd.MultiIndex.from_product([[field], unique_dates, unique_times]).sort_values()
-        if interpolated_index is None:
-            interpolated_index = field_idx
-        else:
-            interpolated_index = interpolated_index.append(field_idx)
+    interpolated_index = _interpolate_times(datetime_index, master_fields=master_fields)
 
     prices = prices.reindex(interpolated_index)
     prices.index.set_names(["Field", "Date", "Time"], inplace=True)
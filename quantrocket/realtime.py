@@ -21,7 +21,10 @@ from quantrocket.houston import houston
 from quantrocket.exceptions import NoRealtimeData, ParameterError
 from quantrocket.cli.utils.output import json_to_cli
 from quantrocket.cli.utils.parse import dict_strs_to_dict, dict_to_dict_strs
+from quantrocket.utils.formats import BINARY_OUTPUTS, _get_with_output_fallback
+from quantrocket.utils.cache import cache_metadata, invalidates_metadata
 
+@invalidates_metadata("realtime.databases")
 def create_tick_db(code, universes=None, conids=None, vendor=None,
                    fields=None, primary_exchange=False):
     """
@@ -87,6 +90,7 @@ def create_tick_db(code, universes=None, conids=None, vendor=None,
 def _cli_create_tick_db(*args, **kwargs):
     return json_to_cli(create_tick_db, *args, **kwargs)
 
+@invalidates_metadata("realtime.databases")
 def create_agg_db(code, tick_db_code, bar_size, fields=None):
     """
     Create an aggregate database from a tick database.
@@ -166,6 +170,7 @@ def _cli_create_agg_db(*args, **kwargs):
         kwargs["fields"] = dict_strs_to_dict(*fields)
     return json_to_cli(create_agg_db, *args, **kwargs)
 
+@cache_metadata("realtime.databases")
 def get_db_config(code):
     """
     Return the configuration for a tick database or aggregate database.
@@ -188,6 +193,7 @@ def get_db_config(code):
 def _cli_get_db_config(*args, **kwargs):
     return json_to_cli(get_db_config, *args, **kwargs)
 
+@invalidates_metadata("realtime.databases")
 def drop_db(code, confirm_by_typing_db_code_again=None, cascade=False):
     """
     Delete a tick database or aggregate database.
@@ -227,6 +233,7 @@ def drop_db(code, confirm_by_typing_db_code_again=None, cascade=False):
 def _cli_drop_db(*args, **kwargs):
     return json_to_cli(drop_db, *args, **kwargs)
 
+@cache_metadata("realtime.databases")
 def list_databases():
     """
     List tick databases and associated aggregate databases.
@@ -345,14 +352,21 @@ def get_active_collections(detail=False):
         subscribed tickers by vendor and database
 
     """
-    params = {}
-    if detail:
-        params["detail"] = detail
+    params = _get_active_collections_params(detail=detail)
 
     response = houston.get("/realtime/collections", params=params)
     houston.raise_for_status_with_json(response)
     return response.json()
 
+def _get_active_collections_params(detail=False):
+    """
+    Returns the query params for `get_active_collections`.
+    """
+    params = {}
+    if detail:
+        params["detail"] = detail
+    return params
+
 def _cli_get_active_collections(*args, **kwargs):
     return json_to_cli(get_active_collections, *args, **kwargs)
 
@@ -423,7 +437,10 @@ def download_market_data_file(code, filepath_or_buffer=None, output="csv",
         filepath to write the data to, or file-like object (defaults to stdout)
 
     output : str
-        output format (json, csv, default is csv)
+        output format (json, csv, arrow, parquet, default is csv). The binary
+        formats (arrow, parquet) require a filepath or binary buffer and fall
+        back to csv, with a warning, if the realtime service doesn't support
+        them
 
     start_date : str (YYYY-MM-DD HH:MM:SS), optional
         limit to market data on or after this datetime. Can pass a date (YYYY-MM-DD),
@@ -470,29 +487,19 @@ def download_market_data_file(code, filepath_or_buffer=None, output="csv",
     --------
     quantrocket.get_prices : load prices into a DataFrame
     """
-    params = {}
-    if start_date:
-        params["start_date"] = start_date
-    if end_date:
-        params["end_date"] = end_date
-    if universes:
-        params["universes"] = universes
-    if conids:
-        params["conids"] = conids
-    if exclude_universes:
-        params["exclude_universes"] = exclude_universes
-    if exclude_conids:
-        params["exclude_conids"] = exclude_conids
-    if fields:
-        params["fields"] = fields
+    params = _get_market_data_file_params(start_date=start_date, end_date=end_date,
+                                          universes=universes, conids=conids,
+                                          exclude_universes=exclude_universes,
+                                          exclude_conids=exclude_conids, fields=fields)
 
     output = output or "csv"
 
-    if output not in ("csv", "json"):
+    if output not in ("csv", "json") + BINARY_OUTPUTS:
         raise ValueError("Invalid ouput: {0}".format(output))
 
-    response = houston.get("/realtime/{0}.{1}".format(code, output), params=params,
-                           timeout=60*30)
+    response, output = _get_with_output_fallback(
+        "realtime", "/realtime/" + code + ".{output}", output, params=params,
+        timeout=60*30, stream=True)
 
     try:
         houston.raise_for_status_with_json(response)
@@ -506,6 +513,29 @@ def download_market_data_file(code, filepath_or_buffer=None, output="csv",
 
     write_response_to_filepath_or_buffer(filepath_or_buffer, response)
 
+def _get_market_data_file_params(start_date=None, end_date=None, universes=None,
+                                 conids=None, exclude_universes=None,
+                                 exclude_conids=None, fields=None):
+    """
+    Returns the query params for `download_market_data_file`.
+    """
+    params = {}
+    if start_date:
+        params["start_date"] = start_date
+    if end_date:
+        params["end_date"] = end_date
+    if universes:
+        params["universes"] = universes
+    if conids:
+        params["conids"] = conids
+    if exclude_universes:
+        params["exclude_universes"] = exclude_universes
+    if exclude_conids:
+        params["exclude_conids"] = exclude_conids
+    if fields:
+        params["fields"] = fields
+    return params
+
 def _cli_download_market_data_file(*args, **kwargs):
     return json_to_cli(download_market_data_file, *args, **kwargs)
 
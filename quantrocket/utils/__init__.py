@@ -13,5 +13,10 @@
 # limitations under the License.
 
 from .dt import segmented_date_range
+from .cache import clear_metadata_cache, get_metadata_cache_stats
 
-__all__ = ["segmented_date_range"]
\ No newline at end of file
+__all__ = [
+    "segmented_date_range",
+    "clear_metadata_cache",
+    "get_metadata_cache_stats",
+]
\ No newline at end of file
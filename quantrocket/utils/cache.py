@@ -0,0 +1,169 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import copy
+import time
+import threading
+from functools import wraps
+from quantrocket.houston import _get_float_from_env
+
+# How long to cache metadata lookups (database configs and lists, universe
+# lists, etc.), in seconds. Set to 0 to turn off caching.
+METADATA_CACHE_TTL = _get_float_from_env("QUANTROCKET_METADATA_CACHE_TTL", 30)
+
+class _MetadataCache(object):
+    """
+    Thread-safe cache of metadata lookups, keyed by namespace and call
+    arguments, with a TTL per entry.
+    """
+
+    def __init__(self):
+        # (namespace, key) -> (expires at, value)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, namespace, key):
+        """
+        Returns (True, value) if the key is cached and unexpired, otherwise
+        (False, None).
+        """
+        with self._lock:
+            entry = self._entries.get((namespace, key), None)
+            if entry is not None and entry[0] > time.time():
+                self.hits += 1
+                return True, entry[1]
+            self.misses += 1
+            return False, None
+
+    def set(self, namespace, key, value, ttl):
+        with self._lock:
+            self._entries[(namespace, key)] = (time.time() + ttl, value)
+
+    def invalidate(self, namespace=None):
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+                return
+            for entry_key in list(self._entries):
+                if entry_key[0] == namespace:
+                    del self._entries[entry_key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries)
+            }
+
+_metadata_cache = _MetadataCache()
+
+def cache_metadata(namespace, ttl=None):
+    """
+    Decorator that caches the return value of a metadata lookup for `ttl`
+    seconds (default QUANTROCKET_METADATA_CACHE_TTL), separately for each
+    houston URL and set of arguments. Callers receive a copy of the cached
+    value.
+
+    Parameters
+    ----------
+    namespace : str, required
+        the cache namespace, used to invalidate related lookups together
+        (see `invalidates_metadata`)
+
+    ttl : float, optional
+        seconds to cache each entry for
+    """
+    def decorator(func):
+
+        @wraps(func)
+        def wrapped(*args, **kwargs):
+            entry_ttl = METADATA_CACHE_TTL if ttl is None else ttl
+            if entry_ttl <= 0:
+                return func(*args, **kwargs)
+
+            try:
+                key = (os.environ.get("HOUSTON_URL"), func.__name__, args,
+                       tuple(sorted(kwargs.items())))
+                hash(key)
+            except TypeError:
+                # unhashable (e.g. list) arguments aren't cached
+                return func(*args, **kwargs)
+
+            is_cached, value = _metadata_cache.get(namespace, key)
+            if not is_cached:
+                value = func(*args, **kwargs)
+                _metadata_cache.set(namespace, key, value, entry_ttl)
+
+            return copy.deepcopy(value)
+
+        return wrapped
+
+    return decorator
+
+def invalidates_metadata(*namespaces):
+    """
+    Decorator that clears the given metadata cache namespaces after the
+    wrapped function is called (whether or not it succeeds).
+
+    Parameters
+    ----------
+    namespaces : str, required
+        the cache namespaces to clear
+    """
+    def decorator(func):
+
+        @wraps(func)
+        def wrapped(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            finally:
+                for namespace in namespaces:
+                    _metadata_cache.invalidate(namespace)
+
+        return wrapped
+
+    return decorator
+
+def clear_metadata_cache(namespace=None):
+    """
+    Clear cached metadata lookups.
+
+    Parameters
+    ----------
+    namespace : str, optional
+        only clear this namespace, for example "history.databases",
+        "realtime.databases", "master.universes", "master.rollrules", or
+        "launchpad.config". Default is to clear all namespaces.
+
+    Returns
+    -------
+    None
+    """
+    _metadata_cache.invalidate(namespace)
+
+def get_metadata_cache_stats():
+    """
+    Return the number of metadata cache hits and misses and the number of
+    cached entries.
+
+    Returns
+    -------
+    dict
+        dict with keys hits, misses, size
+    """
+    return _metadata_cache.stats()
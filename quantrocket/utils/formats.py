@@ -0,0 +1,121 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import threading
+import warnings
+from quantrocket.houston import houston
+
+# Binary output formats which are requested from houston when asked for and
+# fall back to CSV if the server doesn't support them
+BINARY_OUTPUTS = ("arrow", "parquet")
+
+# The first 4 bytes of an Arrow IPC stream (continuation marker)
+ARROW_STREAM_MAGIC = b"\xff\xff\xff\xff"
+
+# (houston url, endpoint, output) combinations which the server rejected
+_unsupported_outputs = set()
+_unsupported_outputs_lock = threading.Lock()
+
+# Whether to warn about falling back to CSV, per thread
+_fallback_warnings = threading.local()
+
+class _quiet_output_fallback(object):
+    """
+    Context manager which suppresses the warning about falling back to CSV
+    for requests made by the current thread, for callers that chose the
+    binary output themselves rather than at the user's request.
+    """
+    def __enter__(self):
+        self.was_enabled = getattr(_fallback_warnings, "enabled", True)
+        _fallback_warnings.enabled = False
+
+    def __exit__(self, *args):
+        _fallback_warnings.enabled = self.was_enabled
+
+def _is_unsupported_output_response(response):
+    """
+    Returns True if the response indicates that the server doesn't know the
+    requested output format (as opposed to an error with the query itself).
+    """
+    if response.status_code in (406, 415, 501):
+        return True
+    if response.status_code in (400, 404):
+        return "output" in response.text.lower()
+    return False
+
+def _get_with_output_fallback(endpoint, url, output, **kwargs):
+    """
+    GETs `url` (which should contain an {output} placeholder for the file
+    extension) from houston in the requested output format.
+
+    If a binary output format is requested and the server doesn't support it,
+    the request is repeated as CSV. Unsupported formats are remembered per
+    houston URL and endpoint so that subsequent requests go straight to CSV.
+    A plain 404 might mean either an unknown format (file extension) or an
+    unknown resource (such as a misspelled database), so it is also retried
+    as CSV but only remembered if the CSV request succeeds.
+
+    Parameters
+    ----------
+    endpoint : str, required
+        name identifying the endpoint, used to remember unsupported formats
+        (for example "history")
+
+    url : str, required
+        the url, with an {output} placeholder
+
+    output : str, required
+        the requested output format
+
+    kwargs :
+        keyword arguments to pass to houston.get
+
+    Returns
+    -------
+    tuple
+        (response, output) where output is the format actually returned
+    """
+    params = kwargs.pop("params", None) or {}
+
+    def _get(output):
+        # pass a copy of params as houston may move long lists into the body
+        return houston.get(url.format(output=output), params=params.copy(), **kwargs)
+
+    if output not in BINARY_OUTPUTS:
+        return _get(output), output
+
+    key = (os.environ.get("HOUSTON_URL"), endpoint, output)
+
+    if key in _unsupported_outputs:
+        return _get("csv"), "csv"
+
+    response = _get(output)
+    is_unsupported = _is_unsupported_output_response(response)
+    if not is_unsupported and response.status_code != 404:
+        return response, output
+
+    response.close()
+    csv_response = _get("csv")
+
+    if is_unsupported or csv_response.status_code < 400:
+        with _unsupported_outputs_lock:
+            _unsupported_outputs.add(key)
+
+        if getattr(_fallback_warnings, "enabled", True):
+            warnings.warn(
+                "{0} output is not supported by the {1} service, falling back to csv".format(
+                    output, endpoint))
+
+    return csv_response, "csv"
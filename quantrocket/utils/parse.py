@@ -12,7 +12,298 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import io
+import os
+import six
 from quantrocket.exceptions import ParameterError
+from quantrocket.utils.formats import ARROW_STREAM_MAGIC
+
+# Known column types of the CSVs returned by houston, by schema. Columns that
+# aren't listed are left to type inference. "numeric" schemas contain only
+# numeric columns besides the listed ones, so they can be parsed by pyarrow
+# without it inferring types (such as timestamps) that pandas wouldn't.
+CSV_SCHEMAS = {
+    "prices": {
+        "dtypes": {
+            "ConId": "int32",
+            "Date": "str",
+        },
+        "numeric": True,
+    },
+    "master": {
+        "dtypes": {
+            "ConId": "int32",
+            "SecType": "category",
+            "PrimaryExchange": "category",
+            "Exchange": "category",
+            "Currency": "category",
+            "Timezone": "category",
+        },
+        "numeric": False,
+    },
+    "fundamentals": {
+        "dtypes": {
+            "ConId": "int32",
+        },
+        "numeric": False,
+    },
+}
+
+# CSV engine for numeric schemas: pyarrow, c, or auto (the default), which
+# uses pyarrow if installed for float32 loads and c otherwise. (For float64
+# loads, pyarrow parses faster but peaks at a higher memory footprint.)
+CSV_ENGINE = os.environ.get("QUANTROCKET_CSV_ENGINE", "auto")
+
+def _get_csv_engine(schema, float32=False):
+    """
+    Returns the engine that _read_csv uses for binary files of this schema,
+    "pyarrow" or "c".
+    """
+    if not CSV_SCHEMAS[schema]["numeric"] or CSV_ENGINE == "c":
+        return "c"
+
+    if CSV_ENGINE != "pyarrow" and not float32:
+        return "c"
+
+    try:
+        import pyarrow.csv
+    except ImportError:
+        return "c"
+
+    return "pyarrow"
+
+def _read_csv(filepath_or_buffer, schema, usecols=None, parse_dates=None,
+              index_col=None, float32=False):
+    """
+    Load a CSV from houston into a DataFrame, applying the known column types
+    of the schema.
+
+    Files in numeric schemas may be parsed with pyarrow (see
+    `_get_csv_engine`), provided they are passed as a filepath or a binary
+    file-like object; otherwise pd.read_csv is used.
+
+    Parameters
+    ----------
+    filepath_or_buffer : str or file-like, required
+        path to CSV
+
+    schema : str, required
+        the key of the schema in CSV_SCHEMAS
+
+    usecols : list of str, optional
+        only load these columns (columns missing from the CSV are ignored)
+
+    parse_dates : list of str, optional
+        parse these columns as dates
+
+    index_col : str, optional
+        set this column as the index
+
+    float32 : bool
+        load numeric columns without a known type as float32 rather than
+        float64/int64. Default False.
+
+    Returns
+    -------
+    DataFrame
+    """
+    try:
+        import pandas as pd
+    except ImportError:
+        raise ImportError("pandas must be installed to use this function")
+
+    dtypes = CSV_SCHEMAS[schema]["dtypes"]
+
+    is_binary = (
+        isinstance(filepath_or_buffer, six.string_types)
+        or "b" in getattr(filepath_or_buffer, "mode", ""))
+
+    if not parse_dates and is_binary and _get_csv_engine(schema, float32=float32) == "pyarrow":
+        if isinstance(filepath_or_buffer, six.string_types):
+            with open(filepath_or_buffer, "rb") as f:
+                return _read_csv_with_pyarrow(
+                    f, dtypes, usecols=usecols, index_col=index_col, float32=float32)
+
+        return _read_csv_with_pyarrow(
+            filepath_or_buffer, dtypes, usecols=usecols, index_col=index_col,
+            float32=float32)
+
+    if usecols:
+        usecols = set(usecols)
+        if index_col:
+            usecols.add(index_col)
+        usecols_set = usecols
+        usecols = lambda col: col in usecols_set
+
+    df = pd.read_csv(filepath_or_buffer, dtype=dtypes, usecols=usecols,
+                     parse_dates=parse_dates, index_col=index_col)
+
+    if float32:
+        for col in df.columns:
+            if col not in dtypes and df[col].dtype.kind in "iuf":
+                df[col] = df[col].astype("float32")
+
+    return df
+
+def _read_csv_with_pyarrow(f, dtypes, usecols=None, index_col=None, float32=False):
+    """
+    Load a CSV from a binary file-like object into a DataFrame with pyarrow.
+    Only suitable for numeric schemas.
+    """
+    import csv
+    import pandas as pd
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    # Read the header ourselves so that every column's type can be given to
+    # pyarrow up front, rather than inferred then cast (which costs a copy)
+    header = f.readline()
+    if not header.strip():
+        raise pd.errors.EmptyDataError("No columns to parse from file")
+    column_names = next(csv.reader([header.decode("utf-8").strip()]))
+
+    keep = None
+    if usecols:
+        keep = set(usecols)
+        if index_col:
+            keep.add(index_col)
+
+    arrow_types = {
+        "int32": pa.int32(),
+        "str": pa.string(),
+        "category": pa.dictionary(pa.int32(), pa.string()),
+    }
+    column_types = {}
+    for col in column_names:
+        if col in dtypes:
+            column_types[col] = arrow_types[dtypes[col]]
+        elif float32:
+            column_types[col] = pa.float32()
+
+    try:
+        table = pa_csv.read_csv(
+            f,
+            read_options=pa_csv.ReadOptions(column_names=column_names),
+            convert_options=pa_csv.ConvertOptions(
+                column_types=column_types,
+                include_columns=[col for col in column_names if keep is None or col in keep]))
+    except pa.ArrowInvalid as e:
+        if "Empty CSV file" not in str(e):
+            raise
+        df = pd.DataFrame(columns=[col for col in column_names if keep is None or col in keep])
+    else:
+        for i, field in enumerate(table.schema):
+            # pyarrow infers all-empty columns as null; pandas parses them as
+            # float64
+            if pa.types.is_null(field.type):
+                table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+
+        df = table.to_pandas(split_blocks=True, self_destruct=True)
+        del table
+
+    if index_col:
+        df = df.set_index(index_col)
+
+    return df
+
+class _PrefixedReader(io.RawIOBase):
+    """
+    Binary reader which returns `prefix` followed by the rest of `f`. Used to
+    put back the bytes consumed when sniffing a stream.
+    """
+    mode = "rb"
+
+    def __init__(self, prefix, f):
+        self._prefix = prefix
+        self._f = f
+        # read what's available rather than blocking for a full buffer
+        self._read = getattr(f, "read1", f.read)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if self._prefix:
+            n = min(len(b), len(self._prefix))
+            b[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+
+        data = self._read(len(b))
+        n = len(data)
+        b[:n] = data
+        return n
+
+def _read_arrow_or_csv(f, schema, float32=False):
+    """
+    Load an Arrow IPC stream or a CSV from houston, depending on which one
+    the binary file-like object contains, into a DataFrame. (Houston returns
+    CSV when the requested arrow output isn't supported.)
+
+    Parameters
+    ----------
+    f : file-like, required
+        binary file-like object
+
+    schema : str, required
+        the key of the schema in CSV_SCHEMAS
+
+    float32 : bool
+        load numeric columns without a known type as float32. Default False.
+
+    Returns
+    -------
+    DataFrame
+    """
+    head = f.read(len(ARROW_STREAM_MAGIC))
+    f = io.BufferedReader(_PrefixedReader(head, f))
+
+    if head == ARROW_STREAM_MAGIC:
+        return _read_arrow_stream(f, schema, float32=float32)
+
+    return _read_csv(f, schema, float32=float32)
+
+def _read_arrow_stream(f, schema, float32=False):
+    """
+    Load an Arrow IPC stream into a DataFrame with the same column types as
+    `_read_csv` would return for the schema.
+    """
+    try:
+        import pandas as pd
+    except ImportError:
+        raise ImportError("pandas must be installed to use this function")
+
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError("pyarrow must be installed to load arrow output")
+
+    dtypes = CSV_SCHEMAS[schema]["dtypes"]
+
+    table = pa.ipc.open_stream(f).read_all()
+    df = table.to_pandas(date_as_object=False, split_blocks=True, self_destruct=True)
+    del table
+
+    for col in df.columns:
+        dtype = dtypes.get(col)
+        if dtype == "str":
+            # the CSV contains ISO strings, so make timestamps look the same
+            if df[col].dtype.kind == "M" or hasattr(df[col].dtype, "tz"):
+                dates = df[col].dt
+                if dates.tz is not None:
+                    df[col] = dates.strftime("%Y-%m-%dT%H:%M:%S%z")
+                elif (dates.normalize() == df[col]).all():
+                    df[col] = dates.strftime("%Y-%m-%d")
+                else:
+                    df[col] = dates.strftime("%Y-%m-%dT%H:%M:%S")
+            elif df[col].dtype != object:
+                df[col] = df[col].astype(str)
+        elif dtype:
+            df[col] = df[col].astype(dtype)
+        elif float32 and df[col].dtype.kind in "iuf":
+            df[col] = df[col].astype("float32")
+
+    return df
 
 def _read_moonshot_or_pnl_csv(filepath_or_buffer):
     """
@@ -0,0 +1,53 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from multiprocessing.pool import ThreadPool
+
+def _map_in_threads(func, items, max_workers=None):
+    """
+    Apply `func` to each item and return the results in the order of
+    `items`.
+
+    If `max_workers` is greater than 1, the items are processed concurrently
+    in a pool of up to `max_workers` threads; otherwise they are processed
+    one after another in the calling thread. The first exception raised by
+    `func` is re-raised.
+
+    Parameters
+    ----------
+    func : callable, required
+        the function to apply to each item
+
+    items : iterable, required
+        the items to process
+
+    max_workers : int, optional
+        maximum number of threads to use
+
+    Returns
+    -------
+    list
+        list of results
+    """
+    items = list(items)
+
+    if not max_workers or max_workers < 2 or len(items) < 2:
+        return [func(item) for item in items]
+
+    pool = ThreadPool(min(max_workers, len(items)))
+    try:
+        return pool.map(func, items, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
@@ -0,0 +1,145 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Python 3 only (async syntax); imported by tests/test_aio.py so that the test
+# suite can still be discovered under Python 2.
+
+import io
+import time
+import asyncio
+import unittest
+try:
+    from unittest.mock import patch
+except ImportError:
+    # py27
+    from mock import patch
+import requests
+try:
+    import httpx
+except ImportError:
+    httpx = None
+from quantrocket.exceptions import NoHistoricalData
+
+def make_response(status_code=200, json=None, content=None):
+    return httpx.Response(
+        status_code, json=json, content=content,
+        request=httpx.Request("GET", "http://houston/history/usa-stk-1d.csv"))
+
+@unittest.skipIf(httpx is None, "httpx not installed")
+class AsyncApiTestCase(unittest.TestCase):
+
+    def test_gather_json_calls(self):
+        """
+        Tests that calls can be awaited concurrently and return the parsed
+        json.
+        """
+        from quantrocket.aio.history import get_db_config
+        from quantrocket.aio.master import list_calendar_statuses
+
+        requests_made = []
+
+        async def mock_get(url, params=None, **kwargs):
+            requests_made.append((url, params))
+            await asyncio.sleep(0)
+            if url == "/master/calendar":
+                return make_response(json={"NYSE": {"status": "open"}})
+            return make_response(json={"bar_size": "1 day"})
+
+        async def main():
+            return await asyncio.gather(
+                get_db_config("usa-stk-1d"),
+                list_calendar_statuses(["NYSE"], outside_rth=True))
+
+        with patch("quantrocket.aio.houston.houston.get", new=mock_get):
+            config, statuses = asyncio.run(main())
+
+        self.assertDictEqual(config, {"bar_size": "1 day"})
+        self.assertDictEqual(statuses, {"NYSE": {"status": "open"}})
+        self.assertListEqual(
+            requests_made,
+            [("/history/databases/usa-stk-1d", None),
+             ("/master/calendar", {"exchanges": ["NYSE"], "outside_rth": True})])
+
+    def test_download_file_and_raise_same_exceptions(self):
+        """
+        Tests that downloads are written to text buffers and that errors are
+        raised as the same exceptions as the sync API.
+        """
+        from quantrocket.aio.history import download_history_file, get_db_config
+
+        async def mock_get(url, params=None, **kwargs):
+            if params.get("conids") == [1]:
+                return make_response(content="ConId,Date,Close\n1,2018-01-01,1.0\n".encode("utf-8"))
+            return make_response(
+                status_code=400,
+                json={"status": "error", "msg": "no history matches the query parameters"})
+
+        f = io.StringIO()
+        with patch("quantrocket.aio.houston.houston.get", new=mock_get):
+            asyncio.run(download_history_file("usa-stk-1d", f, conids=[1]))
+            self.assertEqual(f.read(), "ConId,Date,Close\n1,2018-01-01,1.0\n")
+
+            with self.assertRaises(NoHistoricalData):
+                asyncio.run(download_history_file("usa-stk-1d", io.StringIO(), conids=[2]))
+
+        async def mock_get(url, params=None, **kwargs):
+            return make_response(
+                status_code=400, json={"status": "error", "msg": "no such db"})
+
+        with patch("quantrocket.aio.houston.houston.get", new=mock_get):
+            with self.assertRaises(requests.HTTPError) as cm:
+                asyncio.run(get_db_config("nosuchdb"))
+
+        self.assertIn("no such db", repr(cm.exception))
+        self.assertEqual(cm.exception.json_response["msg"], "no such db")
+
+    def test_segmented_download_does_not_block_event_loop(self):
+        """
+        Tests that other tasks keep running while the segments of a segmented
+        download are written to disk and stitched together.
+        """
+        from quantrocket.aio.history import download_history_file
+        from quantrocket.history import _write_csv_files_to_filepath_or_buffer
+
+        async def mock_get(url, params=None, **kwargs):
+            conid = params["conids"][0]
+            return make_response(
+                content="ConId,Date,Close\n{0},2018-01-01,1.0\n".format(conid).encode("utf-8"))
+
+        ticks = []
+        ticks_during_stitch = []
+
+        def slow_write_csv_files(*args, **kwargs):
+            ticks_before = len(ticks)
+            time.sleep(0.2)
+            ticks_during_stitch.append(len(ticks) - ticks_before)
+            return _write_csv_files_to_filepath_or_buffer(*args, **kwargs)
+
+        async def main(f):
+            download = asyncio.ensure_future(download_history_file(
+                "usa-stk-1d", f, conids=[1, 2], conid_batch_size=1))
+            while not download.done():
+                ticks.append(1)
+                await asyncio.sleep(0.01)
+            await download
+
+        f = io.StringIO()
+        with patch("quantrocket.aio.houston.houston.get", new=mock_get):
+            with patch("quantrocket.aio.history._write_csv_files_to_filepath_or_buffer",
+                       new=slow_write_csv_files):
+                asyncio.run(main(f))
+
+        self.assertEqual(f.read(), "ConId,Date,Close\n1,2018-01-01,1.0\n2,2018-01-01,1.0\n")
+        self.assertEqual(len(ticks_during_stitch), 1)
+        self.assertGreater(ticks_during_stitch[0], 5)
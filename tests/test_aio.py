@@ -0,0 +1,22 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# To run: python -m unittest discover -s tests/ -p test*.py -t .
+
+import six
+
+# the async tests use syntax that doesn't compile under Python 2, so they
+# live in a module that isn't discovered on its own
+if six.PY3:
+    from tests.aio_cases import AsyncApiTestCase
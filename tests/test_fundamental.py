@@ -15,11 +15,13 @@
 # To run: python -m unittest discover -s tests/ -p test*.py -t .
 
 import unittest
+import multiprocessing
 try:
     from unittest.mock import patch
 except ImportError:
     # py27
     from mock import patch
+import requests
 import pandas as pd
 import pytz
 import numpy as np
@@ -29,9 +31,57 @@ from quantrocket.fundamental import (
     get_borrow_fees_reindexed_like,
     get_shortable_shares_reindexed_like,
     get_sharadar_fundamentals_reindexed_like,
-    get_wsh_earnings_dates_reindexed_like
+    get_wsh_earnings_dates_reindexed_like,
+    get_reindexed_like_bundle,
+    _reindex_events_like,
+    _get_security_timezones,
+    _check_reindex_like,
+    _sharadar_incremental_cache
 )
-from quantrocket.exceptions import ParameterError, MissingData
+from quantrocket.exceptions import ParameterError, MissingData, NoFundamentalData
+
+class ReindexEventsLikeTestCase(unittest.TestCase):
+
+    def test_reindex_events_like(self):
+        """
+        Tests that each cell gets the latest non-null value as of (or
+        strictly before) its date, regardless of index order.
+        """
+        index = pd.DatetimeIndex(
+            ["2018-01-05", "2018-01-01", "2018-01-03", "2018-01-04"], name="Date")
+        columns = pd.Index([12345, 23456], name="ConId")
+        events = pd.DataFrame(dict(
+            ConId=[12345, 12345, 12345, 23456, 23456, 99999],
+            Date=pd.to_datetime([
+                "2017-12-31", "2018-01-02", "2018-01-03", "2018-01-03", "2018-01-04", "2018-01-01"]),
+            Amount=[1.0, 2.0, 3.0, 10.0, np.nan, 99.0],
+            Currency=["USD", "CAD", "EUR", "JPY", "GBP", "CHF"]))
+
+        results = _reindex_events_like(events, index, columns)
+        self.assertListEqual(sorted(results), ["Amount", "Currency"])
+        amounts = results["Amount"]
+        self.assertTrue(amounts.index.equals(index))
+        self.assertTrue(amounts.columns.equals(columns))
+        self.assertListEqual(
+            amounts.fillna("nan").values.tolist(),
+            [[3.0, 10.0],
+             [1.0, "nan"],
+             [3.0, 10.0],
+             [3.0, 10.0]])
+        self.assertListEqual(
+            results["Currency"].fillna("nan").values.tolist(),
+            [["EUR", "GBP"],
+             ["USD", "nan"],
+             ["EUR", "JPY"],
+             ["EUR", "GBP"]])
+
+        results = _reindex_events_like(events, index, columns, strict=True)
+        self.assertListEqual(
+            results["Amount"].fillna("nan").values.tolist(),
+            [[3.0, 10.0],
+             [1.0, "nan"],
+             [2.0, "nan"],
+             [3.0, 10.0]])
 
 class ReutersEstimatesReindexedLikeTestCase(unittest.TestCase):
 
@@ -1238,6 +1288,21 @@ class ReutersFinancialsReindexedLikeTestCase(unittest.TestCase):
         self.assertTrue((atots.loc[atots.index <= "2018-07-23"] == 580).all())
         self.assertTrue((atots.loc[atots.index > "2018-07-23"].isnull()).all())
 
+        # with a tz-aware index, max_lag is measured in wall time
+        closes.index = closes.index.tz_localize("America/New_York")
+        with patch('quantrocket.fundamental.download_reuters_financials', new=mock_download_reuters_financials):
+
+            financials = get_reuters_financials_reindexed_like(
+                closes, ["ATOT"], interim=True, max_lag="23D",
+                fields=["Amount", "FiscalPeriodEndDate"])
+
+        atots = financials.loc["ATOT"].loc["Amount"][12345]
+        self.assertListEqual(
+            atots.fillna("nan").tolist(), [580, 580, 580, 580, "nan", "nan"])
+        fiscal_period_end_dates = financials.loc["ATOT"].loc["FiscalPeriodEndDate"][12345]
+        self.assertEqual(fiscal_period_end_dates.iloc[0], pd.Timestamp("2018-06-30"))
+        self.assertTrue(fiscal_period_end_dates.iloc[4:].isnull().all())
+
     def test_tz_aware_index(self):
         """
         Tests that reindex_like.index can be tz-naive or tz-aware.
@@ -2087,6 +2152,54 @@ class StockloanDataReindexedLikeTestCase(unittest.TestCase):
                  {'Date': '2018-05-03T00:00:00-0400', 12345: 80000.0, 23456: 3100.0}]
             )
 
+    def test_pass_time_across_dst(self):
+        """
+        Tests that the time arg is interpreted as local time on DST transition
+        dates.
+        """
+
+        closes = pd.DataFrame(
+            np.random.rand(3,1),
+            columns=[12345],
+            index=pd.date_range(start="2018-03-10",
+                                periods=3,
+                                freq="D",
+                                tz="America/New_York",
+                                name="Date"))
+
+        def mock_download_shortable_shares(f, *args, **kwargs):
+            shortable_shares = pd.DataFrame(
+                dict(Date=["2018-03-09T21:45:02",
+                           # 09:15 EDT
+                           "2018-03-11T13:15:00",
+                           # 09:45 EDT
+                           "2018-03-11T13:45:00",
+                           ],
+                     ConId=[12345,
+                            12345,
+                            12345],
+                     Quantity=[10000,
+                               9000,
+                               8000
+                               ]))
+            shortable_shares.to_csv(f, index=False)
+            f.seek(0)
+
+        with patch('quantrocket.fundamental.download_shortable_shares', new=mock_download_shortable_shares):
+
+            shortable_shares = get_shortable_shares_reindexed_like(
+                closes,
+                time="09:30:00")
+
+            shortable_shares = shortable_shares.reset_index()
+            shortable_shares.loc[:, "Date"] = shortable_shares.Date.dt.strftime("%Y-%m-%dT%H:%M:%S%z")
+            self.assertListEqual(
+                shortable_shares.to_dict(orient="records"),
+                [{'Date': '2018-03-10T00:00:00-0500', 12345: 10000.0},
+                 {'Date': '2018-03-11T00:00:00-0500', 12345: 9000.0},
+                 {'Date': '2018-03-12T00:00:00-0400', 12345: 8000.0}]
+            )
+
     def test_no_pass_time(self):
         """
         Tests that, when no time arg is passed, the reindex_like times are
@@ -2526,4 +2639,415 @@ class SharadarFundamentalsReindexedLikeTestCase(unittest.TestCase):
              {'Date': '2018-07-06T00:00:00-0400', 12345: 580.0},
              {'Date': '2018-07-07T00:00:00-0400', 12345: 542.0},
              {'Date': '2018-07-08T00:00:00-0400', 12345: 542.0}]
-        )
\ No newline at end of file
+        )
+
+class ReindexedLikeBundleTestCase(unittest.TestCase):
+
+    def test_complain_if_invalid_dataset(self):
+        closes = pd.DataFrame(
+            np.random.rand(3,1),
+            columns=[12345],
+            index=pd.date_range(start="2018-05-01", periods=3, freq="D", name="Date"))
+
+        with self.assertRaises(ParameterError) as cm:
+            get_reindexed_like_bundle(closes, {"fees": {"dataset": "borrowfees"}})
+
+        self.assertIn("invalid dataset for fees: borrowfees", str(cm.exception))
+
+    def test_load_datasets_and_share_timezones(self):
+        """
+        Tests that datasets are loaded and returned by name and that
+        reindex_like is validated and timezones are looked up once for the
+        stockloan datasets.
+        """
+        closes = pd.DataFrame(
+            np.random.rand(3,2),
+            columns=[12345,23456],
+            index=pd.date_range(start="2018-05-01",
+                                periods=3,
+                                freq="D",
+                                name="Date"))
+
+        timezone_requests = []
+
+        def mock_download_master_file(f, *args, **kwargs):
+            if kwargs["fields"] == ["Timezone"]:
+                timezone_requests.append(kwargs["conids"])
+            securities = pd.DataFrame(dict(ConId=[12345,23456],
+                                           Timezone=["Japan","Japan"],
+                                           Symbol=["ABC","DEF"]))
+            securities[["ConId"] + kwargs["fields"]].to_csv(f, index=False)
+            f.seek(0)
+
+        def mock_download_stockloan_data(field):
+            def _mock_download_stockloan_data(f, *args, **kwargs):
+                stockloan_data = pd.DataFrame(
+                    {"Date": ["2018-04-20T21:45:02",
+                              "2018-05-01T13:45:02",
+                              "2018-04-20T21:45:02",
+                              "2018-05-02T14:30:03"],
+                     "ConId": [12345,
+                               12345,
+                               23456,
+                               23456],
+                     field: [10000,
+                             9000,
+                             3500,
+                             3800]})
+                stockloan_data.to_csv(f, index=False)
+                f.seek(0)
+            return _mock_download_stockloan_data
+
+        with patch('quantrocket.fundamental.download_master_file', new=mock_download_master_file):
+            with patch('quantrocket.master.download_master_file', new=mock_download_master_file):
+                with patch('quantrocket.fundamental.download_shortable_shares',
+                           new=mock_download_stockloan_data("Quantity")):
+                    with patch('quantrocket.fundamental.download_borrow_fees',
+                               new=mock_download_stockloan_data("FeeRate")):
+
+                        with patch('quantrocket.fundamental._check_reindex_like',
+                                   wraps=_check_reindex_like) as mock_check_reindex_like:
+
+                            data = get_reindexed_like_bundle(closes, {
+                                "shortable_shares": {"dataset": "shortable_shares", "time": "09:30:00"},
+                                "borrow_fees": {"dataset": "borrow_fees", "time": "09:30:00"},
+                                "securities": {"dataset": "securities", "domain": "main", "fields": ["Symbol"]},
+                            })
+
+        self.assertListEqual(sorted(data), ["borrow_fees", "securities", "shortable_shares"])
+        self.assertListEqual(timezone_requests, [[12345,23456]])
+        # reindex_like is validated once by the bundle, not again per dataset
+        self.assertEqual(mock_check_reindex_like.call_count, 1)
+        self.assertListEqual(
+            data["shortable_shares"].values.tolist(),
+            [[10000.0, 3500.0],
+             [9000.0, 3500.0],
+             [9000.0, 3800.0]])
+        self.assertListEqual(
+            data["borrow_fees"].values.tolist(),
+            [[10000.0, 3500.0],
+             [9000.0, 3500.0],
+             [9000.0, 3800.0]])
+        self.assertListEqual(
+            data["securities"].loc["Symbol"].values.tolist(),
+            [["ABC", "DEF"]] * 3)
+
+    def test_use_prefetched_timezones_only_if_passed_and_complete(self):
+        """
+        Tests that prefetched timezones are used only when passed
+        explicitly and only if they include all the requested conids.
+        """
+        prefetched_timezones = pd.DataFrame(
+            dict(Timezone=["Japan", "America/New_York"]),
+            index=pd.Index([12345, 23456], name="ConId"))
+
+        timezone_requests = []
+
+        def mock_download_master_file(f, *args, **kwargs):
+            timezone_requests.append(kwargs["conids"])
+            securities = pd.DataFrame(dict(ConId=kwargs["conids"],
+                                           Timezone=["Europe/London"] * len(kwargs["conids"])))
+            securities.to_csv(f, index=False)
+            f.seek(0)
+
+        with patch('quantrocket.fundamental.download_master_file', new=mock_download_master_file):
+            with patch('quantrocket.fundamental._get_securities_from_mirror', return_value=None):
+
+                timezones = _get_security_timezones(
+                    [23456], prefetched_timezones=prefetched_timezones)
+                self.assertListEqual(timezones.Timezone.tolist(), ["America/New_York"])
+
+                timezones = _get_security_timezones(
+                    [], prefetched_timezones=prefetched_timezones)
+                self.assertTrue(timezones.empty)
+
+                self.assertListEqual(timezone_requests, [])
+
+                timezones = _get_security_timezones(
+                    [23456, 34567], prefetched_timezones=prefetched_timezones)
+                self.assertListEqual(timezones.Timezone.tolist(), ["Europe/London"] * 2)
+
+                timezones = _get_security_timezones([23456])
+                self.assertListEqual(timezones.Timezone.tolist(), ["Europe/London"])
+
+        self.assertListEqual(timezone_requests, [[23456, 34567], [23456]])
+
+class ReindexedLikeChunksTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.closes = pd.DataFrame(
+            np.random.rand(6,5),
+            columns=[12345,23456,34567,45678,56789],
+            index=pd.date_range(start="2018-07-20", periods=6, freq="D", name="Date"))
+
+    @staticmethod
+    def mock_download_sharadar_fundamentals(domain, filepath_or_buffer, *args, **kwargs):
+        # no data for 45678
+        conids = [conid for conid in kwargs["conids"] if conid != 45678]
+        fundamentals = pd.DataFrame(
+            dict(
+                DATEKEY=["2018-04-23", "2018-07-23"] * len(conids),
+                ConId=sorted(conids * 2),
+                EPS=[conid + i for conid in sorted(conids) for i in (0.0, 1.0)],
+                REVENUE=[conid * 10 + i for conid in sorted(conids) for i in (0.0, 1.0)]))
+        if fundamentals.empty:
+            raise NoFundamentalData(
+                requests.HTTPError("no fundamental data match the query parameters"))
+        fundamentals.to_csv(filepath_or_buffer, index=False)
+        filepath_or_buffer.seek(0)
+
+    def test_chunked_results_match_unchunked(self):
+        """
+        Tests that processing conids in chunks gives the same result as
+        processing them all at once, including conids without data.
+        """
+        with patch('quantrocket.fundamental.download_sharadar_fundamentals',
+                   new=self.mock_download_sharadar_fundamentals):
+
+            fundamentals = get_sharadar_fundamentals_reindexed_like(
+                self.closes, domain="main", fields=["EPS", "REVENUE"])
+
+            for chunksize in (1, 2, 3):
+                chunked_fundamentals = get_sharadar_fundamentals_reindexed_like(
+                    self.closes, domain="main", fields=["EPS", "REVENUE"], chunksize=chunksize)
+                self.assertTrue(chunked_fundamentals.equals(fundamentals))
+
+        self.assertTrue(fundamentals[45678].isnull().all())
+        self.assertEqual(fundamentals[56789].loc["EPS"].loc["2018-07-23"], 56789)
+        self.assertEqual(fundamentals[56789].loc["EPS"].loc["2018-07-24"], 56790)
+
+    def test_chunked_dtypes_match_unchunked(self):
+        """
+        Tests that integer and boolean fields have the same dtypes whether
+        or not conids are processed in chunks: their own dtypes if nothing
+        is missing, else NaN-able ones.
+        """
+        def mock_download_sharadar_fundamentals(missing_conid):
+            def _mock_download_sharadar_fundamentals(domain, filepath_or_buffer, *args, **kwargs):
+                conids = [conid for conid in kwargs["conids"] if conid != missing_conid]
+                fundamentals = pd.DataFrame(
+                    dict(
+                        DATEKEY=["2018-04-23"] * len(conids),
+                        ConId=conids,
+                        SHARESWA=[conid * 10 for conid in conids],
+                        ISACTIVE=[conid % 2 == 0 for conid in conids]))
+                if fundamentals.empty:
+                    raise NoFundamentalData(
+                        requests.HTTPError("no fundamental data match the query parameters"))
+                fundamentals.to_csv(filepath_or_buffer, index=False)
+                filepath_or_buffer.seek(0)
+            return _mock_download_sharadar_fundamentals
+
+        for missing_conid, int_dtype, bool_dtype in (
+                (None, np.int64, np.bool_),
+                (45678, np.float64, object)):
+
+            with patch('quantrocket.fundamental.download_sharadar_fundamentals',
+                       new=mock_download_sharadar_fundamentals(missing_conid)):
+
+                for field, dtype in (("SHARESWA", int_dtype), ("ISACTIVE", bool_dtype)):
+                    fundamentals = get_sharadar_fundamentals_reindexed_like(
+                        self.closes, domain="main", fields=[field])
+                    self.assertTrue((fundamentals.dtypes == dtype).all())
+
+                    for chunksize in (1, 2, 3):
+                        chunked_fundamentals = get_sharadar_fundamentals_reindexed_like(
+                            self.closes, domain="main", fields=[field], chunksize=chunksize)
+                        self.assertTrue(chunked_fundamentals.equals(fundamentals))
+                        self.assertTrue((chunked_fundamentals.dtypes == dtype).all())
+
+    @unittest.skipUnless(
+        getattr(multiprocessing, "get_start_method", lambda: "fork")() == "fork",
+        "requires fork to share mocks")
+    def test_chunks_in_processes(self):
+        """
+        Tests that chunks can be processed in a process pool.
+        """
+        with patch('quantrocket.fundamental.download_sharadar_fundamentals',
+                   new=self.mock_download_sharadar_fundamentals):
+
+            fundamentals = get_sharadar_fundamentals_reindexed_like(
+                self.closes, domain="main", fields=["EPS", "REVENUE"])
+            chunked_fundamentals = get_sharadar_fundamentals_reindexed_like(
+                self.closes, domain="main", fields=["EPS", "REVENUE"], chunksize=2,
+                processes=2)
+
+        self.assertTrue(chunked_fundamentals.equals(fundamentals))
+
+    def test_infer_stockloan_timezone_from_all_chunks(self):
+        """
+        Tests that, when processing stockloan data in chunks, the timezone is
+        inferred from all conids rather than per chunk.
+        """
+        def mock_download_master_file(f, *args, **kwargs):
+            securities = pd.DataFrame(dict(ConId=[12345,23456,34567,45678,56789],
+                                           Timezone=["Japan"] * 4 + ["America/New_York"]))
+            securities = securities.loc[securities.ConId.isin(kwargs["conids"])]
+            securities.to_csv(f, index=False)
+            f.seek(0)
+
+        def mock_download_shortable_shares(f, *args, **kwargs):
+            shortable_shares = pd.DataFrame(
+                dict(Date=["2018-07-19T21:45:02"] * len(kwargs["conids"]),
+                     ConId=kwargs["conids"],
+                     Quantity=[10000] * len(kwargs["conids"])))
+            shortable_shares.to_csv(f, index=False)
+            f.seek(0)
+
+        with patch('quantrocket.fundamental.download_master_file', new=mock_download_master_file):
+            with patch('quantrocket.fundamental.download_shortable_shares', new=mock_download_shortable_shares):
+
+                with self.assertRaises(ParameterError) as cm:
+                    get_shortable_shares_reindexed_like(self.closes, chunksize=2)
+
+                self.assertIn("multiple timezones are present in data", str(cm.exception))
+
+                shortable_shares = get_shortable_shares_reindexed_like(
+                    self.closes.iloc[:, :4], time="09:30:00")
+                chunked_shortable_shares = get_shortable_shares_reindexed_like(
+                    self.closes.iloc[:, :4], time="09:30:00", chunksize=3)
+
+        self.assertTrue(chunked_shortable_shares.equals(shortable_shares))
+        self.assertTrue(chunked_shortable_shares.index.equals(self.closes.index))
+
+class SharadarIncrementalTestCase(unittest.TestCase):
+
+    def setUp(self):
+        _sharadar_incremental_cache.clear()
+        self.download_calls = []
+
+    def tearDown(self):
+        _sharadar_incremental_cache.clear()
+
+    def mock_download_sharadar_fundamentals(self, domain, filepath_or_buffer, *args, **kwargs):
+        self.download_calls.append(kwargs)
+        fundamentals = pd.DataFrame(
+            dict(
+                DATEKEY=[
+                    "2018-01-10", "2018-04-10", "2018-07-20", "2018-07-20",
+                    "2018-07-23", "2018-07-25", "2018-07-25"],
+                ConId=[12345, 12345, 12345, 23456, 12345, 23456, 23456],
+                EPS=[1.0, 2.0, 3.0, 30.0, 4.0, 40.0, 41.0],
+                # a later filing with a missing value on the same day
+                REVENUE=[10.0, 20.0, 30.0, 300.0, np.nan, 400.0, np.nan]))
+        fundamentals = fundamentals[
+            (fundamentals.DATEKEY >= kwargs["start_date"])
+            & (fundamentals.DATEKEY <= kwargs["end_date"])]
+        if fundamentals.empty:
+            raise NoFundamentalData(
+                requests.HTTPError("no fundamental data match the query parameters"))
+        fundamentals.to_csv(filepath_or_buffer, index=False)
+        filepath_or_buffer.seek(0)
+
+    def test_incremental_results_match_full_results(self):
+        """
+        Tests that, as a rolling index grows by one day at a time, incremental
+        results match full results and only recent fundamentals are queried
+        again.
+        """
+        dates = pd.date_range(start="2018-07-15", periods=15, freq="D", name="Date")
+
+        with patch('quantrocket.fundamental.download_sharadar_fundamentals',
+                   new=self.mock_download_sharadar_fundamentals):
+
+            for i in range(5, 15):
+                closes = pd.DataFrame(
+                    np.random.rand(5,2),
+                    columns=[12345,23456],
+                    index=dates[i-5:i])
+
+                fundamentals = get_sharadar_fundamentals_reindexed_like(
+                    closes, domain="main", fields=["EPS", "REVENUE"])
+                incremental_fundamentals = get_sharadar_fundamentals_reindexed_like(
+                    closes, domain="main", fields=["EPS", "REVENUE"], incremental=True)
+                self.assertTrue(incremental_fundamentals.equals(fundamentals))
+
+        # first incremental call is a full query, later calls start from the
+        # latest filing date seen
+        incremental_start_dates = [call["start_date"] for call in self.download_calls[1::2]]
+        self.assertEqual(incremental_start_dates[0], "2017-01-16")
+        self.assertListEqual(
+            incremental_start_dates[1:],
+            ["2018-04-10"] + ["2018-07-20"] * 3 + ["2018-07-23"] * 2 + ["2018-07-25"] * 3)
+
+        self.assertEqual(fundamentals[23456].loc["REVENUE"].loc["2018-07-28"], 300)
+        self.assertEqual(fundamentals[12345].loc["REVENUE"].loc["2018-07-28"], 30)
+        self.assertEqual(fundamentals[23456].loc["EPS"].loc["2018-07-28"], 41)
+
+    def test_rolling_window_drops_filings_before_lookback(self):
+        """
+        Tests that, as a rolling index's min date moves forward, fundamentals
+        filed before the lookback window drop out of incremental results as
+        they do from full results.
+        """
+        def mock_download_sharadar_fundamentals(domain, filepath_or_buffer, *args, **kwargs):
+            self.download_calls.append(kwargs)
+            fundamentals = pd.DataFrame(
+                dict(
+                    DATEKEY=["2017-01-07", "2017-01-08", "2017-01-12", "2018-07-12", "2018-07-14"],
+                    ConId=[34567, 23456, 12345, 23456, 12345],
+                    EPS=[7.0, 5.0, 1.0, 6.0, 2.0]))
+            fundamentals = fundamentals[
+                (fundamentals.DATEKEY >= kwargs["start_date"])
+                & (fundamentals.DATEKEY <= kwargs["end_date"])]
+            if fundamentals.empty:
+                raise NoFundamentalData(
+                    requests.HTTPError("no fundamental data match the query parameters"))
+            fundamentals.to_csv(filepath_or_buffer, index=False)
+            filepath_or_buffer.seek(0)
+
+        dates = pd.date_range(start="2018-07-05", periods=20, freq="D", name="Date")
+
+        with patch('quantrocket.fundamental.download_sharadar_fundamentals',
+                   new=mock_download_sharadar_fundamentals):
+
+            for i in range(5, 20):
+                closes = pd.DataFrame(
+                    np.random.rand(5,3),
+                    columns=[12345,23456,34567],
+                    index=dates[i-5:i])
+
+                fundamentals = get_sharadar_fundamentals_reindexed_like(
+                    closes, domain="main", fields=["EPS"])
+                incremental_fundamentals = get_sharadar_fundamentals_reindexed_like(
+                    closes, domain="main", fields=["EPS"], incremental=True)
+                self.assertTrue(incremental_fundamentals.equals(fundamentals))
+
+        # after the first call, all incremental calls were cache hits which
+        # started from the latest filing date seen
+        incremental_start_dates = [call["start_date"] for call in self.download_calls[1::2]]
+        self.assertEqual(incremental_start_dates[0], "2017-01-06")
+        self.assertListEqual(
+            incremental_start_dates[1:],
+            ["2017-01-12"] * 3 + ["2018-07-12"] * 2 + ["2018-07-14"] * 9)
+
+        # the last window starts 2018-07-19, so its lookback starts 2017-01-20
+        self.assertTrue(fundamentals[34567].isnull().all())
+        self.assertListEqual(
+            fundamentals[12345].loc["EPS"].tolist(), [2.0] * 5)
+        self.assertListEqual(
+            fundamentals[23456].loc["EPS"].tolist(), [6.0] * 5)
+
+    def test_full_query_if_index_changes(self):
+        """
+        Tests that the cache isn't used if the new index has dates before the
+        cached max date that weren't cached.
+        """
+        closes = pd.DataFrame(
+            np.random.rand(5,2),
+            columns=[12345,23456],
+            index=pd.date_range(start="2018-07-20", periods=5, freq="D", name="Date"))
+
+        with patch('quantrocket.fundamental.download_sharadar_fundamentals',
+                   new=self.mock_download_sharadar_fundamentals):
+
+            get_sharadar_fundamentals_reindexed_like(
+                closes, domain="main", fields=["EPS", "REVENUE"], incremental=True)
+            closes = closes.reindex(
+                pd.date_range(start="2018-07-19", periods=7, freq="D", name="Date"))
+            get_sharadar_fundamentals_reindexed_like(
+                closes, domain="main", fields=["EPS", "REVENUE"], incremental=True)
+
+        self.assertListEqual(
+            [call["start_date"] for call in self.download_calls],
+            ["2017-01-21", "2017-01-20"])
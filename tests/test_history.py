@@ -0,0 +1,344 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# To run: python -m unittest discover -s tests/ -p test*.py -t .
+
+import io
+import json
+import threading
+import unittest
+import warnings
+try:
+    from unittest.mock import patch
+except ImportError:
+    # py27
+    from mock import patch
+import requests
+from quantrocket.history import download_history_file
+from quantrocket.exceptions import ParameterError, NoHistoricalData
+from quantrocket.utils.formats import _unsupported_outputs
+
+def make_response(content, status_code=200):
+    response = requests.Response()
+    response.status_code = status_code
+    response.reason = "OK" if status_code == 200 else "Error"
+    response.url = "http://houston/history/usa-stk-1min.csv"
+    response._content = content
+    response._content_consumed = True
+    return response
+
+def no_history_response():
+    return make_response(
+        json.dumps({"status": "error", "msg": "no history matches the query parameters"}).encode("utf-8"),
+        status_code=400)
+
+class DownloadHistoryFileInSegmentsTestCase(unittest.TestCase):
+
+    def test_complain_if_segment_without_dates_or_batch_without_conids(self):
+        """
+        Tests error handling when segmenting without start/end dates, batching
+        without conids, or segmenting non-CSV output.
+        """
+        with self.assertRaises(ParameterError) as cm:
+            download_history_file("usa-stk-1min", io.StringIO(),
+                                  start_date="2018-01-01", segment="A")
+
+        self.assertIn("start_date and end_date are required", repr(cm.exception))
+
+        with self.assertRaises(ParameterError) as cm:
+            download_history_file("usa-stk-1min", io.StringIO(),
+                                  universes=["usa-stk"], conid_batch_size=2)
+
+        self.assertIn("conids are required", repr(cm.exception))
+
+        with self.assertRaises(ParameterError) as cm:
+            download_history_file("usa-stk-1min", io.StringIO(), output="json",
+                                  start_date="2018-01-01", end_date="2018-12-31",
+                                  segment="Q")
+
+        self.assertIn("only supported for csv output", repr(cm.exception))
+
+    def test_segment_by_date_and_conid_batch_and_stitch_in_order(self):
+        """
+        Tests that the query is split into date segments and conid batches,
+        which are downloaded concurrently and stitched together in order with
+        a single header.
+        """
+        requests_made = []
+        lock = threading.Lock()
+
+        def mock_get(url, params=None, *args, **kwargs):
+            with lock:
+                requests_made.append((url, params))
+            rows = ["ConId,Date,Close"]
+            for conid in params["conids"]:
+                rows.append("{0},{1},1.0".format(conid, params["start_date"]))
+                rows.append("{0},{1},2.0".format(conid, params["end_date"]))
+            return make_response(("\n".join(rows) + "\n").encode("utf-8"))
+
+        f = io.StringIO()
+        with patch("quantrocket.history.houston.get", new=mock_get):
+            download_history_file("usa-stk-1min", f,
+                                  start_date="2017-06-01", end_date="2018-12-31",
+                                  conids=[1, 2, 3], fields=["Close"],
+                                  segment="A", conid_batch_size=2, max_workers=3)
+
+        self.assertEqual(len(requests_made), 4)
+        self.assertListEqual(
+            sorted(
+                [(params["start_date"], params["end_date"], params["conids"])
+                 for url, params in requests_made]),
+            [("2017-06-01", "2017-12-30", [1, 2]),
+             ("2017-06-01", "2017-12-30", [3]),
+             ("2017-12-31", "2018-12-31", [1, 2]),
+             ("2017-12-31", "2018-12-31", [3])])
+        for url, params in requests_made:
+            self.assertEqual(url, "/history/usa-stk-1min.csv")
+            self.assertListEqual(params["fields"], ["Close"])
+
+        self.assertEqual(
+            f.read(),
+            "ConId,Date,Close\n"
+            "1,2017-06-01,1.0\n"
+            "1,2017-12-30,2.0\n"
+            "2,2017-06-01,1.0\n"
+            "2,2017-12-30,2.0\n"
+            "3,2017-06-01,1.0\n"
+            "3,2017-12-30,2.0\n"
+            "1,2017-12-31,1.0\n"
+            "1,2018-12-31,2.0\n"
+            "2,2017-12-31,1.0\n"
+            "2,2018-12-31,2.0\n"
+            "3,2017-12-31,1.0\n"
+            "3,2018-12-31,2.0\n")
+
+    def test_stitch_segments_into_binary_buffer(self):
+        """
+        Tests that segments can be stitched into a buffer without a mode, such
+        as BytesIO, which is treated as binary.
+        """
+        def mock_get(url, params=None, *args, **kwargs):
+            rows = ["ConId,Date,Close"]
+            for conid in params["conids"]:
+                rows.append("{0},{1},1.0".format(conid, params["start_date"]))
+            return make_response(("\n".join(rows) + "\n").encode("utf-8"))
+
+        f = io.BytesIO()
+        with patch("quantrocket.history.houston.get", new=mock_get):
+            download_history_file("usa-stk-1min", f,
+                                  start_date="2017-06-01", end_date="2018-12-31",
+                                  conids=[1, 2], conid_batch_size=1)
+
+        self.assertEqual(
+            f.read(),
+            b"ConId,Date,Close\n"
+            b"1,2017-06-01,1.0\n"
+            b"2,2017-06-01,1.0\n")
+
+    @patch("quantrocket.history.time.sleep")
+    def test_retry_failed_segment(self, mock_sleep):
+        """
+        Tests that a segment whose connection drops is retried on its own.
+        """
+        requests_made = []
+
+        def mock_get(url, params=None, *args, **kwargs):
+            requests_made.append(params["start_date"])
+            if params["start_date"] == "2017-12-31" and requests_made.count("2017-12-31") == 1:
+                raise requests.ConnectionError("Connection reset by peer")
+            if params["start_date"] == "2017-12-31" and requests_made.count("2017-12-31") == 2:
+                return make_response(b"Service Unavailable", status_code=503)
+            return make_response(
+                "ConId,Date,Close\n1,{0},1.0\n".format(params["start_date"]).encode("utf-8"))
+
+        f = io.StringIO()
+        with patch("quantrocket.history.houston.get", new=mock_get):
+            download_history_file("usa-stk-1min", f,
+                                  start_date="2017-01-01", end_date="2018-12-31",
+                                  segment="A")
+
+        self.assertListEqual(
+            requests_made, ["2017-01-01", "2017-12-31", "2017-12-31", "2017-12-31"])
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.assertEqual(
+            f.read(),
+            "ConId,Date,Close\n"
+            "1,2017-01-01,1.0\n"
+            "1,2017-12-31,1.0\n")
+
+    @patch("quantrocket.history.time.sleep")
+    def test_give_up_after_max_attempts(self, mock_sleep):
+        """
+        Tests that a segment which keeps failing raises the error once the
+        attempts are exhausted.
+        """
+        def mock_get(url, params=None, *args, **kwargs):
+            raise requests.exceptions.ChunkedEncodingError("Connection broken")
+
+        with patch("quantrocket.history.houston.get", new=mock_get):
+            with patch("quantrocket.history.SEGMENT_DOWNLOAD_ATTEMPTS", new=2):
+                with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+                    download_history_file("usa-stk-1min", io.StringIO(),
+                                          start_date="2017-01-01", end_date="2018-12-31",
+                                          segment="A")
+
+        self.assertEqual(mock_sleep.call_count, 1)
+
+    def test_skip_empty_segments_unless_all_empty(self):
+        """
+        Tests that segments without data are skipped, unless none of the
+        segments have data.
+        """
+        def mock_get(url, params=None, *args, **kwargs):
+            if params["start_date"] == "2017-01-01":
+                return no_history_response()
+            return make_response(b"ConId,Date,Close\n1,2018-01-01,1.0\n")
+
+        f = io.StringIO()
+        with patch("quantrocket.history.houston.get", new=mock_get):
+            download_history_file("usa-stk-1min", f,
+                                  start_date="2017-01-01", end_date="2018-12-31",
+                                  segment="A")
+
+        self.assertEqual(f.read(), "ConId,Date,Close\n1,2018-01-01,1.0\n")
+
+        def mock_get(url, params=None, *args, **kwargs):
+            return no_history_response()
+
+        with patch("quantrocket.history.houston.get", new=mock_get):
+            with self.assertRaises(NoHistoricalData):
+                download_history_file("usa-stk-1min", io.StringIO(),
+                                      start_date="2017-01-01", end_date="2018-12-31",
+                                      segment="A")
+
+class DownloadHistoryFileBinaryOutputTestCase(unittest.TestCase):
+
+    def setUp(self):
+        _unsupported_outputs.clear()
+
+    def tearDown(self):
+        _unsupported_outputs.clear()
+
+    def test_download_binary_output(self):
+        """
+        Tests that binary output is requested and written as bytes.
+        """
+        requests_made = []
+
+        def mock_get(url, params=None, *args, **kwargs):
+            requests_made.append(url)
+            return make_response(b"\xff\xff\xff\xff\x00\x01binary")
+
+        f = io.BytesIO()
+        with patch("quantrocket.history.houston.get", new=mock_get):
+            download_history_file("usa-stk-1min", f, output="arrow")
+
+        self.assertListEqual(requests_made, ["/history/usa-stk-1min.arrow"])
+        self.assertEqual(f.read(), b"\xff\xff\xff\xff\x00\x01binary")
+
+    def test_fall_back_to_csv_and_remember_unsupported_output(self):
+        """
+        Tests that the request is repeated as CSV if the server doesn't
+        support the binary output, and that subsequent requests go straight
+        to CSV.
+        """
+        requests_made = []
+
+        def mock_get(url, params=None, *args, **kwargs):
+            requests_made.append((url, params))
+            if url.endswith(".parquet"):
+                return make_response(
+                    json.dumps({"status": "error", "msg": "invalid output: parquet"}).encode("utf-8"),
+                    status_code=400)
+            return make_response(b"ConId,Date,Close\n1,2018-01-01,1.0\n")
+
+        f = io.BytesIO()
+        with patch("quantrocket.history.houston.get", new=mock_get):
+            with warnings.catch_warnings(record=True) as warning_list:
+                warnings.simplefilter("always")
+                download_history_file("usa-stk-1min", f, output="parquet",
+                                      conids=[1])
+
+        self.assertListEqual(
+            requests_made,
+            [("/history/usa-stk-1min.parquet", {"conids": [1]}),
+             ("/history/usa-stk-1min.csv", {"conids": [1]})])
+        self.assertEqual(len(warning_list), 1)
+        self.assertIn("parquet output is not supported by the history service",
+                      str(warning_list[0].message))
+        self.assertEqual(f.read(), b"ConId,Date,Close\n1,2018-01-01,1.0\n")
+
+        requests_made = []
+        with patch("quantrocket.history.houston.get", new=mock_get):
+            download_history_file("usa-stk-1min", io.BytesIO(), output="parquet")
+
+        self.assertListEqual(requests_made, [("/history/usa-stk-1min.csv", {})])
+
+    def test_dont_fall_back_on_query_errors(self):
+        """
+        Tests that errors unrelated to the output format are raised rather
+        than retried as CSV.
+        """
+        requests_made = []
+
+        def mock_get(url, params=None, *args, **kwargs):
+            requests_made.append(url)
+            return no_history_response()
+
+        with patch("quantrocket.history.houston.get", new=mock_get):
+            with self.assertRaises(NoHistoricalData):
+                download_history_file("usa-stk-1min", io.BytesIO(), output="arrow")
+
+        self.assertListEqual(requests_made, ["/history/usa-stk-1min.arrow"])
+
+    def test_only_remember_404_if_csv_succeeds(self):
+        """
+        Tests that a plain 404 is retried as CSV, but only remembered as an
+        unsupported output if the CSV request succeeds (otherwise the 404 was
+        due to the query, e.g. a misspelled database).
+        """
+        requests_made = []
+
+        def mock_get(url, params=None, *args, **kwargs):
+            requests_made.append(url)
+            if url.startswith("/history/usa-stk-1mn."):
+                return make_response(b"Not Found", status_code=404)
+            if url.endswith(".arrow"):
+                return make_response(b"Not Found", status_code=404)
+            return make_response(b"ConId,Date,Close\n1,2018-01-01,1.0\n")
+
+        with patch("quantrocket.history.houston.get", new=mock_get):
+            with warnings.catch_warnings(record=True) as warning_list:
+                warnings.simplefilter("always")
+                for i in range(2):
+                    with self.assertRaises(requests.HTTPError):
+                        download_history_file("usa-stk-1mn", io.BytesIO(), output="arrow")
+
+        self.assertEqual(len(warning_list), 0)
+        self.assertListEqual(
+            requests_made,
+            ["/history/usa-stk-1mn.arrow", "/history/usa-stk-1mn.csv"] * 2)
+
+        requests_made = []
+        with patch("quantrocket.history.houston.get", new=mock_get):
+            with warnings.catch_warnings(record=True) as warning_list:
+                warnings.simplefilter("always")
+                for i in range(2):
+                    download_history_file("usa-stk-1min", io.BytesIO(), output="arrow")
+
+        self.assertEqual(len(warning_list), 1)
+        self.assertListEqual(
+            requests_made,
+            ["/history/usa-stk-1min.arrow", "/history/usa-stk-1min.csv",
+             "/history/usa-stk-1min.csv"])
@@ -0,0 +1,372 @@
+# Copyright 2019 QuantRocket LLC - All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# To run: python -m unittest discover -s tests/ -p test*.py -t .
+
+import io
+import os
+import six
+import gzip
+import json
+import time
+import threading
+import unittest
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from six.moves.socketserver import ThreadingMixIn
+try:
+    from unittest.mock import patch
+except ImportError:
+    # py27
+    from mock import patch
+import requests
+from quantrocket.houston import Houston, _get_params_to_move_to_body
+from quantrocket.cli.utils.stream import to_bytes
+
+class HoustonTransportTestCase(unittest.TestCase):
+
+    def test_default_pool_and_retries(self):
+        """
+        Tests that the session's pool holds enough connections for threaded
+        loaders and doesn't retry by default.
+        """
+        with patch.dict(os.environ, {}, clear=True):
+            session = Houston()
+
+        for prefix in ("http://", "https://"):
+            adapter = session.get_adapter(prefix + "houston")
+            self.assertEqual(adapter._pool_connections, 10)
+            self.assertEqual(adapter._pool_maxsize, 32)
+            self.assertEqual(adapter.max_retries.total, 0)
+            self.assertFalse(adapter.max_retries.read)
+
+    def test_configure_pool_and_retries_from_env(self):
+        """
+        Tests that pool sizes and retries are read from environment
+        variables.
+        """
+        with patch.dict(os.environ, {
+            "QUANTROCKET_HTTP_POOL_CONNECTIONS": "4",
+            "QUANTROCKET_HTTP_POOL_MAXSIZE": "64",
+            "QUANTROCKET_HTTP_MAX_RETRIES": "3",
+            "QUANTROCKET_HTTP_BACKOFF_FACTOR": "0.1",
+            }, clear=True):
+            session = Houston()
+
+        adapter = session.get_adapter("http://houston")
+        self.assertEqual(adapter._pool_connections, 4)
+        self.assertEqual(adapter._pool_maxsize, 64)
+        self.assertEqual(adapter.max_retries.total, 3)
+        self.assertEqual(adapter.max_retries.backoff_factor, 0.1)
+        self.assertIn(503, adapter.max_retries.status_forcelist)
+        self.assertFalse(adapter.max_retries.raise_on_status)
+
+        with patch.dict(os.environ, {
+            "QUANTROCKET_HTTP_POOL_MAXSIZE": "lots",
+            }, clear=True):
+            session = Houston()
+
+        self.assertEqual(session.get_adapter("http://houston")._pool_maxsize, 32)
+
+class HoustonCompressionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.requests_made = []
+
+        def mock_request(session, method, url, *args, **kwargs):
+            data = kwargs.get("data")
+            if data is not None and not isinstance(data, (bytes, dict)):
+                data = b"".join(data)
+            self.requests_made.append((url, data, kwargs.get("headers")))
+            response = requests.Response()
+            response.status_code = 200
+            return response
+
+        self.patcher = patch("requests.Session.request", new=mock_request)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_compress_streamed_upload_per_request(self):
+        """
+        Tests that an upload is gzipped as it is streamed if compress=True,
+        and sent as is by default.
+        """
+        lines = ["ConId,Date,Close\n"] + ["12345,2018-01-01,{0}\n".format(i) for i in range(1000)]
+
+        with patch.dict(os.environ, {"HOUSTON_URL": "http://houston"}, clear=True):
+            session = Houston()
+            session.patch("/history/usa-stk-1d", data=to_bytes(iter(lines)), compress=True)
+            session.patch("/history/usa-stk-1d", data=to_bytes(iter(lines)))
+
+        url, data, headers = self.requests_made[0]
+        self.assertEqual(url, "http://houston/history/usa-stk-1d")
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.GzipFile(fileobj=io.BytesIO(data)).read(), "".join(lines).encode("utf-8"))
+        self.assertLess(len(data), len("".join(lines)) / 4)
+
+        url, data, headers = self.requests_made[1]
+        self.assertIsNone(headers)
+        self.assertEqual(data, "".join(lines).encode("utf-8"))
+
+    def test_compress_uploads_from_env(self):
+        """
+        Tests that uploads (but not form data) are compressed by default if
+        QUANTROCKET_COMPRESS_UPLOADS is set, unless turned off per request,
+        and that QUANTROCKET_ACCEPT_ENCODING sets the Accept-Encoding header.
+        """
+        with patch.dict(os.environ, {
+            "HOUSTON_URL": "http://houston",
+            "QUANTROCKET_COMPRESS_UPLOADS": "gzip",
+            "QUANTROCKET_ACCEPT_ENCODING": "identity",
+            }, clear=True):
+            session = Houston()
+            session.post("/blotter/orders", data=io.BytesIO(b"ConId,Action\n12345,BUY\n"))
+            session.post("/blotter/orders", data=b"ConId,Action\n12345,BUY\n", compress=False)
+            session.get("/master/securities.csv", params={"conids": list(range(100000, 100500))})
+
+        self.assertEqual(session.headers["Accept-Encoding"], "identity")
+
+        url, data, headers = self.requests_made[0]
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.GzipFile(fileobj=io.BytesIO(data)).read(), b"ConId,Action\n12345,BUY\n")
+
+        url, data, headers = self.requests_made[1]
+        self.assertIsNone(headers)
+        self.assertEqual(data, b"ConId,Action\n12345,BUY\n")
+
+        url, data, headers = self.requests_made[2]
+        self.assertIsNone(headers)
+        self.assertDictEqual(data, {"conids": list(range(100000, 100500))})
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+class MockServerHandler(BaseHTTPRequestHandler):
+    """
+    Echoes the query and form params, rejecting request lines longer than
+    4096 bytes like many servers do.
+    """
+    def do_GET(self):
+        if len(self.requestline) > 4096:
+            self.send_error(414)
+            return
+        parsed = six.moves.urllib.parse.urlparse(self.path)
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode("utf-8") if length else ""
+        content = json.dumps({
+            "query": six.moves.urllib.parse.parse_qs(parsed.query),
+            "form": six.moves.urllib.parse.parse_qs(body),
+            "request_line_length": len(self.requestline),
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+class HoustonParamsTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), MockServerHandler)
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever)
+        cls.server_thread.daemon = True
+        cls.server_thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def get(self, params):
+        with patch.dict(os.environ, {
+            "HOUSTON_URL": "http://127.0.0.1:{0}".format(self.server.server_address[1])
+            }, clear=True):
+            response = Houston().get("/master/securities.csv", params=params)
+        response.raise_for_status()
+        return response.json()
+
+    def test_keep_short_params_in_query_string(self):
+        result = self.get({"conids": list(range(60)), "fields": ["Symbol"]})
+        self.assertEqual(len(result["query"]["conids"]), 60)
+        self.assertListEqual(result["query"]["fields"], ["Symbol"])
+        self.assertDictEqual(result["form"], {})
+
+    def test_move_long_params_to_body(self):
+        """
+        Tests that a large param set is sent in the body while the other
+        params stay in the query string, and that the caller's params aren't
+        modified.
+        """
+        conids = list(range(100000, 110000))
+        params = {"conids": conids, "fields": ["Symbol", "Timezone"], "exclude_delisted": True}
+        result = self.get(params)
+
+        self.assertListEqual(result["form"]["conids"], [str(conid) for conid in conids])
+        self.assertListEqual(result["query"]["fields"], ["Symbol", "Timezone"])
+        self.assertListEqual(result["query"]["exclude_delisted"], ["True"])
+        self.assertLess(result["request_line_length"], 4096)
+        self.assertEqual(len(params["conids"]), 10000)
+
+        # many medium-sized params that are too long together
+        params = dict(
+            ("field{0}".format(i), ["x" * 50] * 10) for i in range(20))
+        result = self.get(params)
+        self.assertEqual(len(result["query"]) + len(result["form"]), 20)
+        self.assertTrue(result["form"])
+        self.assertLess(result["request_line_length"], 4096)
+
+    def test_query_length_limit_edge(self):
+        """
+        Tests that params are moved only once the query string exceeds the
+        limit, largest first.
+        """
+        params = {"conids": [12345] * 10, "fields": ["Symbol"]}
+        # conids=12345 x 10 joined by & = 129, plus & plus fields=Symbol = 143
+        self.assertListEqual(_get_params_to_move_to_body(params, 143), [])
+        self.assertListEqual(_get_params_to_move_to_body(params, 142), ["conids"])
+        self.assertListEqual(_get_params_to_move_to_body(params, 10), ["conids", "fields"])
+        self.assertListEqual(_get_params_to_move_to_body({"conids": None}, 0), [])
+
+class ConidSetServerHandler(MockServerHandler):
+    """
+    Mock server whose master service supports conid sets, whose history
+    service doesn't, and whose blotter service fails to store them.
+    """
+    conid_sets = {}
+    uploads = []
+    failed_uploads = []
+
+    def do_PUT(self):
+        service, _, handle = self.path.lstrip("/").split("/")
+        if service == "blotter":
+            self.failed_uploads.append(handle)
+            self.send_error(500)
+            return
+        if service != "master":
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode("utf-8")
+        self.conid_sets[handle] = six.moves.urllib.parse.parse_qs(body)["conids"]
+        self.uploads.append(handle)
+        self.send_response(204)
+        self.end_headers()
+
+    def do_GET(self):
+        query = six.moves.urllib.parse.parse_qs(
+            six.moves.urllib.parse.urlparse(self.path).query)
+        handle = query.get("conid_set", [None])[0]
+        if handle and handle not in self.conid_sets:
+            self.send_error(410, "unknown conid set")
+            return
+        return super(ConidSetServerHandler, self).do_GET()
+
+class HoustonConidSetTestCase(unittest.TestCase):
+
+    def setUp(self):
+        ConidSetServerHandler.conid_sets.clear()
+        del ConidSetServerHandler.uploads[:]
+        del ConidSetServerHandler.failed_uploads[:]
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), ConidSetServerHandler)
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        self.env = {
+            "HOUSTON_URL": "http://127.0.0.1:{0}".format(self.server.server_address[1]),
+            "QUANTROCKET_CONID_SETS": "1"}
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_upload_conid_set_once_and_fall_back_to_inline(self):
+        """
+        Tests that a long conid list is uploaded once and referred to by
+        handle, that short lists and unsupporting services get the conids
+        inline, and that forgotten handles are resent inline.
+        """
+        conids = list(range(100000, 102000))
+        with patch.dict(os.environ, self.env, clear=True):
+            session = Houston()
+
+            for i in range(3):
+                response = session.get("/master/securities.csv", params={"conids": conids})
+                response.raise_for_status()
+                result = response.json()
+                self.assertNotIn("conids", result["query"])
+                self.assertNotIn("conids", result["form"])
+                self.assertEqual(len(result["query"]["conid_set"][0]), 40)
+
+            self.assertEqual(len(ConidSetServerHandler.uploads), 1)
+            self.assertListEqual(
+                ConidSetServerHandler.conid_sets[ConidSetServerHandler.uploads[0]],
+                [str(conid) for conid in conids])
+
+            # short lists are sent inline
+            result = session.get("/master/securities.csv", params={"conids": conids[:10]}).json()
+            self.assertEqual(len(result["query"]["conids"]), 10)
+
+            # the history service doesn't support conid sets
+            for i in range(2):
+                result = session.get("/history/usa-stk-1d.csv", params={"conids": conids}).json()
+                self.assertEqual(len(result["form"]["conids"]), 2000)
+                self.assertNotIn("conid_set", result["query"])
+
+            # server restarts and forgets the conid set
+            ConidSetServerHandler.conid_sets.clear()
+            response = session.get("/master/securities.csv", params={"conids": conids})
+            response.raise_for_status()
+            self.assertEqual(len(response.json()["form"]["conids"]), 2000)
+            # ...and is sent it again next time
+            result = session.get("/master/securities.csv", params={"conids": conids}).json()
+            self.assertIn("conid_set", result["query"])
+            self.assertEqual(len(ConidSetServerHandler.uploads), 2)
+
+        # conid sets are off by default
+        env = dict(self.env)
+        del env["QUANTROCKET_CONID_SETS"]
+        with patch.dict(os.environ, env, clear=True):
+            result = Houston().get("/master/securities.csv", params={"conids": conids}).json()
+            self.assertEqual(len(result["form"]["conids"]), 2000)
+
+    def test_back_off_after_failed_upload(self):
+        """
+        Tests that a service whose upload failed is sent the conids inline
+        without retrying the upload until the retry delay has passed.
+        """
+        conids = list(range(100000, 102000))
+        with patch.dict(os.environ, dict(self.env, QUANTROCKET_CONID_SET_RETRY_DELAY="60"), clear=True):
+            session = Houston()
+
+            for i in range(3):
+                result = session.get("/blotter/positions.csv", params={"conids": conids}).json()
+                self.assertEqual(len(result["form"]["conids"]), 2000)
+                self.assertNotIn("conid_set", result["query"])
+
+            self.assertEqual(len(ConidSetServerHandler.failed_uploads), 1)
+
+            # the master service is unaffected
+            result = session.get("/master/securities.csv", params={"conids": conids}).json()
+            self.assertIn("conid_set", result["query"])
+
+            now = time.time()
+            with patch("quantrocket.houston.time.time", return_value=now + 61):
+                session.get("/blotter/positions.csv", params={"conids": conids})
+
+            self.assertEqual(len(ConidSetServerHandler.failed_uploads), 2)
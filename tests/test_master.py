@@ -14,6 +14,10 @@
 
 # To run: python -m unittest discover -s tests/ -p test*.py -t .
 
+import os
+import shutil
+import tempfile
+import threading
 import unittest
 try:
     from unittest.mock import patch
@@ -23,7 +27,16 @@ except ImportError:
 import pandas as pd
 import pytz
 import numpy as np
-from quantrocket.master import get_securities_reindexed_like
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+from quantrocket.master import (
+    get_securities_reindexed_like,
+    sync_master_mirror,
+    clear_master_mirror,
+    get_master_mirror_stats)
+from quantrocket.fundamental import _get_security_timezones
 
 class SecuritiesReindexedLikeTestCase(unittest.TestCase):
 
@@ -152,3 +165,225 @@ class SecuritiesReindexedLikeTestCase(unittest.TestCase):
                   23456: 'DEF'}]
             )
 
+
+    def test_securities_reindexed_like_lazy(self):
+        """
+        Tests get_securities_reindexed_like with lazy=True, including a conid
+        missing from the securities master.
+        """
+        closes = pd.DataFrame(
+            np.random.rand(3,3),
+            columns=[12345,23456,34567],
+            index=pd.date_range(start="2018-05-01",
+                                periods=3,
+                                freq="D",
+                                name="Date"))
+
+        def mock_download_master_file(f, *args, **kwargs):
+            securities = pd.DataFrame(
+                dict(ConId=[23456,
+                            12345],
+                     Symbol=["DEF",
+                             "ABC"],
+                     Multiplier=[1.0,
+                                 100.0]))
+            securities.to_csv(f, index=False)
+            f.seek(0)
+
+        with patch('quantrocket.master.download_master_file', new=mock_download_master_file):
+
+            securities = get_securities_reindexed_like(
+                closes,
+                domain="main",
+                fields=["Symbol", "Multiplier"],
+                lazy=True)
+
+        self.assertListEqual(sorted(securities), ["Multiplier", "Symbol"])
+        symbols = securities["Symbol"]
+        self.assertTrue(symbols.index.equals(closes.index))
+        self.assertListEqual(list(symbols.columns), [12345,23456,34567])
+        self.assertListEqual(
+            symbols.fillna("nan").values.tolist(),
+            [["ABC", "DEF", "nan"]] * 3)
+        self.assertListEqual(
+            securities["Multiplier"].fillna(-1).values.tolist(),
+            [[100.0, 1.0, -1]] * 3)
+        self.assertListEqual(
+            closes.where(securities["Multiplier"] > 10).notnull().sum().tolist(),
+            [3, 0, 0])
+
+@unittest.skipIf(pyarrow is None, "pyarrow not installed")
+class MasterMirrorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.mirror_dir = tempfile.mkdtemp()
+        patcher = patch('quantrocket.master.MIRROR_DIR', new=self.mirror_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.dict('quantrocket.master._mirror_stats', {"hits": 0, "misses": 0})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.dict('quantrocket.master._mirrors', {}, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.dict(os.environ, {"HOUSTON_URL": "http://houston"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.mirror_dir)
+
+        self.securities = pd.DataFrame(
+            dict(ConId=[12345,
+                        23456,
+                        34567],
+                 Symbol=["ABC",
+                         "DEF",
+                         "GHI"],
+                 Etf=[1,
+                      0,
+                      0],
+                 Timezone=["America/New_York",
+                           "America/New_York",
+                           "America/Toronto"]))
+        self.download_kwargs = []
+
+    def mock_download_master_file(self, f, *args, **kwargs):
+        self.download_kwargs.append(kwargs)
+        securities = self.securities
+        if kwargs.get("conids"):
+            securities = securities[securities.ConId.isin(kwargs["conids"])]
+        if kwargs.get("fields"):
+            securities = securities.reindex(columns=["ConId"] + [
+                field for field in kwargs["fields"] if field != "ConId"])
+        securities.to_csv(f, index=False)
+        f.seek(0)
+
+    def test_read_from_mirror(self):
+        """
+        Tests that, once synced, securities master lookups are served from the
+        mirror without querying the master service, and give the same results.
+        """
+        closes = pd.DataFrame(
+            np.random.rand(2,2),
+            columns=[23456,12345],
+            index=pd.date_range(start="2018-05-01", periods=2, freq="D", name="Date"))
+
+        with patch('quantrocket.master.download_master_file', new=self.mock_download_master_file):
+            securities = get_securities_reindexed_like(closes, domain="main", fields=["Symbol", "Etf"])
+            result = sync_master_mirror()
+            self.assertDictEqual(
+                result, {"full": True, "securities": 3, "added": 3, "removed": 0})
+            self.assertNotIn("conids", self.download_kwargs[-1])
+
+            mirror_securities = get_securities_reindexed_like(
+                closes, domain="main", fields=["Symbol", "Etf"])
+
+        with patch('quantrocket.fundamental.download_master_file') as mock_download_master_file:
+            timezones = _get_security_timezones([34567, 12345])
+            mock_download_master_file.assert_not_called()
+
+        self.assertEqual(len(self.download_kwargs), 2)
+        self.assertTrue(mirror_securities.equals(securities))
+        self.assertListEqual(
+            timezones.Timezone.astype(str).tolist(), ["America/Toronto", "America/New_York"])
+        self.assertDictEqual(get_master_mirror_stats(), {"hits": 2, "misses": 1})
+
+    def test_incremental_sync(self):
+        """
+        Tests that a sync of a fresh mirror only downloads added securities.
+        """
+        with patch('quantrocket.master.download_master_file', new=self.mock_download_master_file):
+            sync_master_mirror()
+
+            self.securities = pd.concat([
+                self.securities.iloc[1:],
+                pd.DataFrame(dict(ConId=[45678], Symbol=["JKL"], Etf=[0],
+                                  Timezone=["Europe/London"]))])
+            result = sync_master_mirror()
+            self.assertDictEqual(
+                result, {"full": False, "securities": 3, "added": 1, "removed": 1})
+            self.assertEqual(self.download_kwargs[-2]["fields"], ["ConId"])
+            self.assertEqual(self.download_kwargs[-1]["conids"], [45678])
+
+            timezones = _get_security_timezones([45678, 23456])
+            self.assertEqual(len(self.download_kwargs), 3)
+            self.assertListEqual(
+                timezones.Timezone.astype(str).tolist(), ["Europe/London", "America/New_York"])
+            self.assertEqual(timezones.Timezone.dtype.name, "category")
+
+            result = sync_master_mirror(full=True)
+            self.assertDictEqual(
+                result, {"full": True, "securities": 3, "added": 0, "removed": 0})
+            self.assertNotIn("fields", self.download_kwargs[-1])
+
+    def test_fall_back_to_master_service(self):
+        """
+        Tests that lookups query the master service if the mirror lacks the
+        conids or fields, is stale, was synced from another houston, or was
+        cleared.
+        """
+        with patch('quantrocket.master.download_master_file', new=self.mock_download_master_file):
+            sync_master_mirror()
+
+        def lookup(conids, fields=["Timezone"]):
+            closes = pd.DataFrame(
+                np.random.rand(1,len(conids)),
+                columns=conids,
+                index=pd.date_range(start="2018-05-01", periods=1, freq="D", name="Date"))
+            with patch('quantrocket.master.download_master_file', new=self.mock_download_master_file):
+                get_securities_reindexed_like(closes, domain="main", fields=fields)
+            return self.download_kwargs[-1]
+
+        self.assertEqual(lookup([12345, 99999])["conids"], [12345, 99999])
+        self.assertEqual(lookup([12345], fields=["Multiplier"])["fields"], ["Multiplier"])
+        with patch('quantrocket.master.MIRROR_MAX_AGE', new=0):
+            self.assertEqual(lookup([23456])["conids"], [23456])
+        with patch.dict(os.environ, {"HOUSTON_URL": "http://other-houston"}):
+            self.assertEqual(lookup([34567])["conids"], [34567])
+        clear_master_mirror()
+        self.assertEqual(lookup([12345])["conids"], [12345])
+
+        self.assertEqual(len(self.download_kwargs), 6)
+        self.assertDictEqual(get_master_mirror_stats(), {"hits": 0, "misses": 5})
+
+        # a stale mirror gets fully synced
+        with patch('quantrocket.master.download_master_file', new=self.mock_download_master_file):
+            sync_master_mirror()
+            with patch('quantrocket.master.MIRROR_MAX_AGE', new=0):
+                self.assertTrue(sync_master_mirror()["full"])
+
+    def test_concurrent_syncs_and_lookups(self):
+        """
+        Tests that lookups in several threads always see a complete mirror
+        while it is being synced.
+        """
+        with patch('quantrocket.master.download_master_file', new=self.mock_download_master_file):
+            sync_master_mirror()
+
+            errors = []
+
+            def sync():
+                try:
+                    for i in range(5):
+                        sync_master_mirror(full=True)
+                except Exception as e:
+                    errors.append(e)
+
+            def lookup():
+                try:
+                    for i in range(20):
+                        timezones = _get_security_timezones([12345, 34567])
+                        self.assertListEqual(
+                            timezones.Timezone.astype(str).tolist(),
+                            ["America/New_York", "America/Toronto"])
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=sync) for i in range(2)]
+            threads.extend([threading.Thread(target=lookup) for i in range(4)])
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertListEqual(errors, [])
+        self.assertListEqual(sorted(os.listdir(self.mirror_dir)), ["main.feather", "main.json"])
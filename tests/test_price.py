@@ -14,16 +14,33 @@
 
 # To run: python -m unittest discover -s tests/ -p test*.py -t .
 
+import io
+import os
+import shutil
+import tempfile
+import threading
 import unittest
+import warnings
 try:
     from unittest.mock import patch
 except ImportError:
     # py27
     from mock import patch
+import requests
 import pandas as pd
 import pytz
 import numpy as np
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
 from quantrocket import get_prices
+from quantrocket.price import (
+    clear_cache,
+    get_cache_stats,
+    _split_date_and_time,
+    _interpolate_times)
+from quantrocket.utils.formats import _unsupported_outputs
 from quantrocket.exceptions import ParameterError, MissingData, NoHistoricalData
 
 class GetPricesTestCase(unittest.TestCase):
@@ -2943,3 +2960,728 @@ class GetPricesTestCase(unittest.TestCase):
         self.assertEqual(
             closes.xs("14:00:00", level="Time").loc["2018-04-04"], "nan"
         )
+
+    def test_stream_or_use_tmp_files(self):
+        """
+        Tests that prices are streamed to pandas by default, or downloaded to
+        a temp file if USE_TMP_FILES is set, with the same result.
+        """
+        def mock_get_history_db_config(db):
+            return {
+                "bar_size": "1 day",
+                "universes": ["usa-stk"],
+                "vendor": "ib",
+                "fields": ["Close","Open","High","Low", "Volume"]
+            }
+
+        filepaths_or_buffers = []
+
+        def mock_download_history_file(code, f, *args, **kwargs):
+            filepaths_or_buffers.append(f)
+            prices = pd.DataFrame(
+                dict(
+                    ConId=[
+                        12345,
+                        12345,
+                        23456,
+                        23456
+                        ],
+                    Date=[
+                        "2018-04-01",
+                        "2018-04-02",
+                        "2018-04-01",
+                        "2018-04-02"
+                        ],
+                    Close=[
+                        20.10,
+                        20.50,
+                        50.5,
+                        52.5
+                        ]))
+            prices.to_csv(f, index=False)
+
+        def mock_list_history_databases():
+            return [
+                "usa-stk-1d",
+                "demo-stk-1min"
+            ]
+
+        def mock_list_realtime_databases():
+            return {}
+
+        with patch('quantrocket.price.list_realtime_databases', new=mock_list_realtime_databases):
+            with patch('quantrocket.price.list_history_databases', new=mock_list_history_databases):
+                with patch('quantrocket.price.get_history_db_config', new=mock_get_history_db_config):
+                    with patch('quantrocket.price.download_history_file', new=mock_download_history_file):
+
+                        streamed_prices = get_prices("usa-stk-1d", fields=["Close"])
+
+                        with patch('quantrocket.price.USE_TMP_FILES', new=True):
+                            tmp_file_prices = get_prices("usa-stk-1d", fields=["Close"])
+
+        streamed_to, downloaded_to = filepaths_or_buffers
+        self.assertTrue(hasattr(streamed_to, "write"))
+        self.assertIsInstance(downloaded_to, str)
+        self.assertFalse(os.path.exists(downloaded_to))
+
+        self.assertListEqual(
+            streamed_prices.reset_index().to_dict(orient="records"),
+            tmp_file_prices.reset_index().to_dict(orient="records"))
+
+        closes = streamed_prices.loc["Close"]
+        self.assertListEqual(list(closes[12345]), [20.10, 20.50])
+        self.assertListEqual(list(closes[23456]), [50.5, 52.5])
+
+    def test_query_multiple_dbs_concurrently(self):
+        """
+        Tests that multiple databases are downloaded concurrently when
+        max_workers is set, and that the value is still taken from the db
+        which was passed first as an argument.
+        """
+        def mock_get_history_db_config(db):
+            return {
+                "bar_size": "1 day",
+                "universes": ["usa-stk"],
+                "vendor": "ib",
+                "fields": ["Close","Open","High","Low", "Volume"]
+            }
+
+        nyse_download_started = threading.Event()
+        usa_waited_for_nyse = []
+
+        def mock_download_history_file(code, f, *args, **kwargs):
+            if code == "usa-stk-1d":
+                # the higher priority db finishes last, which only happens
+                # if the other db is downloaded at the same time
+                usa_waited_for_nyse.append(nyse_download_started.wait(5))
+                prices = pd.DataFrame(
+                    dict(
+                        ConId=[
+                            12345,
+                            12345,
+                            23456,
+                            23456
+                            ],
+                        Date=[
+                            "2018-04-01",
+                            "2018-04-02",
+                            "2018-04-01",
+                            "2018-04-02"
+                            ],
+                        Close=[
+                            20.10,
+                            20.50,
+                            50.5,
+                            52.5
+                            ]))
+            else:
+                nyse_download_started.set()
+                prices = pd.DataFrame(
+                    dict(
+                        ConId=[
+                            12345,
+                            12345,
+                            ],
+                        Date=[
+                            "2018-04-01",
+                            "2018-04-02",
+                            ],
+                        Close=[
+                            5900,
+                            5920],
+                    ))
+            prices.to_csv(f, index=False)
+
+        def mock_list_history_databases():
+            return [
+                "usa-stk-1d",
+                "nyse-stk-1d",
+            ]
+
+        def mock_list_realtime_databases():
+            return {}
+
+        with patch('quantrocket.price.list_realtime_databases', new=mock_list_realtime_databases):
+            with patch('quantrocket.price.list_history_databases', new=mock_list_history_databases):
+                with patch('quantrocket.price.get_history_db_config', new=mock_get_history_db_config):
+                    with patch('quantrocket.price.download_history_file', new=mock_download_history_file):
+
+                        prices = get_prices(["usa-stk-1d", "nyse-stk-1d"],
+                                            fields=["Close"], max_workers=2)
+
+        self.assertListEqual(usa_waited_for_nyse, [True])
+
+        closes = prices.loc["Close"]
+        closes = closes.reset_index()
+        closes.loc[:, "Date"] = closes.Date.dt.strftime("%Y-%m-%dT%H:%M:%S%z")
+        self.assertListEqual(
+            closes.to_dict(orient="records"),
+            [{'Date': '2018-04-01T00:00:00', 12345: 20.1, 23456: 50.5},
+             {'Date': '2018-04-02T00:00:00', 12345: 20.5, 23456: 52.5}]
+        )
+
+    @unittest.skipIf(pyarrow is None, "pyarrow not installed")
+    def test_load_arrow_output_or_csv_fallback(self):
+        """
+        Tests that arrow output is requested with
+        QUANTROCKET_PRICES_OUTPUT=auto if pyarrow is installed (but not by
+        default), and that either an Arrow IPC stream or a CSV (returned if
+        the service doesn't support arrow) is loaded.
+        """
+        import pyarrow as pa
+
+        def mock_get_history_db_config(db):
+            return {
+                "bar_size": "1 day",
+                "universes": ["usa-stk"],
+                "vendor": "ib",
+                "fields": ["Close","Open","High","Low", "Volume"]
+            }
+
+        requested_outputs = []
+
+        def mock_download_history_file(code, f, *args, **kwargs):
+            if isinstance(f, str):
+                with open(f, "wb") as f:
+                    return mock_download_history_file(code, f, *args, **kwargs)
+            requested_outputs.append(kwargs.get("output"))
+            if code == "usa-stk-1d":
+                table = pa.Table.from_pandas(
+                    pd.DataFrame(
+                        dict(
+                            ConId=[12345, 12345, 23456, 23456],
+                            Date=pd.to_datetime(
+                                ["2018-04-01", "2018-04-02", "2018-04-01", "2018-04-02"]),
+                            Close=[20.10, 20.50, 50.5, 52.5])),
+                    preserve_index=False)
+                sink = pa.BufferOutputStream()
+                writer = pa.ipc.new_stream(sink, table.schema)
+                writer.write_table(table)
+                writer.close()
+                f.write(sink.getvalue().to_pybytes())
+            else:
+                content = b"ConId,Date,Close\n34567,2018-04-01,5900\n34567,2018-04-02,5920\n"
+                f.write(content.decode("utf-8") if isinstance(f, io.TextIOBase) else content)
+
+        def mock_list_history_databases():
+            return [
+                "usa-stk-1d",
+                "nyse-stk-1d",
+            ]
+
+        def mock_list_realtime_databases():
+            return {}
+
+        for use_tmp_files in (False, True):
+            requested_outputs = []
+
+            with patch('quantrocket.price.list_realtime_databases', new=mock_list_realtime_databases):
+                with patch('quantrocket.price.list_history_databases', new=mock_list_history_databases):
+                    with patch('quantrocket.price.get_history_db_config', new=mock_get_history_db_config):
+                        with patch('quantrocket.price.download_history_file', new=mock_download_history_file):
+                            with patch('quantrocket.price.PRICES_OUTPUT', new="auto"):
+                                with patch('quantrocket.price.USE_TMP_FILES', new=use_tmp_files):
+
+                                    prices = get_prices(["usa-stk-1d", "nyse-stk-1d"],
+                                                        fields=["Close"])
+
+            self.assertListEqual(requested_outputs, ["arrow", "arrow"])
+
+            closes = prices.loc["Close"]
+            closes = closes.reset_index()
+            closes.loc[:, "Date"] = closes.Date.dt.strftime("%Y-%m-%dT%H:%M:%S%z")
+            self.assertListEqual(
+                closes.to_dict(orient="records"),
+                [{'Date': '2018-04-01T00:00:00', 12345: 20.1, 23456: 50.5, 34567: 5900.0},
+                 {'Date': '2018-04-02T00:00:00', 12345: 20.5, 23456: 52.5, 34567: 5920.0}]
+            )
+
+        # csv is requested by default
+        requested_outputs = []
+        with patch('quantrocket.price.list_realtime_databases', new=mock_list_realtime_databases):
+            with patch('quantrocket.price.list_history_databases', new=mock_list_history_databases):
+                with patch('quantrocket.price.get_history_db_config', new=mock_get_history_db_config):
+                    with patch('quantrocket.price.download_history_file', new=mock_download_history_file):
+                        get_prices(["nyse-stk-1d"], fields=["Close"])
+
+        self.assertListEqual(requested_outputs, [None])
+
+    def test_fall_back_to_csv_quietly_only_if_arrow_was_auto_selected(self):
+        """
+        Tests that falling back to CSV warns if arrow output was requested
+        explicitly but not if it was only chosen because pyarrow is
+        installed.
+        """
+        def mock_get_history_db_config(db):
+            return {
+                "bar_size": "1 day",
+                "universes": ["usa-stk"],
+                "vendor": "ib",
+                "fields": ["Close","Open","High","Low", "Volume"]
+            }
+
+        def mock_get(url, params=None, *args, **kwargs):
+            response = requests.Response()
+            if url.endswith(".arrow"):
+                response.status_code = 406
+                response.raw = io.BytesIO(b"unsupported output")
+            else:
+                response.status_code = 200
+                response.raw = io.BytesIO(
+                    b"ConId,Date,Field,Close\n12345,2018-04-01,Close,20.1\n")
+            return response
+
+        for prices_output, num_warnings in (("auto", 0), ("arrow", 1)):
+            _unsupported_outputs.clear()
+
+            with patch('quantrocket.price.list_realtime_databases', new=lambda: {}):
+                with patch('quantrocket.price.list_history_databases', new=lambda: ["usa-stk-1d"]):
+                    with patch('quantrocket.price.get_history_db_config', new=mock_get_history_db_config):
+                        with patch('quantrocket.history.houston.get', new=mock_get):
+                            with patch('quantrocket.price.PRICES_OUTPUT', new=prices_output):
+                                with patch('quantrocket.price._use_arrow_output', new=lambda: True):
+                                    with warnings.catch_warnings(record=True) as warning_list:
+                                        warnings.simplefilter("always")
+                                        prices = get_prices("usa-stk-1d", fields=["Close"])
+
+            fallback_warnings = [
+                w for w in warning_list if "falling back to csv" in str(w.message)]
+            self.assertEqual(len(fallback_warnings), num_warnings)
+            self.assertEqual(prices.loc["Close"][12345].iloc[0], 20.1)
+
+        _unsupported_outputs.clear()
+
+@unittest.skipIf(pyarrow is None, "pyarrow not installed")
+class PricesCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        patcher = patch('quantrocket.price.CACHE_DIR', new=self.cache_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.dict('quantrocket.price._cache_stats', {
+            "hits": 0, "partial_hits": 0, "misses": 0, "evictions": 0})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+
+        self.db_config = {
+            "bar_size": "1 day",
+            "universes": ["usa-stk"],
+            "vendor": "ib",
+            "fields": ["Close","Open","High","Low", "Volume"]
+        }
+        # the database grows by a day after the first query, and the last
+        # cached day gets revised
+        self.all_prices = pd.DataFrame(
+            dict(
+                ConId=[
+                    12345,
+                    12345,
+                    12345,
+                    12345,
+                    ],
+                Date=[
+                    "2018-04-01",
+                    "2018-04-02",
+                    "2018-04-03",
+                    "2018-04-04",
+                    ],
+                Close=[
+                    20.10,
+                    20.50,
+                    19.40,
+                    19.90
+                    ]))
+        self.available_through = "2018-04-03"
+        self.download_kwargs = []
+
+    def mock_get_history_db_config(self, db):
+        return self.db_config
+
+    def mock_download_history_file(self, code, f, *args, **kwargs):
+        self.download_kwargs.append(kwargs)
+        prices = self.all_prices[self.all_prices.Date <= self.available_through].copy()
+        if self.available_through == "2018-04-04":
+            prices.loc[prices.Date == "2018-04-03", "Close"] = 19.45
+        if kwargs.get("start_date"):
+            prices = prices[prices.Date >= kwargs["start_date"]]
+        if kwargs.get("end_date"):
+            prices = prices[prices.Date <= kwargs["end_date"]]
+        if prices.empty:
+            raise NoHistoricalData("no history matches the query parameters")
+        prices.to_csv(f, index=False)
+
+    def get_prices(self, *args, **kwargs):
+        def mock_list_history_databases():
+            return ["usa-stk-1d"]
+
+        def mock_list_realtime_databases():
+            return {}
+
+        with patch('quantrocket.price.list_realtime_databases', new=mock_list_realtime_databases):
+            with patch('quantrocket.price.list_history_databases', new=mock_list_history_databases):
+                with patch('quantrocket.price.get_history_db_config', new=self.mock_get_history_db_config):
+                    with patch('quantrocket.price.download_history_file', new=self.mock_download_history_file):
+                        return get_prices(*args, **kwargs)
+
+    def test_only_fetch_new_data_on_repeat_query(self):
+        """
+        Tests that a repeat query only downloads data on or after the cached
+        high-water mark, and that queries within the cached dates don't
+        download anything.
+        """
+        prices = self.get_prices("usa-stk-1d", fields=["Close"], cache=True)
+        self.assertListEqual(list(prices.loc["Close"][12345]), [20.10, 20.50, 19.40])
+        self.assertIsNone(self.download_kwargs[-1]["start_date"])
+
+        self.available_through = "2018-04-04"
+        prices = self.get_prices("usa-stk-1d", fields=["Close"], cache=True)
+        self.assertListEqual(list(prices.loc["Close"][12345]), [20.10, 20.50, 19.45, 19.90])
+        self.assertEqual(self.download_kwargs[-1]["start_date"], "2018-04-03")
+
+        prices = self.get_prices("usa-stk-1d", fields=["Close"], cache=True,
+                                 start_date="2018-04-02", end_date="2018-04-03")
+        self.assertListEqual(list(prices.loc["Close"][12345]), [20.50, 19.45])
+
+        self.assertEqual(len(self.download_kwargs), 2)
+        self.assertDictEqual(
+            get_cache_stats(),
+            {"hits": 1, "partial_hits": 1, "misses": 1, "evictions": 0,
+             "entries": 1, "size": get_cache_stats()["size"]})
+
+        # without the cache, everything is downloaded
+        prices = self.get_prices("usa-stk-1d", fields=["Close"])
+        self.assertListEqual(list(prices.loc["Close"][12345]), [20.10, 20.50, 19.45, 19.90])
+        self.assertIsNone(self.download_kwargs[-1]["start_date"])
+        self.assertEqual(get_cache_stats()["hits"], 1)
+
+    def test_refetch_if_db_config_changes_or_earlier_start_date_or_cache_cleared(self):
+        """
+        Tests that the full query is downloaded again if the db config
+        changes, an earlier start date is requested than was cached, or the
+        cache is cleared.
+        """
+        self.get_prices("usa-stk-1d", fields=["Close"], start_date="2018-04-02", cache=True)
+        self.assertEqual(self.download_kwargs[-1]["start_date"], "2018-04-02")
+
+        prices = self.get_prices("usa-stk-1d", fields=["Close"], start_date="2018-04-01", cache=True)
+        self.assertListEqual(list(prices.loc["Close"][12345]), [20.10, 20.50, 19.40])
+        self.assertEqual(self.download_kwargs[-1]["start_date"], "2018-04-01")
+
+        self.db_config = dict(self.db_config, fields=["Close"])
+        self.get_prices("usa-stk-1d", fields=["Close"], start_date="2018-04-01", cache=True)
+        self.assertEqual(self.download_kwargs[-1]["start_date"], "2018-04-01")
+
+        clear_cache()
+        self.assertEqual(get_cache_stats()["entries"], 0)
+        self.get_prices("usa-stk-1d", fields=["Close"], start_date="2018-04-01", cache=True)
+        self.assertEqual(self.download_kwargs[-1]["start_date"], "2018-04-01")
+
+        self.assertEqual(get_cache_stats()["misses"], 4)
+        self.assertEqual(get_cache_stats()["entries"], 1)
+
+    def test_evict_least_recently_used(self):
+        """
+        Tests that the least recently used entries are evicted when the cache
+        exceeds the max size.
+        """
+        self.get_prices("usa-stk-1d", fields=["Close"], cache=True)
+        self.get_prices("usa-stk-1d", fields=["Close"], times=["09:30:00"], cache=True)
+        self.assertEqual(get_cache_stats()["entries"], 2)
+
+        with patch('quantrocket.price.CACHE_MAX_SIZE', new=0):
+            self.get_prices("usa-stk-1d", fields=["Close", "Volume"], cache=True)
+
+        self.assertEqual(get_cache_stats()["entries"], 1)
+        self.assertEqual(get_cache_stats()["evictions"], 2)
+
+        # the most recent entry is still cached
+        self.get_prices("usa-stk-1d", fields=["Close", "Volume"], cache=True,
+                        end_date="2018-04-02")
+        self.assertEqual(len(self.download_kwargs), 3)
+        self.assertEqual(get_cache_stats()["hits"], 1)
+
+class GetPricesAsDictTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.bar_size = "15 mins"
+
+    def mock_get_history_db_config(self, db):
+        return {
+            "bar_size": self.bar_size,
+            "universes": ["usa-stk"],
+            "vendor": "ib",
+            "fields": ["Close","Open","High","Low", "Volume"]
+        }
+
+    def mock_get_realtime_db_config(self, db):
+        return {
+            "bar_size": "15 min",
+            "fields": ["Close", "LastClose"]
+        }
+
+    def mock_download_history_file(self, code, f, *args, **kwargs):
+        if self.bar_size == "1 day":
+            dates = [
+                "2018-04-01",
+                "2018-04-02",
+                "2018-04-03",
+                "2018-04-02",
+                ]
+        else:
+            dates = [
+                "2018-04-01T09:30:00-04:00",
+                "2018-04-01T15:30:00-04:00",
+                "2018-04-02T09:30:00-04:00",
+                "2018-04-02T15:30:00-04:00",
+                ]
+        prices = pd.DataFrame(
+            dict(
+                ConId=[
+                    12345,
+                    12345,
+                    12345,
+                    23456,
+                    ],
+                Date=dates,
+                Close=[
+                    20.10,
+                    None,
+                    19.40,
+                    50.5,
+                    ],
+                Volume=[
+                    15000,
+                    7800,
+                    12400,
+                    98000,
+                ]
+            ))
+        prices.to_csv(f, index=False)
+
+    def mock_download_market_data_file(self, code, f, *args, **kwargs):
+        prices = pd.DataFrame(
+            dict(
+                ConId=[
+                    12345,
+                    12345,
+                    23456,
+                    23456,
+                    ],
+                Date=[
+                    # overlaps the history db
+                    "2018-04-01T19:30:00+00",
+                    "2018-04-02T13:30:00+00",
+                    "2018-04-02T19:00:00+00",
+                    "2018-04-02T19:30:00+00",
+                    ],
+                Close=[
+                    30.50,
+                    39.40,
+                    45.49,
+                    46.78,
+                    ],
+                LastClose=[
+                    79.5,
+                    79.59,
+                    89.34,
+                    81.56,
+                    ]
+            ))
+        prices.to_csv(f, index=False)
+
+    def mock_download_master_file(self, f, *args, **kwargs):
+        securities = pd.DataFrame(dict(ConId=[12345,23456],
+                                       Timezone=["America/New_York", "America/New_York"]))
+        securities.to_csv(f, index=False)
+        f.seek(0)
+
+    def get_prices(self, *args, **kwargs):
+        def mock_list_history_databases():
+            return ["usa-stk-15min", "usa-stk-1d"]
+
+        def mock_list_realtime_databases():
+            return {"usa-stk-snapshot": ["usa-stk-snapshot-15min"]}
+
+        with patch('quantrocket.price.list_realtime_databases', new=mock_list_realtime_databases):
+            with patch('quantrocket.price.list_history_databases', new=mock_list_history_databases):
+                with patch('quantrocket.price.get_history_db_config', new=self.mock_get_history_db_config):
+                    with patch('quantrocket.price.get_realtime_db_config', new=self.mock_get_realtime_db_config):
+                        with patch('quantrocket.price.download_history_file', new=self.mock_download_history_file):
+                            with patch('quantrocket.price.download_market_data_file', new=self.mock_download_market_data_file):
+                                with patch('quantrocket.price.download_master_file', new=self.mock_download_master_file):
+                                    return get_prices(*args, **kwargs)
+
+    def assert_as_dict_matches_loc(self, *args, **kwargs):
+        prices = self.get_prices(*args, **kwargs)
+        prices_by_field = self.get_prices(*args, as_dict=True, **kwargs)
+
+        self.assertListEqual(
+            sorted(prices_by_field.keys()),
+            sorted(prices.index.get_level_values("Field").unique()))
+        for field, field_prices in prices_by_field.items():
+            pd.testing.assert_frame_equal(field_prices, prices.loc[field])
+            # the DataFrames share their axes
+            self.assertIs(field_prices.index, prices_by_field["Close"].index)
+            self.assertIs(field_prices.columns, prices_by_field["Close"].columns)
+
+        return prices_by_field
+
+    def test_intraday_as_dict(self):
+        """
+        Tests that as_dict returns the same DataFrames as prices.loc[field]
+        for intraday history and real-time databases, including respecting
+        db priority, inferring the timezone, filling missing times, and
+        applying the times filter.
+        """
+        prices = self.assert_as_dict_matches_loc(
+            ["usa-stk-15min", "usa-stk-snapshot-15min"])
+
+        closes = prices["Close"].reset_index()
+        closes.loc[:, "Date"] = closes.Date.dt.strftime("%Y-%m-%d")
+        self.assertListEqual(
+            closes.fillna("nan").to_dict(orient="records"),
+            [{'Date': '2018-04-01', 'Time': '09:30:00', 12345: 20.1, 23456: "nan"},
+             {'Date': '2018-04-01', 'Time': '15:00:00', 12345: "nan", 23456: "nan"},
+             {'Date': '2018-04-01', 'Time': '15:30:00', 12345: 30.5, 23456: "nan"},
+             {'Date': '2018-04-02', 'Time': '09:30:00', 12345: 19.4, 23456: "nan"},
+             {'Date': '2018-04-02', 'Time': '15:00:00', 12345: "nan", 23456: 45.49},
+             {'Date': '2018-04-02', 'Time': '15:30:00', 12345: "nan", 23456: 50.5}]
+        )
+
+        prices = self.assert_as_dict_matches_loc(
+            ["usa-stk-15min", "usa-stk-snapshot-15min"], times=["09:30:00", "15:30:00"])
+        self.assertListEqual(
+            list(prices["Close"].index.get_level_values("Time")),
+            ["09:30:00", "15:30:00", "09:30:00", "15:30:00"])
+        self.assertEqual(prices["Close"].loc["2018-04-02"].loc["15:30:00", 23456], 50.5)
+
+        # the first db has priority even when the dbs report the same bar
+        # with different UTC offsets
+        prices = self.get_prices(
+            ["usa-stk-snapshot-15min", "usa-stk-15min"], as_dict=True)
+        closes = prices["Close"].loc["2018-04-02"]
+        self.assertEqual(closes.loc["09:30:00", 12345], 39.40)
+        self.assertEqual(closes.loc["15:30:00", 23456], 46.78)
+
+        self.assert_as_dict_matches_loc(
+            ["usa-stk-15min", "usa-stk-snapshot-15min"], timezone="Europe/London")
+
+    def test_eod_as_dict(self):
+        """
+        Tests that as_dict returns the same DataFrames as prices.loc[field]
+        for an EOD database.
+        """
+        self.bar_size = "1 day"
+        prices = self.assert_as_dict_matches_loc("usa-stk-1d")
+        self.assertListEqual(list(prices["Volume"][12345]), [15000, 7800, 12400])
+
+    def test_complain_if_as_dict_and_master_fields(self):
+        """
+        Tests error handling when requesting master_fields with as_dict.
+        """
+        with self.assertRaises(ParameterError) as cm:
+            get_prices("usa-stk-15min", as_dict=True, master_fields=["Symbol"])
+
+        self.assertIn("as_dict does not support master_fields", repr(cm.exception))
+
+class DateTimeIndexTestCase(unittest.TestCase):
+    """
+    Tests that the Field/Date/Time index built from integer codes matches the
+    index built from tuples.
+    """
+
+    def get_field_date_index(self, tz=None):
+        # unsorted fields and datetimes, duplicate datetimes, a DST
+        # transition, and a sub-second difference
+        datetimes = pd.DatetimeIndex([
+            "2018-03-12 09:30:00",
+            "2018-03-09 15:45:00",
+            "2018-03-09 09:30:00",
+            "2018-03-12 09:30:00",
+            "2018-03-09 15:45:00.5",
+            "2018-03-12 15:45:00",
+            "2018-03-09 09:30:00",
+            "2018-03-12 09:30:00",
+        ])
+        if tz:
+            datetimes = datetimes.tz_localize(tz)
+        return pd.MultiIndex.from_arrays((
+            ["Volume", "Close", "Volume", "Close", "Volume", "Close", "Close", "Volume"],
+            datetimes), names=("Field", "Date"))
+
+    @staticmethod
+    def split_date_and_time_from_tuples(index):
+        dts = index.get_level_values("Date")
+        dates = pd.to_datetime(dts.date).tz_localize(None)
+        return pd.MultiIndex.from_arrays(
+            (index.get_level_values("Field"),
+             dates,
+             dts.strftime("%H:%M:%S")),
+            names=["Field", "Date", "Time"])
+
+    def test_split_date_and_time(self):
+        """
+        Tests that splitting dates and times gives the same index as the
+        tuple-based split, for tz-naive and tz-aware dates.
+        """
+        for tz in (None, "America/New_York", "UTC"):
+            index = self.get_field_date_index(tz=tz)
+            datetime_index = _split_date_and_time(index)
+            expected_index = self.split_date_and_time_from_tuples(index)
+
+            self.assertListEqual(list(datetime_index), list(expected_index))
+            self.assertListEqual(list(datetime_index.names), ["Field", "Date", "Time"])
+            self.assertIsNone(datetime_index.get_level_values("Date").tz)
+
+            # the deduped index also matches
+            prices = pd.DataFrame({"Value": np.arange(len(index))}, index=datetime_index)
+            prices = prices.groupby(level=["Field", "Date", "Time"]).first()
+            expected_prices = pd.DataFrame({"Value": np.arange(len(index))}, index=expected_index)
+            expected_prices = expected_prices.groupby(expected_prices.index).first()
+            expected_prices.index = pd.MultiIndex.from_tuples(expected_prices.index)
+            self.assertListEqual(list(prices.index), list(expected_prices.index))
+            self.assertListEqual(prices.Value.tolist(), expected_prices.Value.tolist())
+
+    def test_interpolate_times(self):
+        """
+        Tests that the interpolated index, with and without master fields,
+        matches the index built from the product of the unique fields, dates
+        and times.
+        """
+        index = self.get_field_date_index(tz="America/New_York")
+        index = pd.MultiIndex.from_arrays((
+            list(index.get_level_values("Field")) + ["Timezone", "Symbol"],
+            index.get_level_values("Date").append(pd.DatetimeIndex(
+                ["2018-03-12 15:45:00", "2018-03-09 15:45:00"], tz="America/New_York"))),
+            names=("Field", "Date"))
+        datetime_index = _split_date_and_time(index)
+
+        for master_fields in (None, ["Symbol", "Timezone"]):
+            interpolated_index = _interpolate_times(datetime_index, master_fields=master_fields)
+
+            expected_index = self.split_date_and_time_from_tuples(index)
+            prices = pd.DataFrame(index=expected_index).sort_index()
+            unique_fields = prices.index.get_level_values("Field").unique()
+            unique_dates = prices.index.get_level_values("Date").unique()
+            unique_times = prices.index.get_level_values("Time").unique()
+            expected_index = None
+            for field in unique_fields:
+                if master_fields and field in master_fields:
+                    min_date = prices.loc[field].index.min()
+                    field_idx = pd.MultiIndex.from_tuples([(field, min_date[0], min_date[1])])
+                else:
+                    field_idx = pd.MultiIndex.from_product(
+                        [[field], unique_dates, unique_times]).sort_values()
+                if expected_index is None:
+                    expected_index = field_idx
+                else:
+                    expected_index = expected_index.append(field_idx)
+
+            self.assertListEqual(list(interpolated_index), list(expected_index))
+
+        self.assertListEqual(
+            [(field, str(date.date()), time) for field, date, time in interpolated_index
+             if field in master_fields],
+            [("Symbol", "2018-03-09", "15:45:00"), ("Timezone", "2018-03-12", "15:45:00")])
@@ -14,8 +14,31 @@
 
 # To run: python -m unittest discover -s tests/ -p test*.py -t .
 
+import io
+import os
+import base64
+import hashlib
+import shutil
+import tempfile
 import unittest
+try:
+    from unittest.mock import patch
+except ImportError:
+    # py27
+    from mock import patch
+import numpy as np
+import requests
+import urllib3
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
 from quantrocket.utils import segmented_date_range
+from quantrocket.cli.utils.files import write_response_to_filepath_or_buffer
+from quantrocket.exceptions import IncompleteDownload
+from quantrocket.utils.parse import _read_csv
+from quantrocket.utils.cache import clear_metadata_cache, get_metadata_cache_stats
+from quantrocket.history import get_db_config, list_databases, drop_db
 
 class DateUtilsTestCase(unittest.TestCase):
     """
@@ -68,3 +91,305 @@ class DateUtilsTestCase(unittest.TestCase):
              ('2013-01-31', '2013-07-30'),
              ('2013-07-31', '2014-01-01')]
         )
+
+PRICES_CSV = u"""ConId,Date,Close,Volume,Wap
+12345,2018-04-01T09:30:00-04:00,20.1,15000,
+12345,2018-04-01T09:45:00-04:00,20.5,16777217,
+23456,2018-04-01T09:30:00-04:00,50.5,98000,
+"""
+
+MASTER_CSV = u"""ConId,Symbol,PrimaryExchange,Timezone
+12345,AAPL,NASDAQ,America/New_York
+23456,IBM,NYSE,America/New_York
+"""
+
+class ReadCsvTestCase(unittest.TestCase):
+    """
+    Test cases for `quantrocket.utils.parse._read_csv`.
+    """
+
+    def test_prices_schema(self):
+        # without pyarrow, the pyarrow engine would silently fall back to c
+        engines = ("pyarrow", "c") if pyarrow is not None else ("c",)
+        for engine in engines:
+            with patch("quantrocket.utils.parse.CSV_ENGINE", new=engine):
+                prices = _read_csv(io.BytesIO(PRICES_CSV.encode("utf-8")), "prices")
+
+                self.assertEqual(prices.ConId.dtype, np.int32)
+                # dates are not parsed (pyarrow would infer timestamps)
+                self.assertListEqual(
+                    list(prices.Date),
+                    ["2018-04-01T09:30:00-04:00",
+                     "2018-04-01T09:45:00-04:00",
+                     "2018-04-01T09:30:00-04:00"])
+                self.assertEqual(prices.Close.dtype, np.float64)
+                self.assertEqual(prices.Volume.dtype, np.int64)
+                # empty columns are float
+                self.assertEqual(prices.Wap.dtype, np.float64)
+
+                prices = _read_csv(io.BytesIO(PRICES_CSV.encode("utf-8")), "prices",
+                                   usecols=["ConId", "Date", "Close", "Open"], float32=True)
+
+                self.assertListEqual(list(prices.columns), ["ConId", "Date", "Close"])
+                self.assertEqual(prices.ConId.dtype, np.int32)
+                self.assertEqual(prices.Close.dtype, np.float32)
+                self.assertListEqual(list(prices.Close), list(np.array([20.1, 20.5, 50.5], dtype=np.float32)))
+
+        # text buffers are parsed by pandas
+        prices = _read_csv(io.StringIO(PRICES_CSV), "prices", float32=True)
+        self.assertEqual(prices.ConId.dtype, np.int32)
+        self.assertEqual(prices.Volume.dtype, np.float32)
+        self.assertEqual(prices.Wap.dtype, np.float32)
+
+    def test_master_schema(self):
+        securities = _read_csv(io.StringIO(MASTER_CSV), "master", index_col="ConId")
+
+        self.assertListEqual(list(securities.index), [12345, 23456])
+        self.assertEqual(securities.Symbol.dtype, object)
+        self.assertEqual(securities.PrimaryExchange.dtype.name, "category")
+        self.assertEqual(securities.Timezone.dtype.name, "category")
+        self.assertListEqual(list(securities.Timezone.unique()), ["America/New_York"])
+
+class FlakyRaw(object):
+    """
+    Stand-in for a urllib3 response whose connection drops after
+    `fail_after` bytes.
+    """
+    def __init__(self, content, fail_after=None):
+        self.content = content
+        self.fail_after = fail_after
+
+    def stream(self, chunk_size, decode_content=True):
+        for i in range(0, len(self.content), chunk_size):
+            if self.fail_after is not None and i >= self.fail_after:
+                raise urllib3.exceptions.ProtocolError("Connection broken")
+            yield self.content[i:i+chunk_size]
+
+    def close(self):
+        pass
+
+class Py2File(object):
+    """
+    Stand-in for a py2 file object, which has no seekable().
+    """
+    def __init__(self, f):
+        self.f = f
+        self.write = f.write
+        self.tell = f.tell
+        self.seek = f.seek
+        self.truncate = f.truncate
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.f.close()
+
+class WriteResponseTestCase(unittest.TestCase):
+    """
+    Test cases for `quantrocket.cli.utils.files.write_response_to_filepath_or_buffer`.
+    """
+
+    def make_response(self, content, status_code=200, headers=None, fail_after=None):
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers.update(headers or {})
+        if fail_after is None:
+            response.raw = io.BytesIO(content)
+        else:
+            response.raw = FlakyRaw(content, fail_after=fail_after)
+        response.request = requests.Request(
+            "GET", "http://houston/history/usa-stk-1d.csv", params={"conids": [1]}).prepare()
+        return response
+
+    def test_decode_multibyte_characters_split_across_chunks(self):
+        content = "ConId,Symbol\n1,Société Générale\n2,日本電信電話\n".encode("utf-8")
+
+        f = io.StringIO()
+        with patch("quantrocket.cli.utils.files.DOWNLOAD_CHUNK_SIZE", new=5):
+            write_response_to_filepath_or_buffer(f, self.make_response(content))
+
+        self.assertEqual(f.read(), content.decode("utf-8"))
+
+    def test_write_to_binary_buffer_or_file(self):
+        content = b"ConId,Close\n" + b"1,10.5\n" * 1000
+
+        f = io.BytesIO()
+        write_response_to_filepath_or_buffer(f, self.make_response(content))
+        self.assertEqual(f.read(), content)
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filepath = os.path.join(tmpdir, "prices.csv")
+            with patch("quantrocket.cli.utils.files.DOWNLOAD_CHUNK_SIZE", new=100):
+                write_response_to_filepath_or_buffer(filepath, self.make_response(content))
+            with open(filepath, "rb") as f:
+                self.assertEqual(f.read(), content)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    @patch("quantrocket.cli.utils.files.DOWNLOAD_RESUME_DELAY", new=0)
+    @patch("quantrocket.cli.utils.files.DOWNLOAD_CHUNK_SIZE", new=10)
+    def test_resume_dropped_download_with_range_request(self):
+        content = "ConId,Date,Close\n1,2018-01-01,Société\n2,2018-01-02,Générale\n".encode("utf-8")
+        headers = {"Content-Length": str(len(content)), "ETag": '"abc"'}
+
+        resume_requests = []
+
+        def mock_send(request, **kwargs):
+            resume_requests.append(dict(request.headers))
+            offset = int(request.headers["Range"].split("=")[1].rstrip("-"))
+            return self.make_response(
+                content[offset:], status_code=206,
+                headers={"Content-Range": "bytes {0}-{1}/{2}".format(
+                    offset, len(content) - 1, len(content))})
+
+        for f in (io.StringIO(), io.BytesIO()):
+            resume_requests = []
+            with patch("quantrocket.houston.houston.send", new=mock_send):
+                write_response_to_filepath_or_buffer(
+                    f, self.make_response(content, headers=headers, fail_after=30))
+
+            expected = content.decode("utf-8") if isinstance(f, io.StringIO) else content
+            self.assertEqual(f.read(), expected)
+            self.assertEqual(len(resume_requests), 1)
+            self.assertEqual(resume_requests[0]["Range"], "bytes=30-")
+            self.assertEqual(resume_requests[0]["If-Range"], '"abc"')
+            self.assertEqual(resume_requests[0]["Accept-Encoding"], "identity")
+
+    @patch("quantrocket.cli.utils.files.DOWNLOAD_RESUME_DELAY", new=0)
+    @patch("quantrocket.cli.utils.files.DOWNLOAD_CHUNK_SIZE", new=10)
+    def test_restart_download_if_range_not_supported(self):
+        content = b"ConId,Date,Close\n1,2018-01-01,1.0\n2,2018-01-02,2.0\n"
+
+        def mock_send(request, **kwargs):
+            return self.make_response(content)
+
+        f = io.BytesIO()
+        f.write(b"prefix:")
+        with patch("quantrocket.houston.houston.send", new=mock_send):
+            write_response_to_filepath_or_buffer(
+                f, self.make_response(content, fail_after=20))
+
+        self.assertEqual(f.read(), b"prefix:" + content)
+
+        def mock_send(request, **kwargs):
+            return self.make_response(content, fail_after=20)
+
+        with patch("quantrocket.houston.houston.send", new=mock_send):
+            with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+                write_response_to_filepath_or_buffer(
+                    io.BytesIO(), self.make_response(content, fail_after=20))
+
+    @patch("quantrocket.cli.utils.files.DOWNLOAD_RESUME_DELAY", new=0)
+    @patch("quantrocket.cli.utils.files.DOWNLOAD_CHUNK_SIZE", new=10)
+    def test_write_to_filepath_without_seekable(self):
+        """
+        Tests that downloads to a filepath, including restarted ones, work
+        with file objects that have no seekable() (as on py2).
+        """
+        content = b"ConId,Date,Close\n1,2018-01-01,1.0\n2,2018-01-02,2.0\n"
+
+        def mock_send(request, **kwargs):
+            return self.make_response(content)
+
+        def mock_open(filepath, mode):
+            return Py2File(io.open(filepath, mode))
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filepath = os.path.join(tmpdir, "prices.csv")
+            with patch("quantrocket.cli.utils.files.open", new=mock_open, create=True):
+                write_response_to_filepath_or_buffer(filepath, self.make_response(content))
+                with open(filepath, "rb") as f:
+                    self.assertEqual(f.read(), content)
+
+                with patch("quantrocket.houston.houston.send", new=mock_send):
+                    write_response_to_filepath_or_buffer(
+                        filepath, self.make_response(content, fail_after=20))
+                with open(filepath, "rb") as f:
+                    self.assertEqual(f.read(), content)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_verify_length_and_checksum(self):
+        content = b"ConId,Date,Close\n1,2018-01-01,1.0\n"
+
+        with self.assertRaises(IncompleteDownload) as cm:
+            write_response_to_filepath_or_buffer(
+                io.BytesIO(), self.make_response(
+                    content, headers={"Content-Length": str(len(content) + 10)}))
+
+        self.assertIn("download incomplete", repr(cm.exception))
+
+        md5 = base64.b64encode(hashlib.md5(content).digest()).decode("ascii")
+        write_response_to_filepath_or_buffer(
+            io.BytesIO(), self.make_response(content, headers={"Content-MD5": md5}))
+
+        sha256 = base64.b64encode(hashlib.sha256(b"other").digest()).decode("ascii")
+        with self.assertRaises(IncompleteDownload) as cm:
+            write_response_to_filepath_or_buffer(
+                io.BytesIO(), self.make_response(
+                    content, headers={"Digest": "sha-256={0}".format(sha256)}))
+
+        self.assertIn("download corrupted", repr(cm.exception))
+
+class MetadataCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        clear_metadata_cache()
+        self.urls_requested = []
+
+        def mock_request(session, method, url, *args, **kwargs):
+            self.urls_requested.append((method, url))
+            response = requests.Response()
+            response.status_code = 200
+            response._content = b'{"universes": ["usa-stk"]}'
+            response._content_consumed = True
+            return response
+
+        self.patcher = patch("requests.Session.request", new=mock_request)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        clear_metadata_cache()
+
+    def test_cache_and_invalidate(self):
+        """
+        Tests that metadata lookups are cached per argument and houston URL,
+        that callers get a copy, and that dropping a db invalidates the cache.
+        """
+        with patch.dict(os.environ, {"HOUSTON_URL": "http://houston"}, clear=True):
+            stats = get_metadata_cache_stats()
+            config = get_db_config("usa-stk-1d")
+            config["universes"].append("japan-stk")
+            self.assertDictEqual(get_db_config("usa-stk-1d"), {"universes": ["usa-stk"]})
+            get_db_config("japan-stk-1d")
+            list_databases()
+            list_databases()
+
+            self.assertListEqual(self.urls_requested, [
+                ("GET", "http://houston/history/databases/usa-stk-1d"),
+                ("GET", "http://houston/history/databases/japan-stk-1d"),
+                ("GET", "http://houston/history/databases"),
+            ])
+            new_stats = get_metadata_cache_stats()
+            self.assertEqual(new_stats["hits"] - stats["hits"], 2)
+            self.assertEqual(new_stats["misses"] - stats["misses"], 3)
+            self.assertEqual(new_stats["size"], 3)
+
+            drop_db("japan-stk-1d", confirm_by_typing_db_code_again="japan-stk-1d")
+            self.assertEqual(get_metadata_cache_stats()["size"], 0)
+            list_databases()
+            self.assertEqual(len(self.urls_requested), 5)
+
+        with patch.dict(os.environ, {"HOUSTON_URL": "http://houston2"}, clear=True):
+            list_databases()
+            self.assertEqual(self.urls_requested[-1], ("GET", "http://houston2/history/databases"))
+
+        # a TTL of 0 turns off caching
+        with patch.dict(os.environ, {"HOUSTON_URL": "http://houston"}, clear=True):
+            with patch("quantrocket.utils.cache.METADATA_CACHE_TTL", new=0):
+                list_databases()
+            self.assertEqual(len(self.urls_requested), 7)